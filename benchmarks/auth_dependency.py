@@ -0,0 +1,80 @@
+"""
+Cost of resolving the authenticated user of a request:
+the auth services building their CryptContext and JWT key
+on every request (old path) against the process-wide ones.
+
+Measured on the _AuthenticatedUser dependency alone and on whole
+/auth/users/me requests through the ASGI app, with a stateless token,
+which needs no query once the revocation list is loaded.
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/auth_dependency.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi import HTTPException
+from httpx import AsyncClient
+from passlib.context import CryptContext
+
+import auth.dependencies
+from auth.dependencies import _AuthenticatedUser
+from auth.revocations import token_revocations
+from auth.services.authentication import JWTAuthenticationService
+from auth.tokens import TokenCodec
+from main import app
+from unitofwork import UnitOfWork
+
+
+class PerRequestAuthenticationService(JWTAuthenticationService):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+    @staticmethod
+    def _decode_token(token: str) -> dict:
+        return TokenCodec().decode(token)
+
+
+async def main(requests: int) -> None:
+    token = await JWTAuthenticationService.create_access_token(
+        {
+            "sub": "bench",
+            "uid": str(uuid4()),
+            "username": "bench",
+            "jti": str(uuid4()),
+        }
+    )
+    await token_revocations.refresh()
+    dependency = _AuthenticatedUser()
+    http_exception = HTTPException(status_code=401)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for name, service_class in (
+            ("per request", PerRequestAuthenticationService),
+            ("singletons", JWTAuthenticationService),
+        ):
+            auth.dependencies.JWTAuthenticationService = service_class
+            start = time.perf_counter()
+            for _ in range(requests):
+                await dependency(http_exception, token, UnitOfWork())
+            resolution = (time.perf_counter() - start) / requests
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = await client.get("/auth/users/me", headers=headers)
+                assert response.status_code == 200
+            request = (time.perf_counter() - start) / requests
+            print(
+                f"{name:>11}: dependency {resolution * 1e6:>6.1f} us, "
+                f"request {request * 1e6:>7.1f} us"
+            )
+    auth.dependencies.JWTAuthenticationService = JWTAuthenticationService
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,61 @@
+"""
+Requests per second of a JWT-authenticated endpoint shape
+(one unit of work for the user lookup and one for the payload)
+with NullPool against the pooled engine.
+
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/db_pool.py [concurrency] [seconds]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from database import create_engine, get_pool_stats
+from unitofwork import UnitOfWork
+
+
+async def _request(session_maker: sessionmaker) -> None:
+    uow = UnitOfWork()
+    uow.session_factory = session_maker
+    async with uow:
+        await uow.users.get_all(returns=("id",), username="bench")
+    async with uow:
+        await uow.users.isearch_count(username="bench")
+
+
+async def _run(engine: AsyncEngine, concurrency: int, seconds: float) -> int:
+    session_maker = sessionmaker(engine, class_=AsyncSession)  # type: ignore
+    deadline = time.perf_counter() + seconds
+    done = 0
+
+    async def worker() -> None:
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await _request(session_maker)
+            done += 1
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return done
+
+
+async def main(concurrency: int, seconds: float) -> None:
+    for name, null_pool in (("NullPool", True), ("pooled", False)):
+        engine = create_engine(null_pool=null_pool)
+        done = await _run(engine, concurrency, seconds)
+        print(f"{name:>8}: {done / seconds:>8.1f} requests/s")
+        if not null_pool:
+            print(get_pool_stats(engine))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(main(concurrency, seconds))
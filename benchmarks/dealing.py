@@ -0,0 +1,100 @@
+"""
+Dealing of sets: random.choice over the set difference of CardDTO
+for every card (old path) against one shuffle of the integer deck.
+
+Also checks that the new deal is uniform: how often every card
+lands in the first hand and becomes the trump is compared
+with the expected count by a chi-squared test.
+
+Needs the settings from .env, the database is not used.
+
+Usage: python benchmarks/dealing.py [sets]
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from game import cards
+from game.schemas import CardDTO, LobbyUserInfoDTO, UserCardListDTO
+from game.services.game import GameService
+
+CARDS = {
+    CardDTO(suit=suit, value=value)
+    for suit in cards.SUITS
+    for value in cards.VALUES
+}
+# Chi-squared quantile for 35 degrees of freedom at p = 0.001
+CHI_SQUARED_LIMIT = 66.62
+
+
+def old_deal(set_name: str, players: list[LobbyUserInfoDTO]) -> tuple:
+    max_cards_per_player = GameService._get_cards_per_player(
+        set_name, len(players)
+    )
+    users_with_cards = []
+    used_cards = set()
+    for player in players:
+        hand = []
+        for _ in range(max_cards_per_player):
+            card = random.choice(list(CARDS - used_cards))
+            hand.append(card)
+            used_cards.add(card)
+        users_with_cards.append(
+            UserCardListDTO(id=player.id, username=player.username, cards=hand)
+        )
+    unused_cards = CARDS - used_cards
+    trump = random.choice(list(unused_cards)) if unused_cards else None
+    return users_with_cards, trump
+
+
+def new_deal(set_name: str, players: list[LobbyUserInfoDTO]) -> tuple:
+    hands, rest_cards = cards.deal(
+        len(players), GameService._get_cards_per_player(set_name, len(players))
+    )
+    return hands, GameService._pick_trump(set_name, rest_cards)
+
+
+def chi_squared(counter: Counter, expected: float) -> float:
+    return sum(
+        (counter[card] - expected) ** 2 / expected
+        for card in range(cards.DECK_SIZE)
+    )
+
+
+def main(sets: int) -> None:
+    players = [
+        LobbyUserInfoDTO(id=uuid4(), username=str(index), is_leader=False)
+        for index in range(4)
+    ]
+    set_name = "5"
+    for name, deal in (("old", old_deal), ("new", new_deal)):
+        start = time.perf_counter()
+        for _ in range(sets):
+            deal(set_name, players)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}: {elapsed:>6.2f} s for {sets} sets, "
+            f"{elapsed / sets * 1e6:>6.1f} us per set"
+        )
+
+    first_hands, trumps = Counter(), Counter()
+    for _ in range(sets):
+        hands, rest_cards = cards.deal(len(players), int(set_name))
+        first_hands.update(hands[0])
+        trumps[rest_cards[0]] += 1
+    for name, counter, expected in (
+        ("first hand", first_hands, sets * int(set_name) / cards.DECK_SIZE),
+        ("trump", trumps, sets / cards.DECK_SIZE),
+    ):
+        value = chi_squared(counter, expected)
+        verdict = "uniform" if value < CHI_SQUARED_LIMIT else "NOT UNIFORM"
+        print(f"{name}: chi-squared {value:.1f} (35 dof), {verdict}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
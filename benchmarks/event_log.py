@@ -0,0 +1,98 @@
+"""
+Writing the game event log: one INSERT and commit per event
+(as moves are written one by one) against a buffered batch
+written with a multi-row INSERT and with COPY.
+
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/event_log.py [events]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete
+
+from database import async_session_maker
+from game.models import Game, GameType
+from game.schemas import GameLogEventDTO
+from unitofwork import UnitOfWork
+
+
+def make_events(game_id, count: int) -> list[GameLogEventDTO]:
+    return [
+        GameLogEventDTO(
+            game_id=game_id,
+            seq=seq,
+            type="card_played",
+            payload={
+                "card": {
+                    "id": str(uuid4()),
+                    "suit": "H",
+                    "value": 6 + seq % 9,
+                    "user_id": str(uuid4()),
+                    "entry_id": str(uuid4()),
+                }
+            },
+            created_at=datetime.utcnow(),
+        )
+        for seq in range(count)
+    ]
+
+
+async def one_by_one(events: list[GameLogEventDTO]) -> None:
+    uow = UnitOfWork()
+    for event in events:
+        async with uow:
+            await uow.game_events.bulk_add([event.model_dump()])
+            await uow.commit()
+
+
+async def multi_row_insert(events: list[GameLogEventDTO]) -> None:
+    uow = UnitOfWork()
+    async with uow:
+        await uow.game_events.bulk_add(
+            [event.model_dump() for event in events]
+        )
+        await uow.commit()
+
+
+async def copy(events: list[GameLogEventDTO]) -> None:
+    uow = UnitOfWork()
+    async with uow:
+        await uow.game_events.copy(events)
+        await uow.commit()
+
+
+async def main(count: int) -> None:
+    game_ids = []
+    for name, write in (
+        ("one by one", one_by_one),
+        ("multi-row INSERT", multi_row_insert),
+        ("COPY", copy),
+    ):
+        async with async_session_maker() as session:
+            game = Game(type=GameType.MULTIPLAYER, players_number=2)
+            session.add(game)
+            await session.commit()
+        game_ids.append(game.id)
+        events = make_events(game.id, count)
+        start = time.perf_counter()
+        await write(events)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>16}: {elapsed * 1000:>8.1f} ms, "
+            f"{count / elapsed:>9.0f} events/s"
+        )
+    async with async_session_maker() as session:
+        await session.execute(delete(Game).filter(Game.id.in_(game_ids)))
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,141 @@
+"""
+Time to the first move of a new game for 2 to 6 players:
+every set dealt at creation (old path) against the first set only,
+the others being dealt when they become current.
+
+The time covers the creation of the game, the loading of its state
+and the first played card. The rows left behind by a game abandoned
+after its first set are counted as well.
+
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/first_move.py [repeats]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete, func, select
+
+from auth.models import User
+from database import async_session_maker
+from game.models import Card, Dealing, Game, Set
+from game.schemas import LobbyUserInfoDTO, ProcessCardDTO
+from game.services.game import GameService
+from game.state import GameState
+from unitofwork import UnitOfWork
+
+
+class EagerGameService(GameService):
+    async def create_sets_with_cards(
+        self, game_id: UUID, players: list[LobbyUserInfoDTO]
+    ) -> None:
+        circular_players_generator = self._get_circular_iterations(players)
+        dealer = next(circular_players_generator)
+        opening_player = next(circular_players_generator)
+        sets, dealings, card_rows = [], [], []
+        for index, set_name in enumerate(self._generate_sets(len(players))):
+            set_id = uuid4()
+            deal, set_dealings, set_cards = self._deal_set(
+                set_id, set_name, [player.id for player in players]
+            )
+            sets.append(
+                dict(
+                    id=set_id,
+                    round_name=set_name,
+                    round_number=index + 1,
+                    is_current_round=index == 0,
+                    dealer_id=dealer.id,
+                    opening_player_id=opening_player.id,
+                    game_id=game_id,
+                    **deal,
+                )
+            )
+            dealings += set_dealings
+            card_rows += set_cards
+            dealer = opening_player
+            opening_player = next(circular_players_generator)
+        await self._uow.sets.bulk_add(sets)
+        await self._uow.dealings.bulk_add(dealings)
+        await self._uow.cards.bulk_add(card_rows)
+
+
+async def _create_players(number: int) -> list[LobbyUserInfoDTO]:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"bench_{uuid4().hex}", hashed_password="-")
+            for _ in range(number)
+        ]
+        session.add_all(users)
+        await session.commit()
+    return [
+        LobbyUserInfoDTO(id=user.id, username=user.username, is_leader=False)
+        for user in users
+    ]
+
+
+async def _play_first_move(service_class, players) -> UUID:
+    game = await service_class(UnitOfWork()).create_game(players, True)
+    uow = UnitOfWork()
+    service = service_class(uow)
+    async with uow:
+        info = await service.get_full_game_info(game.id)
+    user = info.users[0]
+    move = GameState(game.id, info).play(
+        ProcessCardDTO(
+            card_id=user.cards[0].id, owner_id=user.id, set_id=info.set_id
+        )
+    )
+    await service.save_moves([move], game.id)
+    return game.id
+
+
+async def _count_rows(game_ids: list[UUID]) -> int:
+    sets = select(Set.id).filter(Set.game_id.in_(game_ids))
+    dealings = select(Dealing.id).filter(Dealing.set_id.in_(sets))
+    cards = select(Card.id).filter(Card.dealing_id.in_(dealings))
+    rows = 0
+    async with async_session_maker() as session:
+        for query in (sets, dealings, cards):
+            rows += (
+                await session.execute(
+                    select(func.count()).select_from(query.subquery())
+                )
+            ).scalar()
+    return rows
+
+
+async def main(repeats: int) -> None:
+    for players_number in range(2, 7):
+        players = await _create_players(players_number)
+        results = []
+        for service_class in (EagerGameService, GameService):
+            game_ids = []
+            start = time.perf_counter()
+            for _ in range(repeats):
+                game_ids.append(await _play_first_move(service_class, players))
+            elapsed = (time.perf_counter() - start) / repeats * 1000
+            rows = await _count_rows(game_ids) // repeats
+            results.append(f"{elapsed:>6.1f} ms {rows:>4} rows")
+            async with async_session_maker() as session:
+                await session.execute(
+                    delete(Game).filter(Game.id.in_(game_ids))
+                )
+                await session.commit()
+        async with async_session_maker() as session:
+            await session.execute(
+                delete(User).filter(User.id.in_([p.id for p in players]))
+            )
+            await session.commit()
+        print(
+            f"{players_number} players: all sets {results[0]}, "
+            f"first set {results[1]}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
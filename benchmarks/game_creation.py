@@ -0,0 +1,109 @@
+"""
+Game creation latency for 2 to 6 players:
+one flushed add() per row (old path) against bulk inserts.
+
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/game_creation.py [repeats]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete
+
+from auth.models import User
+from database import async_session_maker
+from game import cards
+from game.models import Game
+from game.schemas import LobbyUserInfoDTO
+from game.services.game import GameService
+from unitofwork import UnitOfWork
+
+
+class RowByRowGameService(GameService):
+    async def create_sets_with_cards(
+        self, game_id: UUID, players: list[LobbyUserInfoDTO]
+    ) -> None:
+        circular_players_generator = self._get_circular_iterations(players)
+        dealer = next(circular_players_generator)
+        opening_player = next(circular_players_generator)
+        for index, set_name in enumerate(self._generate_sets(len(players))):
+            hands, rest_cards = cards.deal(
+                len(players),
+                self._get_cards_per_player(set_name, len(players)),
+            )
+            trump_suit, trump_value = self._pick_trump(set_name, rest_cards)
+            set_obj = await self._uow.sets.add(
+                trump_suit=trump_suit,
+                trump_value=trump_value,
+                round_name=set_name,
+                round_number=index + 1,
+                is_current_round=index == 0,
+                dealer_id=dealer.id,
+                opening_player_id=opening_player.id,
+                game_id=game_id,
+            )
+            for seat, player in enumerate(players):
+                dealing = await self._uow.dealings.add(
+                    user_id=player.id, set_id=set_obj.id, seat=seat
+                )
+                for card in hands[seat]:
+                    await self._uow.cards.add(
+                        dealing_id=dealing.id,
+                        suit=cards.get_suit(card),
+                        value=cards.get_value(card),
+                    )
+            dealer = opening_player
+            opening_player = next(circular_players_generator)
+
+
+async def _create_players(number: int) -> list[LobbyUserInfoDTO]:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"bench_{uuid4().hex}", hashed_password="-")
+            for _ in range(number)
+        ]
+        session.add_all(users)
+        await session.commit()
+    return [
+        LobbyUserInfoDTO(id=user.id, username=user.username, is_leader=False)
+        for user in users
+    ]
+
+
+async def _cleanup(players: list[LobbyUserInfoDTO], games: list[UUID]) -> None:
+    async with async_session_maker() as session:
+        await session.execute(delete(Game).filter(Game.id.in_(games)))
+        await session.execute(
+            delete(User).filter(User.id.in_([p.id for p in players]))
+        )
+        await session.commit()
+
+
+async def main(repeats: int) -> None:
+    for players_number in range(2, 7):
+        players = await _create_players(players_number)
+        games = []
+        results = []
+        for service_class in (RowByRowGameService, GameService):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                game = await service_class(UnitOfWork()).create_game(
+                    players, True
+                )
+                games.append(game.id)
+            results.append((time.perf_counter() - start) / repeats * 1000)
+        await _cleanup(players, games)
+        print(
+            f"{players_number} players: row by row {results[0]:>8.1f} ms "
+            f"bulk {results[1]:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
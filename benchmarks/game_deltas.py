@@ -0,0 +1,84 @@
+"""
+Bytes sent to a game room per move: the full game info (old path)
+against the delta events of the move.
+
+6 players play every card of a set with full hands,
+the messages are encoded as they are sent to the websockets.
+
+Needs the settings from .env, the database is not used.
+
+Usage: python benchmarks/game_deltas.py
+"""
+import os
+import statistics
+import sys
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from game import cards
+from game.schemas import (
+    FullGameCardInfoDTO,
+    FullUserCardInfoDTO,
+    GameEventsDTO,
+    ProcessCardDTO,
+)
+from game.state import GameState
+from managers import encode
+from schemas import ResponseDTO
+
+PLAYERS_NUMBER = 6
+
+
+def make_info() -> FullGameCardInfoDTO:
+    hands, _ = cards.deal(PLAYERS_NUMBER, cards.DECK_SIZE // PLAYERS_NUMBER)
+    users = []
+    for seat, hand in enumerate(hands):
+        user_id = uuid4()
+        hand_cards = cards.to_dtos(hand)
+        users.append(
+            FullUserCardInfoDTO(
+                id=user_id,
+                username=f"player_{seat}",
+                cards=[
+                    {**card.model_dump(), "id": uuid4(), "user_id": user_id}
+                    for card in hand_cards
+                ],
+            )
+        )
+    return FullGameCardInfoDTO(
+        set_id=uuid4(), users=users, trump_suit="H", trump_value=6
+    )
+
+
+def main() -> None:
+    info = make_info()
+    state = GameState(uuid4(), info)
+    moves = [
+        ProcessCardDTO(card_id=card.id, owner_id=user.id, set_id=info.set_id)
+        for user in info.users
+        for card in user.cards
+    ]
+    full_sizes, delta_sizes = [], []
+    for move in moves:
+        state.play(move)
+        full_sizes.append(
+            len(encode(ResponseDTO[FullGameCardInfoDTO](data=state.info)))
+        )
+        delta_sizes.append(
+            len(
+                encode(
+                    ResponseDTO[GameEventsDTO](
+                        data=GameEventsDTO(events=state.pop_events())
+                    )
+                )
+            )
+        )
+    full, delta = statistics.mean(full_sizes), statistics.mean(delta_sizes)
+    print(f"{len(moves)} moves")
+    print(f"full info: {full:>7.0f} bytes per move")
+    print(f"   deltas: {delta:>7.0f} bytes per move, {full / delta:.1f}x less")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Building FullGameCardInfoDTO from the flattened rows after a card is played:
+scan of every card for every row (old path) against one grouping pass.
+
+6 players with full hands, the payload size is measured as well.
+
+Needs the settings from .env, the database is not used.
+
+Usage: python benchmarks/game_info.py [repeats]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from game import cards
+from game.schemas import (
+    FlattenFullGameCardInfoDTO,
+    FullCardInfoDTO,
+    FullEntryCardInfoDTO,
+    FullGameCardInfoDTO,
+    FullUserCardInfoDTO,
+)
+from game.services.game import GameService
+
+PLAYERS_NUMBER = 6
+
+
+class _GameRepository:
+    def __init__(self, rows: list[FlattenFullGameCardInfoDTO]) -> None:
+        self._rows = rows
+
+    async def get_full_game_info(
+        self, game_id: UUID
+    ) -> list[FlattenFullGameCardInfoDTO]:
+        return self._rows
+
+
+class _UnitOfWork:
+    def __init__(self, rows: list[FlattenFullGameCardInfoDTO]) -> None:
+        self.games = _GameRepository(rows)
+
+
+class QuadraticGameService(GameService):
+    async def get_full_game_info(self, game_id: UUID) -> FullGameCardInfoDTO:
+        flatten_info_list = await self._uow.games.get_full_game_info(game_id)
+        user_cards = []
+        entry_cards = []
+        for info in flatten_info_list:
+            card = FullCardInfoDTO(
+                id=info.card_id,
+                suit=info.suit,
+                value=info.value,
+                user_id=info.user_id,
+                entry_id=info.entry_id,
+            )
+            if info.entry_id is None:
+                user_cards.append(card)
+            else:
+                entry_cards.append(card)
+        user_ids = {user.user_id for user in flatten_info_list}
+        return FullGameCardInfoDTO(
+            set_id=flatten_info_list[0].set_id,
+            users=[
+                FullUserCardInfoDTO(
+                    id=info.user_id,
+                    username=info.username,
+                    cards=[
+                        card
+                        for card in user_cards
+                        if card.user_id == info.user_id
+                    ],
+                )
+                for info in flatten_info_list
+                if info.user_id in user_ids
+            ],
+            entry=FullEntryCardInfoDTO(
+                id=entry_cards[0].entry_id,
+                cards=entry_cards,
+            )
+            if entry_cards
+            else None,
+            trump_suit=flatten_info_list[0].trump_suit,
+            trump_value=flatten_info_list[0].trump_value,
+        )
+
+
+def make_rows() -> list[FlattenFullGameCardInfoDTO]:
+    set_id, entry_id = uuid4(), uuid4()
+    cards_per_player = cards.DECK_SIZE // PLAYERS_NUMBER
+    hands, _ = cards.deal(PLAYERS_NUMBER, cards_per_player)
+    rows = []
+    for seat, hand in enumerate(hands):
+        user_id = uuid4()
+        for index, card in enumerate(hand):
+            rows.append(
+                FlattenFullGameCardInfoDTO(
+                    set_id=set_id,
+                    user_id=user_id,
+                    username=f"player_{seat}",
+                    card_id=uuid4(),
+                    suit=cards.get_suit(card),
+                    value=cards.get_value(card),
+                    # The first player has just played a card
+                    entry_id=entry_id if seat == index == 0 else None,
+                    trump_suit="H",
+                    trump_value=6,
+                    opening_player_id=user_id,
+                    round_name=str(cards_per_player),
+                    seat=seat,
+                )
+            )
+    return rows
+
+
+async def main(repeats: int) -> None:
+    rows = make_rows()
+    game_id = uuid4()
+    for service_class in (QuadraticGameService, GameService):
+        service = service_class(_UnitOfWork(rows))
+        start = time.perf_counter()
+        for _ in range(repeats):
+            info = await service.get_full_game_info(game_id)
+        elapsed = (time.perf_counter() - start) / repeats * 1e6
+        print(
+            f"{service_class.__name__:>20}: {elapsed:>7.1f} us, "
+            f"{len(info.users)} users, "
+            f"{len(info.model_dump_json())} bytes"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,74 @@
+"""
+Cost of sending the game state to every player of a game:
+one broadcast of the full info with every hand (old, leaking path),
+a filtered info built and encoded per player (naive views)
+and the public part encoded once with the hand of each player spliced in.
+
+6 players with full hands.
+
+Needs the settings from .env, the database is not used.
+
+Usage: python benchmarks/game_views.py [repeats]
+"""
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from game.schemas import FullGameCardInfoDTO
+from game.views import GameView
+from managers import encode
+from schemas import ResponseDTO
+
+sys.path.append(os.path.dirname(__file__))
+
+from game_deltas import make_info
+
+
+def broadcast(info: FullGameCardInfoDTO) -> list[str]:
+    return [encode(ResponseDTO[FullGameCardInfoDTO](data=info))]
+
+
+def naive_views(info: FullGameCardInfoDTO) -> list[str]:
+    payloads = []
+    for recipient in info.users:
+        view = info.model_copy(
+            update={
+                "users": [
+                    user
+                    if user.id == recipient.id
+                    else user.model_copy(update={"cards": []})
+                    for user in info.users
+                ]
+            }
+        )
+        payloads.append(encode(ResponseDTO[FullGameCardInfoDTO](data=view)))
+    return payloads
+
+
+def spliced_views(info: FullGameCardInfoDTO) -> list[str]:
+    view = GameView(uuid4(), 0, info)
+    return [view.encode_snapshot(user.id) for user in info.users]
+
+
+def main(repeats: int) -> None:
+    info = make_info()
+    for name, send in (
+        ("broadcast", broadcast),
+        ("naive views", naive_views),
+        ("spliced views", spliced_views),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            payloads = send(info)
+        elapsed = (time.perf_counter() - start) / repeats * 1e6
+        print(
+            f"{name:>13}: {elapsed:>7.1f} us, {len(payloads)} payloads, "
+            f"{sum(map(len, payloads))} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
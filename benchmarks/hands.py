@@ -0,0 +1,96 @@
+"""
+Hand handling with lists of CardDTO (old representation)
+against bitmask hands of integer cards.
+
+Every round: check the hand holds a card, count the cards of a suit,
+find the lowest card beating the lead and remove it from the hand.
+Memory is the size of the hands of 100k dealt sets measured by tracemalloc.
+
+Needs the settings from .env, the database is not used.
+
+Usage: python benchmarks/hands.py [rounds]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from game import cards
+from game.schemas import CardDTO
+
+TRUMP_SUIT = "H"
+
+
+def dto_beats(card: CardDTO, other: CardDTO) -> bool:
+    if card.suit == other.suit:
+        return card.value > other.value
+    return card.suit == TRUMP_SUIT
+
+
+def play_dtos(hand: list[CardDTO], lead: CardDTO) -> list[CardDTO]:
+    assert lead not in hand
+    sum(1 for card in hand if card.suit == lead.suit)
+    beating = [card for card in hand if dto_beats(card, lead)]
+    if beating:
+        card = min(beating, key=lambda card: (card.suit, card.value))
+        hand = [other for other in hand if other != card]
+    return hand
+
+
+def play_bitmask(hand: int, lead: int) -> int:
+    assert not cards.has_card(hand, lead)
+    cards.count(cards.filter_suit(hand, cards.get_suit(lead)))
+    for card in cards.iter_hand(hand):
+        if cards.beats(card, lead, TRUMP_SUIT):
+            return hand & ~(1 << card)
+    return hand
+
+
+def measure_memory(build) -> float:
+    tracemalloc.start()
+    hands = [build() for _ in range(100_000)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del hands
+    return size / 2**20
+
+
+def main(rounds: int) -> None:
+    deals = [cards.deal(4, 9) for _ in range(rounds)]
+    dto_deals = [
+        (cards.to_dtos(hands[0]), cards.to_dto(hands[1][0]))
+        for hands, _ in deals
+    ]
+    bitmask_deals = [
+        (cards.to_hand(hands[0]), hands[1][0]) for hands, _ in deals
+    ]
+    for name, play, hands in (
+        ("CardDTO list", play_dtos, dto_deals),
+        ("bitmask", play_bitmask, bitmask_deals),
+    ):
+        start = time.perf_counter()
+        for hand, lead in hands:
+            play(hand, lead)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12}: {elapsed / rounds * 1e6:>6.2f} us per round")
+
+    # Hands are built from fresh objects, as when they are read from rows
+    dealt = [random.sample(range(cards.DECK_SIZE), 9) for _ in range(1000)]
+    for name, build in (
+        (
+            "CardDTO list",
+            lambda: [
+                CardDTO(suit=cards.get_suit(card), value=cards.get_value(card))
+                for card in random.choice(dealt)
+            ],
+        ),
+        ("bitmask", lambda: cards.to_hand(random.choice(dealt))),
+    ):
+        print(f"{name:>12}: {measure_memory(build):>6.1f} MiB per 100k hands")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
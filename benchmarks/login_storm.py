@@ -0,0 +1,137 @@
+"""
+Latency of the moves of a game played during a storm of concurrent
+logins: bcrypt verifying the passwords on the event loop (old path)
+against the bounded thread pool of the password hasher.
+
+4 players play a set with full hands, a move every 10 ms,
+while the logins run. Needs the database from .env with the migrations
+applied.
+
+Usage: python benchmarks/login_storm.py [logins]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete
+
+from auth.hashing import PasswordHasher
+from auth.models import User
+from auth.schemas import UserInLoginDTO
+from auth.services.authentication import JWTAuthenticationService
+from database import async_session_maker
+from game.models import Game
+from game.schemas import LobbyUserInfoDTO, ProcessCardDTO
+from game.services.game import GameService
+from game.state import GameStateManager
+from unitofwork import UnitOfWork
+
+PLAYERS_NUMBER = 4
+PASSWORD = "string"
+
+
+class InlinePasswordHasher(PasswordHasher):
+    async def _run(self, func, *args):
+        return func(*args)
+
+
+async def _create_game(players: list[LobbyUserInfoDTO]) -> UUID:
+    game = await GameService(UnitOfWork()).create_game(players, True)
+    # Play up to the first set with full hands
+    uow = UnitOfWork()
+    service = GameService(uow)
+    async with uow:
+        for _ in range(PLAYERS_NUMBER + 36 // PLAYERS_NUMBER - 2):
+            info = await service.get_full_game_info(game.id)
+            await service.advance_round(game.id, info.set_id)
+        await uow.commit()
+    return game.id
+
+
+async def _play(manager: GameStateManager, game_id: UUID, storm) -> list:
+    view = await manager.get_view(game_id)
+    moves = [
+        ProcessCardDTO(
+            card_id=card.id, owner_id=user.id, set_id=view.public.set_id
+        )
+        for cards in zip(*(view.hands[user.id] for user in view.public.users))
+        for user, card in zip(view.public.users, cards)
+    ]
+    latencies = []
+    for move in moves:
+        if storm.done():
+            break
+        start = time.perf_counter()
+        manager.submit(game_id, move)
+        await manager.join(game_id)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def main(logins: int) -> None:
+    hashed_password = await PasswordHasher().hash(PASSWORD)
+    async with async_session_maker() as session:
+        users = [
+            User(
+                username=f"bench_{uuid4().hex}",
+                hashed_password=hashed_password,
+            )
+            for _ in range(PLAYERS_NUMBER)
+        ]
+        session.add_all(users)
+        await session.commit()
+    players = [
+        LobbyUserInfoDTO(id=user.id, username=user.username, is_leader=False)
+        for user in users
+    ]
+    game_ids = []
+    for name, hasher in (
+        ("event loop", InlinePasswordHasher()),
+        ("thread pool", PasswordHasher()),
+    ):
+        game_ids.append(await _create_game(players))
+        manager = GameStateManager()
+        await manager.get_view(game_ids[-1])
+
+        async def login(index: int) -> None:
+            user = UserInLoginDTO(
+                username=users[index % PLAYERS_NUMBER].username,
+                password=PASSWORD,
+            )
+            service = JWTAuthenticationService(UnitOfWork(), hasher)
+            await service.authenticate_user(user)
+
+        start = time.perf_counter()
+        storm = asyncio.ensure_future(
+            asyncio.gather(*(login(index) for index in range(logins)))
+        )
+        latencies = await _play(manager, game_ids[-1], storm)
+        await storm
+        elapsed = time.perf_counter() - start
+        await manager.close()
+        hasher.close()
+        latencies = sorted(latency * 1000 for latency in latencies)
+        print(
+            f"{name:>11}: {len(latencies):>3} moves, "
+            f"p50 {statistics.median(latencies):>7.1f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)]:>7.1f} ms, "
+            f"max {latencies[-1]:>7.1f} ms; "
+            f"{logins} logins in {elapsed:.1f} s"
+        )
+
+    async with async_session_maker() as session:
+        await session.execute(delete(Game).filter(Game.id.in_(game_ids)))
+        await session.execute(
+            delete(User).filter(User.id.in_([user.id for user in users]))
+        )
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 40))
@@ -0,0 +1,147 @@
+"""
+Commits and statements per persisted move: save_moves for every move
+on its own and for the move ending the round, as without write-behind,
+and for a write-behind batch of a whole set.
+
+2 players play every card of the first set with 2 cards per player.
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/move_commits.py [games]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete, event
+
+from auth.models import User
+from database import async_session_maker, engine
+from game.models import Game
+from game.schemas import LobbyUserInfoDTO, PlayedCardDTO, ProcessCardDTO
+from game.services.game import GameService
+from game.state import GameState
+from unitofwork import UnitOfWork
+
+PLAYERS_NUMBER = 2
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.commits = 0
+        self.statements = 0
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+        event.listen(
+            engine.sync_engine, "before_cursor_execute", self._on_execute
+        )
+
+    def _on_commit(self, connection) -> None:
+        self.commits += 1
+
+    def _on_execute(self, *args) -> None:
+        self.statements += 1
+
+
+async def _create_game(players: list[LobbyUserInfoDTO]) -> UUID:
+    game = await GameService(UnitOfWork()).create_game(players, True)
+    # Play up to the first set with 2 cards per player
+    uow = UnitOfWork()
+    service = GameService(uow)
+    async with uow:
+        for _ in range(PLAYERS_NUMBER):
+            info = await service.get_full_game_info(game.id)
+            await service.advance_round(game.id, info.set_id)
+        await uow.commit()
+    return game.id
+
+
+async def _get_moves(game_id: UUID) -> list[PlayedCardDTO]:
+    """
+    Every card of the set played in turn on the in-memory state.
+    """
+    uow = UnitOfWork()
+    async with uow:
+        info = await GameService(uow).get_full_game_info(game_id)
+    moves = [
+        ProcessCardDTO(card_id=card.id, owner_id=user.id, set_id=info.set_id)
+        for cards in zip(*(user.cards for user in info.users))
+        for user, card in zip(info.users, cards)
+    ]
+    moves[-1].is_round_end = True
+    state = GameState(game_id, info)
+    return [state.play(move) for move in moves]
+
+
+async def _measure(counts: dict, name: str, moves: int, persist) -> None:
+    """
+    Add the commits, statements and time of persisting the moves.
+    """
+    name_counts = counts.setdefault(name, [0, 0, 0, 0.0])
+    commits, statements = COUNTER.commits, COUNTER.statements
+    start = time.perf_counter()
+    await persist
+    name_counts[0] += moves
+    name_counts[1] += COUNTER.commits - commits
+    name_counts[2] += COUNTER.statements - statements
+    name_counts[3] += time.perf_counter() - start
+
+
+async def save_move(game_id: UUID, counts: dict) -> None:
+    service = GameService(UnitOfWork())
+    for move in await _get_moves(game_id):
+        name = "save_moves move"
+        if move.is_round_end:
+            name += " round end"
+        await _measure(counts, name, 1, service.save_moves([move], game_id))
+
+
+async def save_moves(game_id: UUID, counts: dict) -> None:
+    played = await _get_moves(game_id)
+    await _measure(
+        counts,
+        "save_moves batch",
+        len(played),
+        GameService(UnitOfWork()).save_moves(played, game_id),
+    )
+
+
+async def main(games: int) -> None:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"bench_{uuid4().hex}", hashed_password="-")
+            for _ in range(PLAYERS_NUMBER)
+        ]
+        session.add_all(users)
+        await session.commit()
+    players = [
+        LobbyUserInfoDTO(id=user.id, username=user.username, is_leader=False)
+        for user in users
+    ]
+    game_ids = []
+    counts = {}
+    for _ in range(games):
+        for play in (save_move, save_moves):
+            game_ids.append(await _create_game(players))
+            await play(game_ids[-1], counts)
+    for name, (moves, commits, statements, elapsed) in counts.items():
+        print(
+            f"{name:>25}: {commits / moves:>5.2f} commits, "
+            f"{statements / moves:>5.2f} statements, "
+            f"{elapsed / moves * 1000:>6.2f} ms per move"
+        )
+
+    async with async_session_maker() as session:
+        await session.execute(delete(Game).filter(Game.id.in_(game_ids)))
+        await session.execute(
+            delete(User).filter(User.id.in_([user.id for user in users]))
+        )
+        await session.commit()
+
+
+COUNTER = Counter()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,127 @@
+"""
+Latency of a played card until the new game info is published:
+the move saved and get_full_game_info run on the database per move
+(old path) against the in-memory state with write-behind persistence.
+
+4 players play every card of a set with full hands.
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/move_latency.py [games]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from uuid import UUID, uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete
+
+from auth.models import User
+from database import async_session_maker
+from game.models import Game
+from game.schemas import (
+    FullGameCardInfoDTO,
+    LobbyUserInfoDTO,
+    ProcessCardDTO,
+)
+from game.services.game import GameService
+from game.state import GameState, GameStateManager
+from unitofwork import UnitOfWork
+
+PLAYERS_NUMBER = 4
+
+
+async def _create_game(players: list[LobbyUserInfoDTO]) -> UUID:
+    game = await GameService(UnitOfWork()).create_game(players, True)
+    # Play up to the first set with full hands
+    uow = UnitOfWork()
+    service = GameService(uow)
+    async with uow:
+        for _ in range(PLAYERS_NUMBER + 36 // PLAYERS_NUMBER - 2):
+            info = await service.get_full_game_info(game.id)
+            await service.advance_round(game.id, info.set_id)
+        await uow.commit()
+    return game.id
+
+
+async def _get_info(game_id: UUID) -> FullGameCardInfoDTO:
+    uow = UnitOfWork()
+    async with uow:
+        return await GameService(uow).get_full_game_info(game_id)
+
+
+def _get_moves(info: FullGameCardInfoDTO) -> list[ProcessCardDTO]:
+    return [
+        ProcessCardDTO(card_id=card.id, owner_id=user.id, set_id=info.set_id)
+        for user in info.users
+        for card in user.cards
+    ]
+
+
+async def play_on_database(game_id: UUID) -> list[float]:
+    latencies = []
+    uow = UnitOfWork()
+    service = GameService(uow)
+    info = await _get_info(game_id)
+    state = GameState(game_id, info.model_copy(deep=True))
+    for move in _get_moves(info):
+        start = time.perf_counter()
+        await service.save_moves([state.play(move)], game_id)
+        async with uow:
+            await service.get_full_game_info(game_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def play_in_memory(game_id: UUID) -> list[float]:
+    latencies = []
+    manager = GameStateManager()
+    await manager.get_view(game_id)
+    for move in _get_moves(await _get_info(game_id)):
+        start = time.perf_counter()
+        manager.submit(game_id, move)
+        await manager.join(game_id)
+        latencies.append(time.perf_counter() - start)
+    await manager.close()
+    return latencies
+
+
+async def main(games: int) -> None:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"bench_{uuid4().hex}", hashed_password="-")
+            for _ in range(PLAYERS_NUMBER)
+        ]
+        session.add_all(users)
+        await session.commit()
+    players = [
+        LobbyUserInfoDTO(id=user.id, username=user.username, is_leader=False)
+        for user in users
+    ]
+    game_ids = []
+    for name, play in (
+        ("database", play_on_database),
+        ("in memory", play_in_memory),
+    ):
+        latencies = []
+        for _ in range(games):
+            game_ids.append(await _create_game(players))
+            latencies += await play(game_ids[-1])
+        latencies = sorted(latency * 1000 for latency in latencies)
+        print(
+            f"{name:>9}: median {statistics.median(latencies):>6.2f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)]:>6.2f} ms"
+        )
+    async with async_session_maker() as session:
+        await session.execute(delete(Game).filter(Game.id.in_(game_ids)))
+        await session.execute(
+            delete(User).filter(User.id.in_([user.id for user in users]))
+        )
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
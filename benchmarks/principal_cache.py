@@ -0,0 +1,87 @@
+"""
+Authenticated requests to /auth/users/me and /search/users:
+the user of the token looked up in the database on every request
+(old path, the cache is cleared before each one) against the cache
+of the authenticated users.
+
+The requests go through the ASGI app without a server.
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/principal_cache.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from httpx import AsyncClient
+from sqlalchemy import delete, event
+
+from auth.cache import principal_cache
+from auth.models import User
+from auth.services.authentication import JWTAuthenticationService
+from database import async_session_maker, engine
+from main import app
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.statements = 0
+        self.user_lookups = 0
+        event.listen(
+            engine.sync_engine, "before_cursor_execute", self._on_execute
+        )
+
+    def _on_execute(self, connection, cursor, statement, *args) -> None:
+        self.statements += 1
+        if "WHERE users.username = " in statement:
+            self.user_lookups += 1
+
+
+async def main(requests: int) -> None:
+    username = f"bench_{uuid4().hex}"
+    async with async_session_maker() as session:
+        session.add(User(username=username, hashed_password="-"))
+        await session.commit()
+    token = await JWTAuthenticationService.create_access_token(
+        {"sub": username}
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    counter = StatementCounter()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for url, params in (
+            ("/auth/users/me", {}),
+            ("/search/users", {"username": "bench"}),
+        ):
+            for name, is_cached in (("database", False), ("cache", True)):
+                principal_cache.clear()
+                statements = counter.statements
+                user_lookups = counter.user_lookups
+                start = time.perf_counter()
+                for _ in range(requests):
+                    if not is_cached:
+                        principal_cache.clear()
+                    response = await client.get(
+                        url, params=params, headers=headers
+                    )
+                    assert response.status_code == 200
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{url:>15} {name:>8}: "
+                    f"{requests / elapsed:>7.0f} requests/s, "
+                    f"{(counter.statements - statements) / requests:.2f} "
+                    "statements and "
+                    f"{(counter.user_lookups - user_lookups) / requests:.2f} "
+                    "user lookups per request"
+                )
+
+    async with async_session_maker() as session:
+        await session.execute(delete(User).filter_by(username=username))
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,98 @@
+"""
+Reconnect storm: every player of a game reconnects after a few moves.
+Rebuilding the state with get_full_game_info (old path)
+against a snapshot of the in-memory state
+and a resume with the events missed since the last seen version.
+
+Needs the database from .env with the migrations applied.
+
+Usage: python benchmarks/reconnect.py [reconnects]
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import delete
+
+from auth.models import User
+from database import async_session_maker
+from game.models import Game
+from game.schemas import LobbyUserInfoDTO, ProcessCardDTO
+from game.services.game import GameService
+from game.state import GameStateManager
+from unitofwork import UnitOfWork
+
+PLAYERS_NUMBER = 4
+MISSED_MOVES = 3
+
+
+async def main(reconnects: int) -> None:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"bench_{uuid4().hex}", hashed_password="-")
+            for _ in range(PLAYERS_NUMBER)
+        ]
+        session.add_all(users)
+        await session.commit()
+    players = [
+        LobbyUserInfoDTO(id=user.id, username=user.username, is_leader=False)
+        for user in users
+    ]
+    game = await GameService(UnitOfWork()).create_game(players, True)
+    manager = GameStateManager()
+    view = await manager.get_view(game.id)
+    for user in view.public.users[:MISSED_MOVES]:
+        card = view.hands[user.id][0]
+        manager.submit(
+            game.id,
+            ProcessCardDTO(
+                card_id=card.id, owner_id=user.id, set_id=view.public.set_id
+            ),
+        )
+    await manager.join(game.id)
+    user_ids = [user.id for user in view.public.users]
+
+    async def rebuild(user_id):
+        uow = UnitOfWork()
+        async with uow:
+            await GameService(uow).get_full_game_info(game.id)
+
+    async def snapshot(user_id):
+        (await manager.get_view(game.id)).encode_snapshot(user_id)
+
+    async def resume(user_id):
+        await manager.resume(game.id, view.state_id, view.version, user_id)
+
+    for name, reconnect in (
+        ("database", rebuild),
+        ("snapshot", snapshot),
+        ("resume", resume),
+    ):
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                reconnect(user_ids[index % PLAYERS_NUMBER])
+                for index in range(reconnects)
+            )
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>8}: {elapsed * 1000:>8.1f} ms for {reconnects} "
+            f"reconnects, {elapsed / reconnects * 1e6:>7.1f} us each"
+        )
+
+    await manager.close()
+    async with async_session_maker() as session:
+        await session.execute(delete(Game).filter_by(id=game.id))
+        await session.execute(
+            delete(User).filter(User.id.in_([user.id for user in users]))
+        )
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,99 @@
+"""
+Cost of sending one game snapshot to N recipients:
+encoding it for every connection (old path)
+versus encoding it once and sending the same text (new path).
+
+Usage: python benchmarks/ws_encoding.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi.encoders import jsonable_encoder
+
+from game.schemas import (
+    FullGameCardInfoDTO,
+    FullUserCardInfoDTO,
+    FullCardInfoDTO,
+)
+from managers import WSConnectionManager, Room
+from schemas import ResponseDTO
+
+RECIPIENTS = (10, 100, 1000)
+ROUNDS = 20
+
+
+class StarletteLikeWebSocket:
+    async def accept(self) -> None:
+        pass
+
+    async def send_json(self, data) -> None:
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    async def send_text(self, _: str) -> None:
+        pass
+
+
+def _snapshot(players: int = 6, cards: int = 6) -> FullGameCardInfoDTO:
+    users = []
+    for index in range(players):
+        user_id = uuid4()
+        users.append(
+            FullUserCardInfoDTO(
+                id=user_id,
+                username=f"player{index}",
+                cards=[
+                    FullCardInfoDTO(
+                        id=uuid4(), suit="H", value=6 + card, user_id=user_id
+                    )
+                    for card in range(cards)
+                ],
+            )
+        )
+    return FullGameCardInfoDTO(
+        set_id=uuid4(), users=users, trump_suit="S", trump_value=10
+    )
+
+
+async def _old_path(connections: list, data: ResponseDTO) -> None:
+    for connection in connections:
+        await connection.send_json(
+            jsonable_encoder(data.model_dump(by_alias=True))
+        )
+
+
+async def main() -> None:
+    data = ResponseDTO[FullGameCardInfoDTO](data=_snapshot())
+    for recipients in RECIPIENTS:
+        manager = WSConnectionManager()
+        connections = []
+        for _ in range(recipients):
+            connection = StarletteLikeWebSocket()
+            connections.append(connection)
+            await manager.connect(connection, str(uuid4()), (Room.SEARCH,))
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await _old_path(connections, data)
+        old = (time.perf_counter() - start) / ROUNDS
+
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await manager.publish(Room.SEARCH, data)
+            await manager.drain()
+        new = (time.perf_counter() - start) / ROUNDS
+
+        print(
+            f"{recipients:>5} recipients: old {old * 1000:>9.3f} ms "
+            f"new {new * 1000:>8.3f} ms ({old / new:.1f}x)"
+        )
+        await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Per-move fan-out cost of the websocket manager
+as the number of concurrent games grows.
+
+Compares the global broadcast with the room-scoped publish.
+
+Usage: python benchmarks/ws_fanout.py
+"""
+import asyncio
+import os
+import sys
+import time
+from uuid import uuid4
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pydantic import BaseModel
+
+from managers import WSConnectionManager, Room
+from schemas import ResponseDTO
+
+PLAYERS_PER_GAME = 4
+GAMES = (1, 10, 100, 500)
+MOVES = 50
+
+
+class CountingWebSocket:
+    sends = 0
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, _) -> None:
+        CountingWebSocket.sends += 1
+
+
+class MoveDTO(BaseModel):
+    card_id: str
+    set_id: str
+
+
+async def _fill(manager: WSConnectionManager, games: int) -> list[str]:
+    rooms = []
+    for _ in range(games):
+        room = Room.game(uuid4())
+        rooms.append(room)
+        for _ in range(PLAYERS_PER_GAME):
+            await manager.connect(
+                CountingWebSocket(), str(uuid4()), rooms=(room,)
+            )
+    return rooms
+
+
+async def _measure(games: int) -> None:
+    manager = WSConnectionManager()
+    rooms = await _fill(manager, games)
+    data = ResponseDTO[MoveDTO](
+        data=MoveDTO(card_id=str(uuid4()), set_id=str(uuid4()))
+    )
+    for name, move in (
+        ("broadcast", lambda: manager.broadcast(data)),
+        ("publish", lambda: manager.publish(rooms[0], data)),
+    ):
+        CountingWebSocket.sends = 0
+        elapsed = 0.0
+        for _ in range(MOVES):
+            start = time.perf_counter()
+            await move()
+            elapsed += time.perf_counter() - start
+            await manager.drain()
+        print(
+            f"{games:>5} games {name:>10}: "
+            f"{CountingWebSocket.sends // MOVES:>6} sends/move "
+            f"{elapsed / MOVES * 1000:>9.3f} ms/move"
+        )
+    await manager.close()
+
+
+async def main() -> None:
+    for games in GAMES:
+        await _measure(games)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1 +1 @@
-from .models import Friendship, User
+from .models import Friendship, RevokedToken, User
@@ -0,0 +1,98 @@
+"""
+In-memory cache of the users authenticated by their access tokens.
+
+A token is verified and its user looked up in the database once,
+the next requests with the same token get the user from the cache.
+Entries are keyed by a hash of the token, so the tokens themselves
+are not kept, and live until the TTL or the token expiry, whichever
+comes first. The least recently used entries are evicted when the cache
+is full. Usernames never change, so entries only have to be invalidated
+explicitly when a user or a token is revoked.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+
+from auth.schemas import PrincipalCacheStatsDTO, UserInfoDTO
+from config import AUTH_PRINCIPAL_CACHE_SIZE, AUTH_PRINCIPAL_CACHE_TTL
+
+
+class PrincipalCache:
+    def __init__(
+        self,
+        max_size: int = AUTH_PRINCIPAL_CACHE_SIZE,
+        ttl: float = AUTH_PRINCIPAL_CACHE_TTL,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        # Token hash -> (user, monotonic expiry time)
+        self._entries: OrderedDict[
+            str, tuple[UserInfoDTO, float]
+        ] = OrderedDict()
+        self._user_keys: dict[str, set[str]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, token: str) -> UserInfoDTO | None:
+        key = self._get_key(token)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry[0]
+
+    def set(self, token: str, user: UserInfoDTO, exp: float) -> None:
+        """
+        Cache the user of a verified token expiring at exp (unix time).
+        """
+        lifetime = min(self._ttl, exp - time.time())
+        if lifetime <= 0 or self._max_size <= 0:
+            return
+        key = self._get_key(token)
+        self._remove(key)
+        self._entries[key] = (user, time.monotonic() + lifetime)
+        self._user_keys.setdefault(user.username, set()).add(key)
+        while len(self._entries) > self._max_size:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        self._remove(self._get_key(token))
+
+    def invalidate_user(self, username: str) -> None:
+        for key in list(self._user_keys.get(username, ())):
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._user_keys.clear()
+
+    def get_stats(self) -> PrincipalCacheStatsDTO:
+        return PrincipalCacheStatsDTO(
+            size=len(self._entries),
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+        )
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._user_keys[entry[0].username]
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[entry[0].username]
+
+    @staticmethod
+    def _get_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+
+principal_cache = PrincipalCache()
@@ -4,7 +4,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security.utils import get_authorization_scheme_param
 from starlette.requests import Request
 
-from auth.exceptions import AuthenticationException
+from auth.exceptions import (
+    AuthenticationException,
+    RevocationsUnavailableException,
+)
 from auth.schemas import UserInfoDTO
 from auth.services.authentication import JWTAuthenticationService
 from dependencies import UOWDep
@@ -21,6 +24,12 @@ def _http_exception_401() -> HTTPException:
 http_exception_401_dep = Annotated[HTTPException, Depends(_http_exception_401)]
 
 
+def _http_exception_503(exc: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)
+    )
+
+
 class _JWT:
     async def __call__(
         self, request: Request, http_exception: http_exception_401_dep
@@ -46,6 +55,8 @@ class _AuthenticatedUser:
             user = await JWTAuthenticationService(uow).get_current_user(token)
         except AuthenticationException:
             raise http_exception
+        except RevocationsUnavailableException as e:
+            raise _http_exception_503(e)
         return user
 
 
@@ -4,3 +4,22 @@ class AuthenticationException(ValueError):
 
 class RegistrationException(ValueError):
     pass
+
+
+class ThrottlingException(Exception):
+    """
+    Too many attempts, the client may retry after retry_after seconds.
+
+    Not a ValueError, so it is not taken for wrong credentials.
+    """
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RevocationsUnavailableException(Exception):
+    """
+    The revoked tokens could not be loaded,
+    so no stateless token can be trusted until they are.
+    """
@@ -0,0 +1,128 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is slow by design, a hash or a check takes hundreds
+of milliseconds, which would freeze every connection of the worker
+if computed on the event loop. The calls run in a thread pool
+instead (bcrypt releases the GIL), at most one per worker thread,
+and the others wait for a free thread. When too many are waiting
+already, new calls are refused rather than queued for seconds.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
+
+from auth.exceptions import ThrottlingException
+from auth.schemas import PasswordHasherStatsDTO
+from config import AUTH_HASH_QUEUE_SIZE, AUTH_HASH_WORKERS
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        workers: int = AUTH_HASH_WORKERS,
+        queue_size: int = AUTH_HASH_QUEUE_SIZE,
+    ) -> None:
+        self._workers = workers
+        self._queue_size = queue_size
+        self._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._running = 0
+        self._queued = 0
+        self._max_queued = 0
+        self._calls = 0
+        self._rejected = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Check the password, a hash of an unknown format never matches.
+        """
+        try:
+            return await self._run(
+                self._pwd_context.verify, password, hashed_password
+            )
+        except UnknownHashError:
+            return False
+
+    def start(self) -> None:
+        """
+        Start the worker threads and load the bcrypt backend
+        up front instead of on the first login.
+        """
+        self._get_executor()
+        self._pwd_context.handler().get_backend()
+
+    def get_stats(self) -> PasswordHasherStatsDTO:
+        return PasswordHasherStatsDTO(
+            workers=self._workers,
+            running=self._running,
+            queued=self._queued,
+            max_queued=self._max_queued,
+            calls=self._calls,
+            rejected=self._rejected,
+            total_wait_ms=self._wait_time * 1000,
+            max_wait_ms=self._max_wait_time * 1000,
+        )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self._queued >= self._queue_size:
+            self._rejected += 1
+            raise ThrottlingException(
+                "Too many password checks in progress", retry_after=1
+            )
+        start = time.perf_counter()
+        self._queued += 1
+        self._max_queued = max(self._max_queued, self._queued)
+        try:
+            await semaphore.acquire()
+        finally:
+            self._queued -= 1
+        wait_time = time.perf_counter() - start
+        self._calls += 1
+        self._wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        self._running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            self._running -= 1
+            semaphore.release()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # The semaphore works within one event loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._workers)
+            self._loop = loop
+        return self._semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self._workers, thread_name_prefix="password_hasher"
+            )
+        return self._executor
+
+
+password_hasher = PasswordHasher()
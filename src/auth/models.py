@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import enum
+from datetime import datetime
 from typing import TYPE_CHECKING
 import uuid
 
@@ -63,3 +64,23 @@ class User(Base):
     lobbies: Mapped[list["Lobby"]] = relationship(
         "Lobby", secondary="lobby_players", back_populates="players"
     )
+
+
+class RevokedToken(Base):
+    """
+    Stateless access tokens revoked before they expire,
+    kept until then (see ``auth.revocations``).
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    created_at: Mapped[created_at]
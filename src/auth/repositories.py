@@ -1,7 +1,8 @@
+from datetime import datetime
 from typing import Sequence, Literal
 from uuid import UUID
 
-from sqlalchemy import select, or_
+from sqlalchemy import delete, select, or_
 
 from auth import models, Friendship
 from auth.schemas import UserInDBDTO, UserInfoDTO
@@ -22,6 +23,11 @@ class UserRepository(SQLAlchemyRepository):
         created_user = await super().add(**insert_data)
         return UserInfoDTO.model_validate(created_user)
 
+    async def exists(self, /, **data: str | int) -> bool:
+        query = select(select(self.model.id).filter_by(**data).exists())
+        res = await self._session.execute(query)
+        return bool(res.scalar())
+
     async def get_all_friends(
         self,
         /,
@@ -93,3 +99,23 @@ class UserRepository(SQLAlchemyRepository):
 
 class FriendshipRepository(SQLAlchemyRepository):
     model = models.Friendship
+
+
+class RevokedTokenRepository(SQLAlchemyRepository):
+    model = models.RevokedToken
+
+    async def get_active_ids(self) -> set[UUID]:
+        """
+        Ids of the revoked tokens which have not expired yet.
+        """
+        query = select(self.model.jti).filter(
+            self.model.expires_at > datetime.utcnow()
+        )
+        res = await self._session.execute(query)
+        return set(res.scalars().all())
+
+    async def remove_expired(self) -> None:
+        stmt = delete(self.model).filter(
+            self.model.expires_at <= datetime.utcnow()
+        )
+        await self._session.execute(stmt)
@@ -0,0 +1,96 @@
+"""
+In-memory list of the revoked stateless access tokens.
+
+Stateless tokens are verified without the database, so the ids
+of the tokens revoked before they expire are kept in memory.
+They are loaded from the revoked_tokens table and reloaded every refresh
+interval, so a token revoked on another worker is refused here after
+at most that interval. Expired tokens are deleted from the table
+on every refresh, which keeps the list short.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError
+
+from auth.exceptions import RevocationsUnavailableException
+from config import AUTH_REVOCATION_REFRESH_INTERVAL
+from unitofwork import IUnitOfWork, UnitOfWork
+
+
+class TokenRevocationList:
+    def __init__(
+        self,
+        uow_factory: Callable[[], IUnitOfWork] = UnitOfWork,
+        refresh_interval: float = AUTH_REVOCATION_REFRESH_INTERVAL,
+    ) -> None:
+        self._uow_factory = uow_factory
+        self._refresh_interval = refresh_interval
+        self._revoked: set[UUID] | None = None
+        self._revoked_since_refresh: set[UUID] = set()
+        self._refreshed_at = 0.0
+        self._loading: asyncio.Task | None = None
+
+    async def is_revoked(self, jti: UUID) -> bool:
+        if self._revoked is None:
+            await self._load()
+        elif time.monotonic() - self._refreshed_at >= self._refresh_interval:
+            await self.refresh()
+        assert self._revoked is not None
+        return jti in self._revoked
+
+    async def _load(self) -> None:
+        """
+        Load the list once for all the checks waiting for it,
+        so a cold start runs one query.
+        """
+        if self._loading is None:
+            self._loading = asyncio.create_task(self.refresh())
+            self._loading.add_done_callback(self._on_loaded)
+        # A cancelled check does not cancel the load of the others
+        await asyncio.shield(self._loading)
+
+    def _on_loaded(self, task: asyncio.Task) -> None:
+        self._loading = None
+
+    async def refresh(self) -> None:
+        # The checks made while loading use the current list
+        self._refreshed_at = time.monotonic()
+        self._revoked_since_refresh = set()
+        uow = self._uow_factory()
+        try:
+            async with uow:
+                await uow.revoked_tokens.remove_expired()
+                revoked = await uow.revoked_tokens.get_active_ids()
+                await uow.commit()
+        except Exception as exc:
+            if self._revoked is None:
+                raise RevocationsUnavailableException(
+                    "Could not load the revoked tokens"
+                ) from exc
+            # The current list is kept until the next refresh
+            return
+        self._revoked = revoked | self._revoked_since_refresh
+
+    async def revoke(
+        self, jti: UUID, user_id: UUID, expires_at: datetime
+    ) -> None:
+        try:
+            uow = self._uow_factory()
+            async with uow:
+                await uow.revoked_tokens.add(
+                    jti=jti, user_id=user_id, expires_at=expires_at
+                )
+                await uow.commit()
+        except IntegrityError:
+            # Token revoked already
+            pass
+        self._revoked_since_refresh.add(jti)
+        if self._revoked is not None:
+            self._revoked.add(jti)
+
+
+token_revocations = TokenRevocationList()
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, status, HTTPException, WebSocket
+import math
+
+from fastapi import APIRouter, status, HTTPException, Request, WebSocket
 from fastapi.websockets import WebSocketDisconnect
 
 from auth.dependencies import (
     AuthenticatedUserDep,
+    JWTDep,
     UOWDep,
     http_exception_401_dep,
 )
-from auth.exceptions import AuthenticationException, RegistrationException
+from auth.exceptions import (
+    AuthenticationException,
+    RegistrationException,
+    ThrottlingException,
+)
 from auth.schemas import (
     UserInCreateDTO,
     UserInLoginDTO,
@@ -17,6 +24,7 @@ from auth.schemas import (
 from auth.services.authentication import JWTAuthenticationService
 from auth.services.friend import M2MFriendService
 from auth.services.registration import RegistrationService
+from auth.throttling import login_limiter
 from game.dependencies import WSAuthenticatedUserDep
 from game.schemas import LobbyInfoDTO
 from game.services.lobby import LobbyService
@@ -31,19 +39,45 @@ from schemas import ResponseDTO
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
+def _http_exception_429(exc: ThrottlingException) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(exc),
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
 @router.post("/login")
 async def login(
     user: UserInLoginDTO,
     uow: UOWDep,
+    request: Request,
     http_exception: http_exception_401_dep,
 ) -> ResponseDTO[TokenDTO]:
     try:
+        login_limiter.check(
+            user.username, request.client.host if request.client else None
+        )
         token = await JWTAuthenticationService(uow).authenticate_user(user)
     except AuthenticationException:
         raise http_exception
+    except ThrottlingException as e:
+        raise _http_exception_429(e)
     return ResponseDTO[TokenDTO](data=token)
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token: JWTDep,
+    uow: UOWDep,
+    http_exception: http_exception_401_dep,
+) -> None:
+    try:
+        await JWTAuthenticationService(uow).revoke_token(token)
+    except AuthenticationException:
+        raise http_exception
+
+
 @router.get("/users/me")
 async def get_current_user(
     user: AuthenticatedUserDep,
@@ -59,6 +93,8 @@ async def register_user(
         new_user = await RegistrationService(uow).register_user(user)
     except RegistrationException as e:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ThrottlingException as e:
+        raise _http_exception_429(e)
     return ResponseDTO[UserInfoDTO](data=new_user)
 
 
@@ -83,7 +119,7 @@ async def add_friend(
     When a user sends a friend request, the server sends a notification to the recipient.
     The recipient can accept or reject the request.
     """
-    await ws_manager.connect(websocket, user.id)
+    connection_id = await ws_manager.connect(websocket, user.id)
     friend_service = M2MFriendService(uow)
     requests = await friend_service.get_friend_requests(user)
     await ws_manager.send(
@@ -106,14 +142,14 @@ async def add_friend(
                 ),
             )
     except WebSocketDisconnect:
-        ws_manager.disconnect(user.id)
+        ws_manager.disconnect(connection_id)
 
 
 @router.websocket("/ws/friends/invite")
 async def invite_friend(
     websocket: WebSocket, user: WSAuthenticatedUserDep, uow: UOWDep
 ) -> None:
-    await ws_manager.connect(websocket, user.id)
+    connection_id = await ws_manager.connect(websocket, user.id)
     try:
         while True:
             data = await websocket.receive_json()
@@ -135,4 +171,4 @@ async def invite_friend(
                 ),
             )
     except WebSocketDisconnect:
-        ws_manager.disconnect(user.id)
+        ws_manager.disconnect(connection_id)
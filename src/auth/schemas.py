@@ -10,6 +10,32 @@ class TokenDTO(BaseModel):
     token_type: str
 
 
+class PasswordHasherStatsDTO(BaseModel):
+    workers: int
+    running: int
+    queued: int
+    max_queued: int
+    calls: int
+    rejected: int
+    total_wait_ms: float
+    max_wait_ms: float
+
+
+class LoginLimiterStatsDTO(BaseModel):
+    allowed: int
+    throttled_by_username: int
+    throttled_by_ip: int
+    tracked_usernames: int
+    tracked_ips: int
+
+
+class PrincipalCacheStatsDTO(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
 class UserInLoginDTO(BaseModel):
     username: str
     password: str
@@ -1,21 +1,34 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
+from uuid import UUID, uuid4
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from passlib.exc import UnknownHashError
 from sqlalchemy.orm.exc import NoResultFound
 
+from auth.cache import PrincipalCache, principal_cache
 from auth.exceptions import AuthenticationException
+from auth.hashing import PasswordHasher, password_hasher
+from auth.revocations import TokenRevocationList, token_revocations
+from auth.tokens import token_codec
 from auth.schemas import TokenDTO, UserInDBDTO, UserInfoDTO, UserInLoginDTO
-from config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_STATELESS_TOKENS
 from unitofwork import IUnitOfWork
 
 
 class IAuthenticationService(ABC):
-    def __init__(self, uof: IUnitOfWork):
+    def __init__(
+        self,
+        uof: IUnitOfWork,
+        hasher: PasswordHasher = password_hasher,
+        cache: PrincipalCache = principal_cache,
+        revocations: TokenRevocationList = token_revocations,
+        stateless: bool = AUTH_STATELESS_TOKENS,
+    ):
         self._uof: IUnitOfWork = uof
-        self._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._hasher = hasher
+        self._cache = cache
+        self._revocations = revocations
+        self._stateless = stateless
 
     @abstractmethod
     async def authenticate_user(self, data: UserInLoginDTO):
@@ -28,13 +41,7 @@ class IAuthenticationService(ABC):
     async def _verify_password(
         self, plain_password: str, hashed_password: str
     ) -> None:
-        try:
-            is_password_verified = self._pwd_context.verify(
-                plain_password, hashed_password
-            )
-        except UnknownHashError:
-            raise ValueError("Incorrect password")
-        if not is_password_verified:
+        if not await self._hasher.verify(plain_password, hashed_password):
             raise ValueError("Incorrect password")
 
     async def _get_db_user_by_username(
@@ -44,6 +51,13 @@ class IAuthenticationService(ABC):
 
 
 class JWTAuthenticationService(IAuthenticationService):
+    """
+    Tokens carry the username as subject and, in stateless mode,
+    the user id and username as claims, with a token id to revoke them.
+    Tokens of both formats are accepted, only the username-only ones
+    need the database to get the user.
+    """
+
     async def authenticate_user(self, user: UserInLoginDTO) -> TokenDTO:
         try:
             async with self._uof:
@@ -52,20 +66,72 @@ class JWTAuthenticationService(IAuthenticationService):
         except (NoResultFound, ValueError):
             raise AuthenticationException("Incorrect username or password")
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        data = {"sub": user.username}
+        if self._stateless:
+            data.update(
+                uid=str(db_user.id),
+                username=user.username,
+                jti=str(uuid4()),
+            )
         access_token = await self.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
+            data=data, expires_delta=access_token_expires
         )
+        if not self._stateless:
+            # The first requests with the new token skip the database
+            self._cache.set(
+                access_token,
+                db_user.to_user_info(),
+                jwt.get_unverified_claims(access_token)["exp"],
+            )
         return TokenDTO(access_token=access_token, token_type="bearer")
 
     async def get_current_user(self, token: str) -> UserInfoDTO:
+        """
+        User of the token, from its claims, from the cache of the tokens
+        verified already or from the database.
+        """
+        user = self._cache.get(token)
+        if user is not None:
+            return user
         try:
+            payload = self._decode_token(token)
+            if "uid" in payload:
+                return await self._get_stateless_user(payload)
             async with self._uof:
-                db_user = await self._get_db_user_by_jwt(
-                    token, returns=("id", "username")
+                db_user = await self._get_db_user_by_username(
+                    payload["sub"], returns=("id", "username")
                 )
+        except (JWTError, NoResultFound, ValueError, KeyError):
+            raise AuthenticationException("Could not validate credentials")
+        user = db_user.to_user_info()
+        if "exp" in payload:
+            self._cache.set(token, user, payload["exp"])
+        return user
+
+    async def revoke_token(self, token: str) -> None:
+        """
+        Revoke a stateless token until it expires.
+
+        Username-only tokens can't be revoked,
+        they are only dropped from the cache of this worker.
+        """
+        self._cache.invalidate(token)
+        try:
+            payload = self._decode_token(token)
         except JWTError:
             raise AuthenticationException("Could not validate credentials")
-        return db_user.to_user_info()
+        if "jti" not in payload:
+            return
+        await self._revocations.revoke(
+            UUID(payload["jti"]),
+            UUID(payload["uid"]),
+            datetime.utcfromtimestamp(payload["exp"]),
+        )
+
+    async def _get_stateless_user(self, payload: dict) -> UserInfoDTO:
+        if await self._revocations.is_revoked(UUID(payload["jti"])):
+            raise JWTError
+        return UserInfoDTO(id=payload["uid"], username=payload["username"])
 
     @staticmethod
     async def create_access_token(
@@ -75,16 +141,11 @@ class JWTAuthenticationService(IAuthenticationService):
             expires_delta = timedelta(minutes=15)
         expire = datetime.utcnow() + expires_delta
         data.update({"exp": expire})
-        encoded_jwt = jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
-        return str(encoded_jwt)
+        return token_codec.encode(data)
 
-    async def _get_db_user_by_jwt(self, token: str, **kwargs) -> UserInDBDTO:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise JWTError
-        try:
-            db_user = await self._get_db_user_by_username(username, **kwargs)
-        except NoResultFound:
+    @staticmethod
+    def _decode_token(token: str) -> dict:
+        payload = token_codec.decode(token)
+        if payload.get("sub") is None:
             raise JWTError
-        return db_user
+        return payload
@@ -1,17 +1,26 @@
-from passlib.context import CryptContext
 from sqlalchemy.exc import IntegrityError
 
 from auth.exceptions import RegistrationException
+from auth.hashing import PasswordHasher, password_hasher
 from auth.schemas import UserInCreateDTO, UserInfoDTO
 from unitofwork import IUnitOfWork
 
 
 class RegistrationService:
-    def __init__(self, uow: IUnitOfWork):
+    def __init__(
+        self, uow: IUnitOfWork, hasher: PasswordHasher = password_hasher
+    ):
         self._uof: IUnitOfWork = uow
-        self._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._hasher = hasher
 
     async def register_user(self, user: UserInCreateDTO) -> UserInfoDTO:
+        # A taken username is refused without paying for the hash,
+        # the unique constraint still catches concurrent registrations
+        async with self._uof:
+            if await self._uof.users.exists(username=user.username):
+                raise RegistrationException(
+                    "User with this username already exists"
+                )
         hashed_password = await self._hash_password(user.password)
         try:
             async with self._uof:
@@ -31,4 +40,4 @@ class RegistrationService:
         )
 
     async def _hash_password(self, plain_password: str) -> str:
-        return self._pwd_context.hash(plain_password)
+        return await self._hasher.hash(plain_password)
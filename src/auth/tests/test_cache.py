@@ -0,0 +1,65 @@
+import time
+from uuid import uuid4
+
+import pytest
+
+from auth.cache import PrincipalCache
+from auth.schemas import UserInfoDTO
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_user(username: str = "cached") -> UserInfoDTO:
+    return UserInfoDTO(id=uuid4(), username=username)
+
+
+class TestPrincipalCache:
+    async def test_hits_and_misses(self):
+        cache, user = PrincipalCache(), make_user()
+        assert cache.get("token") is None
+        cache.set("token", user, time.time() + 60)
+        assert cache.get("token") == user
+        assert cache.get("other_token") is None
+        stats = cache.get_stats()
+        assert (stats.size, stats.hits, stats.misses) == (1, 1, 2)
+
+    async def test_entries_expire_with_token(self):
+        cache = PrincipalCache(ttl=60)
+        cache.set("expired", make_user(), time.time() - 1)
+        cache.set("expiring", make_user(), time.time() + 0.05)
+        assert cache.get("expired") is None
+        assert cache.get("expiring") is not None
+        time.sleep(0.05)
+        assert cache.get("expiring") is None
+        assert cache.get_stats().size == 0
+
+    async def test_entries_expire_with_ttl(self):
+        cache = PrincipalCache(ttl=0.05)
+        cache.set("token", make_user(), time.time() + 60)
+        time.sleep(0.05)
+        assert cache.get("token") is None
+
+    async def test_least_recently_used_is_evicted(self):
+        cache = PrincipalCache(max_size=2)
+        exp = time.time() + 60
+        for token in ("first", "second"):
+            cache.set(token, make_user(token), exp)
+        cache.get("first")
+        cache.set("third", make_user("third"), exp)
+        assert cache.get("second") is None
+        assert cache.get("first") is not None
+        assert cache.get("third") is not None
+        assert cache.get_stats().evictions == 1
+
+    async def test_invalidation(self):
+        cache, user = PrincipalCache(), make_user()
+        exp = time.time() + 60
+        for token in ("first", "second", "third"):
+            cache.set(token, user, exp)
+        cache.set("other", make_user("other"), exp)
+        cache.invalidate("first")
+        assert cache.get("first") is None
+        cache.invalidate_user(user.username)
+        assert cache.get("second") is None
+        assert cache.get("third") is None
+        assert cache.get("other") is not None
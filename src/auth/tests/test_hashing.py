@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from auth.exceptions import ThrottlingException
+from auth.hashing import PasswordHasher
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestPasswordHasher:
+    async def test_hash_and_verify(self):
+        hasher = PasswordHasher(workers=1)
+        hashed_password = await hasher.hash("string")
+        assert await hasher.verify("string", hashed_password)
+        assert not await hasher.verify("wrong", hashed_password)
+        assert not await hasher.verify("string", "not a hash")
+        hasher.close()
+
+    async def test_started_hasher(self):
+        hasher = PasswordHasher(workers=1)
+        hasher.start()
+        assert await hasher.verify("string", await hasher.hash("string"))
+        hasher.close()
+
+    async def test_event_loop_is_not_blocked(self):
+        hasher = PasswordHasher(workers=1)
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        await hasher.hash("string")
+        ticker.cancel()
+        hasher.close()
+        assert ticks > 5
+
+    async def test_calls_over_limit_are_queued(self):
+        hasher = PasswordHasher(workers=2)
+        await asyncio.gather(*(hasher.hash("string") for _ in range(5)))
+        stats = hasher.get_stats()
+        hasher.close()
+        assert stats.calls == 5
+        assert stats.max_queued == 3
+        assert stats.running == stats.queued == 0
+        assert stats.max_wait_ms > 0
+
+    async def test_calls_over_queue_size_are_refused(self):
+        hasher = PasswordHasher(workers=1, queue_size=1)
+        results = await asyncio.gather(
+            *(hasher.hash("string") for _ in range(4)),
+            return_exceptions=True,
+        )
+        stats = hasher.get_stats()
+        hasher.close()
+        refused = [
+            result
+            for result in results
+            if isinstance(result, ThrottlingException)
+        ]
+        assert len(refused) == stats.rejected == 2
+        assert stats.calls == 2
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from jose import jwt
+from sqlalchemy import event, select
+
+from auth.exceptions import (
+    AuthenticationException,
+    RevocationsUnavailableException,
+)
+from auth.models import RevokedToken, User
+from auth.revocations import TokenRevocationList, token_revocations
+from auth.schemas import UserInLoginDTO
+from auth.services.authentication import JWTAuthenticationService
+from database import async_session_maker, engine
+from unitofwork import UnitOfWork
+
+pytestmark = pytest.mark.asyncio
+
+HASHED_PASSWORD = (
+    "$2b$12$q.w27JQIcsvQFz75UFRKZ.K3P4qAxSb84JjcKgO/7rXcs0sLAxjEK"
+)
+
+
+async def create_user(username: str) -> User:
+    async with async_session_maker() as session:
+        user = User(username=username, hashed_password=HASHED_PASSWORD)
+        session.add(user)
+        await session.commit()
+    return user
+
+
+class UnavailableUnitOfWork(UnitOfWork):
+    async def __aenter__(self):
+        raise ConnectionError("database is unavailable")
+
+
+class TestTokenRevocationList:
+    async def test_revocations_reach_other_workers(self):
+        user = await create_user("revocations")
+        revocations = TokenRevocationList()
+        # Reloaded on every check
+        other_revocations = TokenRevocationList(refresh_interval=0)
+        revoked_jti, expired_jti = uuid4(), uuid4()
+        assert not await other_revocations.is_revoked(revoked_jti)
+        await revocations.revoke(
+            revoked_jti, user.id, datetime.utcnow() + timedelta(minutes=1)
+        )
+        await revocations.revoke(
+            revoked_jti, user.id, datetime.utcnow() + timedelta(minutes=1)
+        )
+        await revocations.revoke(
+            expired_jti, user.id, datetime.utcnow() - timedelta(minutes=1)
+        )
+        assert await revocations.is_revoked(revoked_jti)
+        assert await other_revocations.is_revoked(revoked_jti)
+        assert not await other_revocations.is_revoked(expired_jti)
+
+    async def test_expired_tokens_are_deleted(self):
+        user = await create_user("revocations_expired")
+        revocations = TokenRevocationList()
+        revoked_jti, expired_jti = uuid4(), uuid4()
+        await revocations.revoke(
+            revoked_jti, user.id, datetime.utcnow() + timedelta(minutes=1)
+        )
+        await revocations.revoke(
+            expired_jti, user.id, datetime.utcnow() - timedelta(minutes=1)
+        )
+        await revocations.refresh()
+        query = select(RevokedToken.jti).filter(
+            RevokedToken.jti.in_((revoked_jti, expired_jti))
+        )
+        async with async_session_maker() as session:
+            jtis = (await session.execute(query)).scalars().all()
+        assert jtis == [revoked_jti]
+
+    async def test_cold_start_loads_once(self):
+        loads = 0
+
+        def uow_factory() -> UnitOfWork:
+            nonlocal loads
+            loads += 1
+            return UnitOfWork()
+
+        revocations = TokenRevocationList(uow_factory=uow_factory)
+        revoked = await asyncio.gather(
+            *(revocations.is_revoked(uuid4()) for _ in range(10))
+        )
+        assert revoked == [False] * 10
+        assert loads == 1
+
+    async def test_unavailable_list(self):
+        revocations = TokenRevocationList(uow_factory=UnavailableUnitOfWork)
+        with pytest.raises(RevocationsUnavailableException):
+            await revocations.is_revoked(uuid4())
+
+
+class TestStatelessTokens:
+    async def test_user_is_read_from_claims(self):
+        user = await create_user("stateless")
+        revocations = TokenRevocationList()
+        service = JWTAuthenticationService(
+            UnitOfWork(), revocations=revocations, stateless=True
+        )
+        token = await service.authenticate_user(
+            UserInLoginDTO(username="stateless", password="string")
+        )
+        claims = jwt.get_unverified_claims(token.access_token)
+        assert claims["sub"] == claims["username"] == "stateless"
+        assert claims["uid"] == str(user.id)
+        await revocations.refresh()
+        statements = []
+
+        def on_execute(connection, cursor, statement, *args) -> None:
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+        try:
+            current_user = await service.get_current_user(token.access_token)
+        finally:
+            event.remove(
+                engine.sync_engine, "before_cursor_execute", on_execute
+            )
+        assert current_user.id == user.id
+        assert current_user.username == "stateless"
+        assert statements == []
+
+        await service.revoke_token(token.access_token)
+        with pytest.raises(AuthenticationException):
+            await service.get_current_user(token.access_token)
+
+    async def test_username_only_tokens_are_accepted(self):
+        user = await create_user("username_only")
+        service = JWTAuthenticationService(UnitOfWork(), stateless=True)
+        token = await JWTAuthenticationService.create_access_token(
+            {"sub": "username_only"}
+        )
+        assert (await service.get_current_user(token)).id == user.id
+
+    async def test_unavailable_revocations_are_503(
+        self, ac: AsyncClient, monkeypatch
+    ):
+        await create_user("revocations_503")
+        token = await JWTAuthenticationService(
+            UnitOfWork(), stateless=True
+        ).authenticate_user(
+            UserInLoginDTO(username="revocations_503", password="string")
+        )
+        monkeypatch.setattr(
+            token_revocations, "_uow_factory", UnavailableUnitOfWork
+        )
+        monkeypatch.setattr(token_revocations, "_revoked", None)
+        response = await ac.get(
+            "/auth/friends",
+            headers={"Authorization": f"Bearer {token.access_token}"},
+        )
+        assert response.status_code == 503
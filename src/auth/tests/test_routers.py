@@ -1,10 +1,16 @@
+import asyncio
+from uuid import uuid4
+
 import pytest
-from httpx import AsyncClient
-from sqlalchemy import select
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, select
 
+from auth.hashing import password_hasher
 from auth.models import User
 from auth.services.authentication import JWTAuthenticationService
-from database import async_session_maker
+from auth.throttling import login_limiter
+from database import async_session_maker, engine
+from main import app
 
 pytestmark = pytest.mark.asyncio
 
@@ -101,6 +107,86 @@ class TestLogin:
             "error": {"message": "Could not validate credentials"}
         }
 
+    async def test_username_burst_is_throttled(self, ac: AsyncClient):
+        login_limiter.clear()
+        try:
+            responses = await asyncio.gather(
+                *(
+                    ac.post(
+                        self._url,
+                        json={"username": "burst", "password": "string"},
+                    )
+                    for _ in range(8)
+                )
+            )
+        finally:
+            login_limiter.clear()
+        status_codes = sorted(response.status_code for response in responses)
+        assert status_codes == [401] * 5 + [429] * 3
+        throttled = next(r for r in responses if r.status_code == 429)
+        assert int(throttled.headers["Retry-After"]) > 0
+        assert throttled.json() == {
+            "error": {"message": "Too many login attempts"}
+        }
+
+    async def test_username_burst_from_other_ip_does_not_lock_out(
+        self, ac: AsyncClient
+    ):
+        async with async_session_maker() as session:
+            session.add(
+                User(username="victim", hashed_password=self._hashed_password)
+            )
+            await session.commit()
+        login_limiter.clear()
+        try:
+            responses = await asyncio.gather(
+                *(
+                    ac.post(
+                        self._url,
+                        json={"username": "victim", "password": "wrong"},
+                    )
+                    for _ in range(8)
+                )
+            )
+            transport = ASGITransport(
+                app=app,  # type: ignore[arg-type]
+                client=("10.0.0.2", 123),
+            )
+            async with AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as other_ac:
+                response = await other_ac.post(
+                    self._url,
+                    json={"username": "victim", "password": "string"},
+                )
+        finally:
+            login_limiter.clear()
+        assert 429 in (response.status_code for response in responses)
+        assert response.status_code == 200
+
+    async def test_ip_burst_is_throttled(self, ac: AsyncClient):
+        login_limiter.clear()
+        stats = login_limiter.get_stats()
+        try:
+            responses = await asyncio.gather(
+                *(
+                    ac.post(
+                        self._url,
+                        json={
+                            "username": f"ip_burst_{index}",
+                            "password": "string",
+                        },
+                    )
+                    for index in range(25)
+                )
+            )
+        finally:
+            login_limiter.clear()
+        status_codes = sorted(response.status_code for response in responses)
+        assert status_codes == [401] * 20 + [429] * 5
+        throttled_by_ip = login_limiter.get_stats().throttled_by_ip
+        assert throttled_by_ip - stats.throttled_by_ip == 5
+
 
 class TestGetCurrentUser:
     _url = "/auth/users/me"
@@ -129,6 +215,31 @@ class TestGetCurrentUser:
             }
         }
 
+    async def test_cached_user_skips_database(self, ac: AsyncClient):
+        async with async_session_maker() as session:
+            user = User(username="cached", hashed_password="string")
+            session.add(user)
+            await session.commit()
+        access_token = await JWTAuthenticationService.create_access_token(
+            {"sub": "cached"}
+        )
+        headers = {"Authorization": f"Bearer {access_token}"}
+        assert (await ac.get(self._url, headers=headers)).status_code == 200
+        statements = []
+
+        def on_execute(connection, cursor, statement, *args) -> None:
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+        try:
+            response = await ac.get(self._url, headers=headers)
+        finally:
+            event.remove(
+                engine.sync_engine, "before_cursor_execute", on_execute
+            )
+        assert response.json()["data"]["id"] == str(user.id)
+        assert statements == []
+
     async def test_no_token(self, ac: AsyncClient):
         response = await ac.get(self._url)
         assert response.status_code == 401
@@ -136,6 +247,45 @@ class TestGetCurrentUser:
             "error": {"message": "Could not validate credentials"}
         }
 
+    async def test_unknown_user(self, ac: AsyncClient):
+        access_token = await JWTAuthenticationService.create_access_token(
+            {"sub": "unknown"}
+        )
+        response = await ac.get(
+            self._url,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+        assert response.status_code == 401
+
+
+class TestLogout:
+    _url = "/auth/logout"
+
+    async def test_stateless_token_is_revoked(self, ac: AsyncClient):
+        async with async_session_maker() as session:
+            user = User(username="logout", hashed_password="string")
+            session.add(user)
+            await session.commit()
+        access_token = await JWTAuthenticationService.create_access_token(
+            {
+                "sub": "logout",
+                "uid": str(user.id),
+                "username": "logout",
+                "jti": str(uuid4()),
+            }
+        )
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = await ac.get("/auth/users/me", headers=headers)
+        assert response.status_code == 200
+        response = await ac.post(self._url, headers=headers)
+        assert response.status_code == 204
+        response = await ac.get("/auth/users/me", headers=headers)
+        assert response.status_code == 401
+
+    async def test_no_token(self, ac: AsyncClient):
+        response = await ac.post(self._url)
+        assert response.status_code == 401
+
 
 class TestRegistration:
     _url = "/auth/registration"
@@ -286,3 +436,19 @@ class TestRegistration:
         async with async_session_maker() as session:
             result = await session.execute(select(User))
             assert len(result.scalars().all()) == len(old_results)
+
+    async def test_taken_username_is_not_hashed(self, ac: AsyncClient):
+        async with async_session_maker() as session:
+            session.add(User(username="taken", hashed_password="string"))
+            await session.commit()
+        calls = password_hasher.get_stats().calls
+        response = await ac.post(
+            self._url,
+            json={
+                "username": "taken",
+                "password": "string",
+                "repeat_password": "string",
+            },
+        )
+        assert response.status_code == 400
+        assert password_hasher.get_stats().calls == calls
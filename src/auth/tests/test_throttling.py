@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from auth.exceptions import ThrottlingException
+from auth.throttling import LoginLimiter, TokenBuckets
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestTokenBuckets:
+    async def test_burst_then_rate(self):
+        buckets = TokenBuckets(burst=2, rate=1, max_keys=10)
+        for _ in range(2):
+            assert buckets.get_retry_after("key", 0) == 0
+            buckets.take("key", 0)
+        assert buckets.get_retry_after("key", 0) == 1
+        assert buckets.get_retry_after("key", 0.5) == 0.5
+        assert buckets.get_retry_after("key", 1) == 0
+        assert buckets.get_retry_after("other_key", 0) == 0
+
+    async def test_least_recently_used_keys_are_forgotten(self):
+        buckets = TokenBuckets(burst=1, rate=1, max_keys=2)
+        for key in ("first", "second", "third"):
+            buckets.take(key, 0)
+        assert len(buckets) == 2
+        assert buckets.get_retry_after("first", 0) == 0
+        assert buckets.get_retry_after("third", 0) == 1
+
+
+class TestLoginLimiter:
+    async def test_username_burst(self):
+        limiter = LoginLimiter(username_burst=3, username_per_minute=60)
+        for _ in range(3):
+            limiter.check("burst", "10.0.0.1")
+        with pytest.raises(ThrottlingException) as exc_info:
+            limiter.check("burst", "10.0.0.1")
+        assert 0 < exc_info.value.retry_after <= 1
+        limiter.check("other", "10.0.0.1")
+        # Failures from one address do not lock the user out of the others
+        limiter.check("burst", "10.0.0.2")
+        stats = limiter.get_stats()
+        assert (stats.allowed, stats.throttled_by_username) == (5, 1)
+
+    async def test_ip_burst(self):
+        limiter = LoginLimiter(ip_burst=3, ip_per_minute=60)
+        for index in range(3):
+            limiter.check(f"user_{index}", "10.0.0.1")
+        with pytest.raises(ThrottlingException):
+            limiter.check("user_3", "10.0.0.1")
+        limiter.check("user_3", "10.0.0.2")
+        stats = limiter.get_stats()
+        assert (stats.allowed, stats.throttled_by_ip) == (4, 1)
+        assert (stats.tracked_usernames, stats.tracked_ips) == (4, 2)
+
+    async def test_throttled_attempts_are_not_counted(self):
+        limiter = LoginLimiter(
+            username_burst=1, username_per_minute=6000, ip_burst=5
+        )
+        limiter.check("refill", "10.0.0.1")
+        for _ in range(3):
+            with pytest.raises(ThrottlingException):
+                limiter.check("refill", "10.0.0.1")
+        time.sleep(0.02)
+        limiter.check("refill", "10.0.0.1")
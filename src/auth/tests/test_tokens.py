@@ -0,0 +1,25 @@
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from auth.tokens import TokenCodec
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestTokenCodec:
+    async def test_round_trip(self):
+        codec = TokenCodec("secret", "HS256")
+        claims = {"sub": "codec", "exp": int(time.time()) + 60}
+        token = codec.encode(claims)
+        assert codec.decode(token) == claims
+        assert jwt.decode(token, "secret", algorithms=["HS256"]) == claims
+
+    async def test_invalid_tokens(self):
+        codec = TokenCodec("secret", "HS256")
+        expired = codec.encode({"sub": "codec", "exp": int(time.time()) - 1})
+        foreign = TokenCodec("other", "HS256").encode({"sub": "codec"})
+        for token in (expired, foreign, "not a token"):
+            with pytest.raises(JWTError):
+                codec.decode(token)
@@ -0,0 +1,126 @@
+"""
+Throttling of the login attempts.
+
+Every attempt takes a token from the bucket of its username and
+client IP and from the one of the IP alone. A bucket holds
+up to a burst of tokens and is refilled at a steady rate, so a user
+mistyping a password is not bothered while guessing passwords of one
+account or trying many accounts from one address is slowed down
+to the refill rate. The username buckets are per IP, so failures
+from one address cannot lock the user out of the others.
+The buckets are kept in memory, per worker, for the most recently seen
+usernames and IPs only.
+"""
+import time
+from collections import OrderedDict
+
+from auth.exceptions import ThrottlingException
+from auth.schemas import LoginLimiterStatsDTO
+from config import (
+    AUTH_LOGIN_IP_BURST,
+    AUTH_LOGIN_IP_PER_MINUTE,
+    AUTH_LOGIN_LIMITER_MAX_KEYS,
+    AUTH_LOGIN_USERNAME_BURST,
+    AUTH_LOGIN_USERNAME_PER_MINUTE,
+)
+
+
+class TokenBuckets:
+    """
+    Token buckets of some keys, each holding up to burst tokens
+    and refilled with rate tokens per second.
+    """
+
+    def __init__(self, burst: int, rate: float, max_keys: int) -> None:
+        self._burst = burst
+        self._rate = rate
+        self._max_keys = max_keys
+        # Key -> (tokens, monotonic time of the last update)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get_retry_after(self, key: str, now: float) -> float:
+        """
+        Seconds until the bucket of the key has a token, 0 if it has one.
+        """
+        tokens = self._get_tokens(key, now)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self._rate if self._rate > 0 else float("inf")
+
+    def take(self, key: str, now: float) -> None:
+        self._buckets[key] = (self._get_tokens(key, now) - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self._max_keys:
+            # A forgotten key gets a full bucket again
+            self._buckets.popitem(last=False)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def _get_tokens(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self._burst
+        tokens, updated_at = bucket
+        return min(self._burst, tokens + (now - updated_at) * self._rate)
+
+
+class LoginLimiter:
+    def __init__(
+        self,
+        username_burst: int = AUTH_LOGIN_USERNAME_BURST,
+        username_per_minute: float = AUTH_LOGIN_USERNAME_PER_MINUTE,
+        ip_burst: int = AUTH_LOGIN_IP_BURST,
+        ip_per_minute: float = AUTH_LOGIN_IP_PER_MINUTE,
+        max_keys: int = AUTH_LOGIN_LIMITER_MAX_KEYS,
+    ) -> None:
+        self._usernames = TokenBuckets(
+            username_burst, username_per_minute / 60, max_keys
+        )
+        self._ips = TokenBuckets(ip_burst, ip_per_minute / 60, max_keys)
+        self._allowed = 0
+        self._throttled_by_username = 0
+        self._throttled_by_ip = 0
+
+    def check(self, username: str, ip: str | None) -> None:
+        """
+        Count a login attempt, raise ThrottlingException if it is one
+        too many for the username or the IP, then nothing is counted.
+        """
+        now = time.monotonic()
+        if ip is not None:
+            retry_after = self._ips.get_retry_after(ip, now)
+            if retry_after:
+                self._throttled_by_ip += 1
+                raise ThrottlingException(
+                    "Too many login attempts", retry_after
+                )
+        # The IP cannot contain a space, the username can
+        username_key = f"{ip} {username}"
+        retry_after = self._usernames.get_retry_after(username_key, now)
+        if retry_after:
+            self._throttled_by_username += 1
+            raise ThrottlingException("Too many login attempts", retry_after)
+        self._usernames.take(username_key, now)
+        if ip is not None:
+            self._ips.take(ip, now)
+        self._allowed += 1
+
+    def clear(self) -> None:
+        self._usernames.clear()
+        self._ips.clear()
+
+    def get_stats(self) -> LoginLimiterStatsDTO:
+        return LoginLimiterStatsDTO(
+            allowed=self._allowed,
+            throttled_by_username=self._throttled_by_username,
+            throttled_by_ip=self._throttled_by_ip,
+            tracked_usernames=len(self._usernames),
+            tracked_ips=len(self._ips),
+        )
+
+
+login_limiter = LoginLimiter()
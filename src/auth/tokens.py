@@ -0,0 +1,26 @@
+"""
+Signing and verification of the access tokens.
+
+The signing key is built once per process, python-jose would otherwise
+parse the secret and construct the key again for every token.
+"""
+from jose import jwk, jwt
+
+from config import ALGORITHM, SECRET_KEY
+
+
+class TokenCodec:
+    def __init__(
+        self, secret_key: str = SECRET_KEY, algorithm: str = ALGORITHM
+    ) -> None:
+        self._algorithm = algorithm
+        self._key = jwk.construct(secret_key, algorithm)
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, self._key, algorithm=self._algorithm)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(token, self._key, algorithms=[self._algorithm])
+
+
+token_codec = TokenCodec()
@@ -0,0 +1,268 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from database import engine
+
+# (room, payload, droppable)
+Handler = Callable[[str, str, bool], Awaitable[None]]
+
+
+class IBroker(ABC):
+    """
+    Pub/sub backend that delivers encoded websocket messages
+    published to a room to every worker of the application.
+    """
+
+    def __init__(self, handler: Handler) -> None:
+        self._handler: Handler = handler
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(
+        self, room: str, payload: str, droppable: bool = True
+    ) -> None:
+        raise NotImplementedError
+
+
+class InProcessBroker(IBroker):
+    """
+    Broker for a single worker, delivers messages directly.
+    """
+
+    async def publish(
+        self, room: str, payload: str, droppable: bool = True
+    ) -> None:
+        await self._handler(room, payload, droppable)
+
+
+class PostgresBroker(IBroker):
+    """
+    Broker on top of Postgres LISTEN/NOTIFY.
+
+    Messages are delivered to the local connections directly
+    and to the other workers through the notification channel.
+    Notification payloads are limited to 8000 bytes,
+    so bigger messages are split into chunks sent in one statement.
+
+    The listening connection is watched: once it is lost,
+    it is opened and LISTEN is issued again, waiting longer
+    after every failed attempt. Meanwhile the messages are delivered
+    to the local connections only. The chunks of a message whose
+    other chunks were lost are dropped after a timeout.
+    """
+
+    channel = "ws_messages"
+    chunk_size = 7900
+    # Seconds the chunks of a message wait for the others
+    chunk_timeout = 10.0
+    max_incomplete_messages = 1000
+    # Seconds between the checks of the listening connection
+    # and for one check to answer
+    check_interval = 30.0
+    check_timeout = 5.0
+    # Seconds before the first attempt to reconnect, doubled on failure
+    reconnect_delay = 0.5
+    max_reconnect_delay = 30.0
+
+    def __init__(self, handler: Handler) -> None:
+        super().__init__(handler)
+        self._worker_id = uuid4().hex
+        self._connection: AsyncConnection | None = None
+        self._driver_connection: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+        self._lost = asyncio.Event()
+        self._inbox: asyncio.Queue[str] = asyncio.Queue()
+        self._consumer: asyncio.Task | None = None
+        self._watcher: asyncio.Task | None = None
+        # Message id -> (monotonic time of the first chunk, chunks)
+        self._chunks: dict[str, tuple[float, list[str | None]]] = {}
+
+    async def start(self) -> None:
+        await self._listen()
+        self._consumer = asyncio.create_task(self._consume())
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        tasks = [
+            task
+            for task in (self._watcher, self._consumer)
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._close()
+
+    async def publish(
+        self, room: str, payload: str, droppable: bool = True
+    ) -> None:
+        await self._handler(room, payload, droppable)
+        message_id = uuid4().hex
+        chunks = self._split(payload)
+        messages = [
+            f"{self._worker_id} {message_id} {index} {len(chunks)} "
+            f"{int(droppable)} {room}\n{chunk}"
+            for index, chunk in enumerate(chunks)
+        ]
+        async with self._lock:
+            driver_connection = self._driver_connection
+            if driver_connection is None:
+                # Reconnecting
+                return
+            try:
+                await driver_connection.execute(
+                    "SELECT pg_notify($1, message) FROM unnest($2::text[]) "
+                    "WITH ORDINALITY AS m(message, n) ORDER BY n",
+                    self.channel,
+                    messages,
+                )
+            except Exception:
+                if not driver_connection.is_closed():
+                    raise
+                self._lost.set()
+
+    def _split(self, payload: str) -> list[str]:
+        if len(payload.encode()) <= self.chunk_size:
+            return [payload]
+        # Non-ASCII characters take up to 4 bytes
+        size = self.chunk_size // 4
+        return [
+            payload[start : start + size]
+            for start in range(0, len(payload), size)
+        ]
+
+    async def _listen(self) -> None:
+        connection = await engine.connect()
+        try:
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            assert driver_connection is not None
+            await driver_connection.add_listener(
+                self.channel, self._on_notification
+            )
+            driver_connection.add_termination_listener(self._on_terminated)
+        except BaseException:
+            await connection.invalidate()
+            await connection.close()
+            raise
+        self._connection = connection
+        self._driver_connection = driver_connection
+
+    async def _close(self) -> None:
+        connection, self._connection = self._connection, None
+        driver_connection, self._driver_connection = (
+            self._driver_connection,
+            None,
+        )
+        if connection is None or driver_connection is None:
+            return
+        # Waits for the notifications being sent
+        async with self._lock:
+            driver_connection.remove_termination_listener(self._on_terminated)
+            try:
+                await driver_connection.remove_listener(
+                    self.channel, self._on_notification
+                )
+            except Exception:
+                await connection.invalidate()
+            await connection.close()
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._lost.wait(), timeout=self.check_interval
+                )
+            except asyncio.TimeoutError:
+                if await self._is_alive():
+                    continue
+            self._lost.clear()
+            await self._reconnect()
+
+    async def _is_alive(self) -> bool:
+        async with self._lock:
+            if self._driver_connection is None:
+                return False
+            try:
+                await asyncio.wait_for(
+                    self._driver_connection.execute("SELECT 1"),
+                    timeout=self.check_timeout,
+                )
+            except Exception:
+                return False
+        return True
+
+    async def _reconnect(self) -> None:
+        await self._close()
+        delay = self.reconnect_delay
+        while True:
+            try:
+                await self._listen()
+                return
+            except Exception:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _on_notification(self, *args: object) -> None:
+        # asyncpg passes (connection, pid, channel, payload)
+        self._inbox.put_nowait(str(args[-1]))
+
+    def _on_terminated(self, *args: object) -> None:
+        self._lost.set()
+
+    async def _consume(self) -> None:
+        while True:
+            await self._receive(await self._inbox.get())
+
+    async def _receive(self, message: str) -> None:
+        header, chunk = message.split("\n", 1)
+        worker_id, message_id, index, total, droppable, room = header.split(
+            " ", 5
+        )
+        if worker_id == self._worker_id:
+            return
+        if total == "1":
+            await self._handler(room, chunk, droppable == "1")
+            return
+        if message_id not in self._chunks:
+            now = time.monotonic()
+            self._expire_chunks(now)
+            self._chunks[message_id] = (now, [None] * int(total))
+        chunks = self._chunks[message_id][1]
+        chunks[int(index)] = chunk
+        if None not in chunks:
+            del self._chunks[message_id]
+            await self._handler(
+                room, "".join(filter(None, chunks)), droppable == "1"
+            )
+
+    def _expire_chunks(self, now: float) -> None:
+        """
+        Drop the oldest incomplete messages once they are too old
+        or too many to keep another one.
+        """
+        while self._chunks:
+            message_id, (received_at, _) = next(iter(self._chunks.items()))
+            if (
+                now - received_at < self.chunk_timeout
+                and len(self._chunks) < self.max_incomplete_messages
+            ):
+                return
+            del self._chunks[message_id]
+
+
+BROKERS: dict[str, type[IBroker]] = {
+    "memory": InProcessBroker,
+    "postgres": PostgresBroker,
+}
@@ -6,7 +6,79 @@ DB_NAME = config("POSTGRES_DB")
 DB_USER = config("POSTGRES_USER")
 DB_PASS = config("POSTGRES_PASSWORD")
 
+DB_NULL_POOL = config("DB_NULL_POOL", default=False, cast=bool)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+DB_STATEMENT_CACHE_SIZE = config(
+    "DB_STATEMENT_CACHE_SIZE", default=100, cast=int
+)
+
 SECRET_KEY = config("SECRET_KEY")
 ALGORITHM = config("ALGORITHM")
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
+# Passwords hashed or verified at once, in a thread pool of that size
+AUTH_HASH_WORKERS = config("AUTH_HASH_WORKERS", default=4, cast=int)
+# Password checks waiting for a free thread before new ones are refused
+AUTH_HASH_QUEUE_SIZE = config("AUTH_HASH_QUEUE_SIZE", default=64, cast=int)
+# Login attempts allowed at once and per minute after, by username and by IP
+AUTH_LOGIN_USERNAME_BURST = config(
+    "AUTH_LOGIN_USERNAME_BURST", default=5, cast=int
+)
+AUTH_LOGIN_USERNAME_PER_MINUTE = config(
+    "AUTH_LOGIN_USERNAME_PER_MINUTE", default=5, cast=float
+)
+AUTH_LOGIN_IP_BURST = config("AUTH_LOGIN_IP_BURST", default=20, cast=int)
+AUTH_LOGIN_IP_PER_MINUTE = config(
+    "AUTH_LOGIN_IP_PER_MINUTE", default=60, cast=float
+)
+# Usernames and IPs tracked by the login limiter, each
+AUTH_LOGIN_LIMITER_MAX_KEYS = config(
+    "AUTH_LOGIN_LIMITER_MAX_KEYS", default=100000, cast=int
+)
+# Users of the verified tokens kept in memory, for at most the TTL seconds
+AUTH_PRINCIPAL_CACHE_SIZE = config(
+    "AUTH_PRINCIPAL_CACHE_SIZE", default=10000, cast=int
+)
+AUTH_PRINCIPAL_CACHE_TTL = config(
+    "AUTH_PRINCIPAL_CACHE_TTL", default=300, cast=float
+)
+# Tokens carrying the user id and username, verified without the database
+AUTH_STATELESS_TOKENS = config(
+    "AUTH_STATELESS_TOKENS", default=False, cast=bool
+)
+# Seconds between the reloads of the revoked stateless tokens
+AUTH_REVOCATION_REFRESH_INTERVAL = config(
+    "AUTH_REVOCATION_REFRESH_INTERVAL", default=30, cast=float
+)
+
+# "materialized" stores every dealt card, "seed" only the played ones
+GAME_DEAL_MODE = config("GAME_DEAL_MODE", default="materialized")
+# Seconds the moves applied in memory wait before they are persisted,
+# counted from the first of them, or their number that is persisted at once
+GAME_WRITE_BEHIND_DELAY = config(
+    "GAME_WRITE_BEHIND_DELAY", default=0.05, cast=float
+)
+GAME_WRITE_BEHIND_MAX_MOVES = config(
+    "GAME_WRITE_BEHIND_MAX_MOVES", default=100, cast=int
+)
+# Recent events of a game kept to resume the reconnecting clients
+GAME_EVENT_HISTORY_SIZE = config(
+    "GAME_EVENT_HISTORY_SIZE", default=256, cast=int
+)
+# Events of the game event log written together, at least every interval
+GAME_EVENT_LOG_BATCH_SIZE = config(
+    "GAME_EVENT_LOG_BATCH_SIZE", default=1000, cast=int
+)
+GAME_EVENT_LOG_FLUSH_INTERVAL = config(
+    "GAME_EVENT_LOG_FLUSH_INTERVAL", default=0.5, cast=float
+)
+# Seconds the worker owning a game has to answer a forwarded request
+GAME_FORWARD_TIMEOUT = config("GAME_FORWARD_TIMEOUT", default=5.0, cast=float)
+
+WS_SEND_QUEUE_SIZE = config("WS_SEND_QUEUE_SIZE", default=64, cast=int)
+WS_OVERFLOW_POLICY = config("WS_OVERFLOW_POLICY", default="drop_oldest")
+WS_BROKER = config("WS_BROKER", default="memory")
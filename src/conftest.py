@@ -1,6 +1,11 @@
+import os
 from typing import AsyncGenerator
 
 import pytest
+
+# Every test runs in its own event loop,
+# so pooled connections can't be reused between tests
+os.environ.setdefault("DB_NULL_POOL", "True")
 from httpx import AsyncClient
 
 from database import Base, engine
@@ -1,12 +1,32 @@
 from datetime import datetime
+import time
 from typing import AsyncGenerator, Annotated
 import uuid
 
 from sqlalchemy import MetaData, NullPool, text, UUID
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, mapped_column
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 
-from config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+from config import (
+    DB_HOST,
+    DB_NAME,
+    DB_PASS,
+    DB_PORT,
+    DB_USER,
+    DB_NULL_POOL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+)
+from schemas import PoolStatsDTO
 
 DATABASE_URL = (
     f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
@@ -47,7 +67,64 @@ class Base(DeclarativeBase):
 
 metadata = MetaData()
 
-engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that measures how long checkouts take,
+    including waiting for a free connection and the pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            wait_time = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+def create_engine(null_pool: bool = DB_NULL_POOL) -> AsyncEngine:
+    connect_args = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if null_pool:
+        return create_async_engine(
+            DATABASE_URL, poolclass=NullPool, connect_args=connect_args
+        )
+    return create_async_engine(
+        DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def get_pool_stats(engine: AsyncEngine) -> PoolStatsDTO:
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return PoolStatsDTO()
+    return PoolStatsDTO(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        idle=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=pool.checkouts,
+        total_wait_ms=pool.wait_time * 1000,
+        max_wait_ms=pool.max_wait_time * 1000,
+    )
+
+
+engine = create_engine()
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)  # type: ignore
 
 
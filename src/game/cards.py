@@ -0,0 +1,161 @@
+"""
+Cards as small integers and hands as bitmasks.
+
+A card is its index in the canonical deck,
+``suit_index * 9 + value - 6`` with the suits in the ``Suit`` order,
+so the whole deck is ``range(36)``.
+A hand is an int with the bit of every card it holds set,
+so the cards of a suit are 9 consecutive bits.
+Cards are converted to ``CardDTO`` only when they leave the game logic.
+"""
+import random
+from typing import Iterable, Iterator, Literal, get_args
+
+from game.schemas import CardDTO
+
+SuitLetter = Literal["H", "D", "C", "S"]
+
+SUITS: tuple[SuitLetter, ...] = get_args(SuitLetter)
+VALUES = range(6, 15)
+DECK_SIZE = len(SUITS) * len(VALUES)
+
+SUIT_MASKS = {
+    suit: ((1 << len(VALUES)) - 1) << (index * len(VALUES))
+    for index, suit in enumerate(SUITS)
+}
+
+_CARD_DTOS = tuple(
+    CardDTO(suit=suit, value=value) for suit in SUITS for value in VALUES
+)
+
+
+def make_card(suit: str, value: int) -> int:
+    return SUITS.index(suit) * len(VALUES) + value - VALUES.start
+
+
+def get_suit(card: int) -> SuitLetter:
+    return SUITS[card // len(VALUES)]
+
+
+def get_value(card: int) -> int:
+    return card % len(VALUES) + VALUES.start
+
+
+def to_dto(card: int) -> CardDTO:
+    return _CARD_DTOS[card]
+
+
+def from_dto(card: CardDTO) -> int:
+    return make_card(card.suit, card.value)
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(state: int) -> tuple[int, int]:
+    """
+    One step of the SplitMix64 generator (Steele, Lea and Flood, 2014).
+
+    Returns the next state and a 64-bit output.
+    """
+    state = (state + 0x9E3779B97F4A7C15) & _MASK64
+    output = state
+    output = ((output ^ (output >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    output = ((output ^ (output >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return state, output ^ (output >> 31)
+
+
+def shuffle(deck: list[int], seed: int) -> None:
+    """
+    Fisher-Yates shuffle in place, driven by SplitMix64 from the seed.
+
+    Unlike ``random.Random(seed).shuffle``, whose algorithm may change
+    between Python versions, the order depends only on this function,
+    so a deal stored as a seed can always be dealt again.
+    Indices are drawn by rejection sampling, so the shuffle is unbiased.
+    """
+    state = seed & _MASK64
+    for index in range(len(deck) - 1, 0, -1):
+        bound = index + 1
+        limit = (_MASK64 + 1) - (_MASK64 + 1) % bound
+        state, output = _splitmix64(state)
+        while output >= limit:
+            state, output = _splitmix64(state)
+        other = output % bound
+        deck[index], deck[other] = deck[other], deck[index]
+
+
+def deal(
+    players_number: int,
+    cards_per_player: int,
+    seed: int | None = None,
+) -> tuple[list[list[int]], list[int]]:
+    """
+    Shuffle the deck once and slice it into hands, one hand per seat.
+
+    Returns the hands and the rest of the deck, still shuffled,
+    so any card of the rest is a uniformly random undealt card.
+    A seeded deal is shuffled by ``shuffle``, an unseeded one by ``random``.
+    """
+    deck = list(range(DECK_SIZE))
+    if seed is None:
+        random.shuffle(deck)
+    else:
+        shuffle(deck, seed)
+    dealt = players_number * cards_per_player
+    hands = [
+        deck[start : start + cards_per_player]
+        for start in range(0, dealt, cards_per_player)
+    ]
+    return hands, deck[dealt:]
+
+
+def to_dtos(cards: Iterable[int]) -> list[CardDTO]:
+    return [_CARD_DTOS[card] for card in cards]
+
+
+def beats(card: int, other: int, trump_suit: str | None) -> bool:
+    """
+    Whether the card beats the other one:
+    a higher card of the same suit or any trump over a non-trump.
+    """
+    if card // len(VALUES) == other // len(VALUES):
+        return card > other
+    return trump_suit is not None and get_suit(card) == trump_suit
+
+
+def to_hand(cards: Iterable[int]) -> int:
+    hand = 0
+    for card in cards:
+        hand |= 1 << card
+    return hand
+
+
+def iter_hand(hand: int) -> Iterator[int]:
+    """
+    Cards of the hand in the canonical order.
+    """
+    while hand:
+        lowest = hand & -hand
+        yield lowest.bit_length() - 1
+        hand ^= lowest
+
+
+def has_card(hand: int, card: int) -> bool:
+    return hand >> card & 1 == 1
+
+
+def count(hand: int) -> int:
+    return hand.bit_count()
+
+
+def filter_suit(hand: int, suit: SuitLetter) -> int:
+    return hand & SUIT_MASKS[suit]
+
+
+def hand_to_dtos(hand: int) -> list[CardDTO]:
+    return to_dtos(iter_hand(hand))
+
+
+def hand_from_dtos(cards: Iterable[CardDTO]) -> int:
+    return to_hand(from_dto(card) for card in cards)
@@ -3,7 +3,10 @@ from typing import Annotated
 from fastapi import Depends, status, WebSocketException
 from fastapi.websockets import WebSocket
 
-from auth.exceptions import AuthenticationException
+from auth.exceptions import (
+    AuthenticationException,
+    RevocationsUnavailableException,
+)
 from auth.schemas import UserInfoDTO
 from auth.services.authentication import JWTAuthenticationService
 from dependencies import UOWDep
@@ -33,6 +36,8 @@ class _WSAuthenticatedUser:
             user = await JWTAuthenticationService(uow).get_current_user(token)
         except AuthenticationException:
             raise ws_exception
+        except RevocationsUnavailableException:
+            raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER)
         return user
 
 
@@ -0,0 +1,181 @@
+"""
+Append-only log of the game events (the game_events table).
+
+The events are buffered in memory and written in batches with COPY,
+so logging a move costs no database round trip. A batch that COPY
+rejects as logged already is written with INSERT without the events
+logged already, which are counted. An event whose seq is logged
+with another content is an error.
+A game info can be rebuilt at any seq by replaying the events
+from the last snapshot or new set before it.
+"""
+import asyncio
+from typing import Callable, Iterable
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError
+
+from config import GAME_EVENT_LOG_BATCH_SIZE, GAME_EVENT_LOG_FLUSH_INTERVAL
+from game.exceptions import GameEventConflictException
+from game.schemas import (
+    FullCardInfoDTO,
+    FullEntryCardInfoDTO,
+    FullGameCardInfoDTO,
+    GameLogEventDTO,
+)
+from unitofwork import IUnitOfWork, UnitOfWork
+
+
+def replay(events: Iterable[GameLogEventDTO]) -> FullGameCardInfoDTO:
+    """
+    Game info after the events, the first one holds the whole state.
+    """
+    info: FullGameCardInfoDTO | None = None
+    for event in events:
+        if event.type in ("snapshot", "round_advanced"):
+            info = FullGameCardInfoDTO.model_validate(event.payload)
+            continue
+        assert info is not None
+        if event.type == "card_played":
+            card = FullCardInfoDTO.model_validate(event.payload["card"])
+            user = next(user for user in info.users if user.id == card.user_id)
+            user.cards = [
+                held_card
+                for held_card in user.cards
+                if held_card.id != card.id
+            ]
+            if info.entry is None:
+                assert card.entry_id is not None
+                info.entry = FullEntryCardInfoDTO(id=card.entry_id, cards=[])
+            info.entry.cards.append(card)
+        elif event.type == "entry_closed":
+            info.entry = None
+        elif event.type == "trump_set":
+            info.trump_suit = event.payload["trump_suit"]
+            info.trump_value = event.payload["trump_value"]
+    assert info is not None
+    return info
+
+
+class GameEventLog:
+    """
+    Buffered writer of the game event log.
+
+    The buffer is written when it reaches the batch size
+    or after the flush interval, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], IUnitOfWork] = UnitOfWork,
+        flush_interval: float = GAME_EVENT_LOG_FLUSH_INTERVAL,
+        batch_size: int = GAME_EVENT_LOG_BATCH_SIZE,
+    ) -> None:
+        self._uow_factory = uow_factory
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._events: list[GameLogEventDTO] = []
+        self.skipped_events_count = 0
+        self.conflicting_events_count = 0
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending_events_count(self) -> int:
+        return len(self._events)
+
+    def append(self, events: list[GameLogEventDTO]) -> None:
+        if not events:
+            return
+        self._events += events
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if len(self._events) >= self._batch_size:
+            self._full.set()
+
+    def get_last_seq(self, game_id: UUID) -> int:
+        """
+        Last seq of the game among the events not written yet.
+        """
+        return max(
+            (event.seq for event in self._events if event.game_id == game_id),
+            default=0,
+        )
+
+    async def flush(self) -> None:
+        async with self._lock:
+            events, self._events = self._events, []
+            if not events:
+                return
+            try:
+                await self._write(events)
+            except GameEventConflictException:
+                # The rest of the events are written
+                raise
+            except BaseException:
+                self._events[:0] = events
+                raise
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _write(self, events: list[GameLogEventDTO]) -> None:
+        uow = self._uow_factory()
+        try:
+            async with uow:
+                await uow.game_events.copy(events)
+                await uow.commit()
+            return
+        except IntegrityError:
+            # Some events are logged already,
+            # e.g. by a flush that failed after the commit
+            pass
+        async with uow:
+            logged = {
+                (event.game_id, event.seq): event
+                for event in await uow.game_events.get_logged(events)
+            }
+            new_events, conflicting_events = [], []
+            for event in events:
+                logged_event = logged.get((event.game_id, event.seq))
+                if logged_event is None:
+                    new_events.append(event)
+                elif (logged_event.type, logged_event.payload) != (
+                    event.type,
+                    event.payload,
+                ):
+                    conflicting_events.append(event)
+            await uow.game_events.bulk_add(
+                [event.model_dump() for event in new_events]
+            )
+            await uow.commit()
+        self.conflicting_events_count += len(conflicting_events)
+        self.skipped_events_count += (
+            len(events) - len(new_events) - len(conflicting_events)
+        )
+        if conflicting_events:
+            raise GameEventConflictException(
+                "Seqs logged with other events: "
+                + ", ".join(
+                    f"{event.game_id}/{event.seq}"
+                    for event in conflicting_events
+                )
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # The events are kept for the next flush
+                pass
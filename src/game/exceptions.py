@@ -0,0 +1,10 @@
+class GameOwnedException(Exception):
+    """
+    The game is played on another worker, which holds its state.
+    """
+
+
+class GameEventConflictException(Exception):
+    """
+    Events with the seqs of logged events but another content.
+    """
@@ -2,7 +2,8 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, UUID, UniqueConstraint
+from sqlalchemy import BigInteger, ForeignKey, UUID, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.util.preloaded import orm
 
@@ -148,6 +149,8 @@ class Set(Base):
     is_current_round: Mapped[bool] = mapped_column(
         default=False, nullable=False
     )
+    # Seed of the deck shuffle for the sets dealt without card rows
+    deal_seed: Mapped[int] = mapped_column(BigInteger, nullable=True)
     dealer_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -182,6 +185,7 @@ class Dealing(Base):
         UUID(as_uuid=True),
         ForeignKey("sets.id", ondelete="CASCADE"),
     )
+    seat: Mapped[int] = mapped_column(nullable=True)
 
     __table_args__ = (
         UniqueConstraint("user_id", "set_id", name="_user_set_uc"),
@@ -225,3 +229,21 @@ class Card(Base):
         if not 6 <= value <= 14:
             raise ValueError(f"Value should be between 6 and 14, got {value}")
         return value
+
+
+class GameEvent(Base):
+    """
+    Append-only log of the changes of a game state, in the order of seq.
+    """
+
+    __tablename__ = "game_events"
+
+    game_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("games.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    type: Mapped[str] = mapped_column(nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[created_at]
@@ -0,0 +1,103 @@
+"""
+Ownership of the games among the workers.
+
+The state of a game is kept in memory by one worker only,
+the one holding the lock of the game, so there is one stream
+of versions per game. Other workers do not load it, they forward
+the moves and requests of their players to the owner
+(see ``GameStateManager``).
+"""
+from abc import ABC, abstractmethod
+import asyncio
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from database import engine
+
+
+class IGameLocks(ABC):
+    @abstractmethod
+    async def acquire(self, game_id: UUID) -> bool:
+        """
+        Take the lock of the game unless another worker holds it.
+
+        Returns True if this worker holds it now.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release(self, game_id: UUID) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(self) -> None:
+        raise NotImplementedError
+
+
+class AdvisoryGameLocks(IGameLocks):
+    """
+    Session advisory locks of Postgres, keyed by the first 64 bits
+    of the game id.
+
+    All the locks of the worker are held by one connection
+    taken out of the pool, so they are released by the database
+    when the worker dies. If the connection is lost, the locks are lost
+    with it and are taken again by the next acquire.
+    """
+
+    def __init__(self, db_engine: AsyncEngine = engine) -> None:
+        self._engine = db_engine
+        self._connection: AsyncConnection | None = None
+        self._held: set[UUID] = set()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, game_id: UUID) -> bool:
+        if game_id in self._held:
+            return True
+        acquired = await self._execute("pg_try_advisory_lock", game_id)
+        if acquired:
+            self._held.add(game_id)
+        return acquired
+
+    async def release(self, game_id: UUID) -> None:
+        if game_id in self._held:
+            self._held.discard(game_id)
+            await self._execute("pg_advisory_unlock", game_id)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._connection is not None:
+                await self._connection.close()
+            self._connection = None
+            self._held.clear()
+
+    async def _execute(self, function: str, game_id: UUID) -> bool:
+        key = int.from_bytes(game_id.bytes[:8], "big", signed=True)
+        async with self._lock:
+            if self._connection is None:
+                # Locks are held by the session, not by a transaction
+                connection = await self._engine.connect()
+                self._connection = await connection.execution_options(
+                    isolation_level="AUTOCOMMIT"
+                )
+            try:
+                result = await self._connection.execute(
+                    text(f"SELECT {function}(:key)"), {"key": key}
+                )
+            except Exception:
+                await self._drop_connection()
+                raise
+            return result.scalar_one()
+
+    async def _drop_connection(self) -> None:
+        connection, self._connection = self._connection, None
+        self._held.clear()
+        if connection is None:
+            return
+        try:
+            await connection.invalidate()
+        except Exception:
+            # The connection is broken already
+            pass
@@ -1,9 +1,14 @@
+import json
 from typing import Sequence
 from uuid import UUID
 
-from sqlalchemy import select
+from asyncpg.exceptions import UniqueViolationError
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 
 from auth import models as auth_models
+from auth.schemas import UserInfoDTO
 from game import models
 from game.schemas import (
     LobbyInfoDTO,
@@ -11,6 +16,8 @@ from game.schemas import (
     LobbyUserInfoDTO,
     FlattenFullGameCardInfoDTO,
     EntryIdDTO,
+    GameLogEventDTO,
+    NewCurrentSetDTO,
 )
 from repository import SQLAlchemyRepository
 
@@ -77,16 +84,23 @@ class GameRepository(SQLAlchemyRepository):
                 models.Set.trump_suit,
                 models.Set.trump_value,
                 models.Set.opening_player_id,
+                models.Set.round_name,
+                models.Set.deal_seed,
+                models.Dealing.seat,
             )
             .join(
                 models.Dealing, models.Dealing.user_id == auth_models.User.id
             )
             .join(models.Set, models.Dealing.set_id == models.Set.id)
-            .join(models.Card, models.Card.dealing_id == models.Dealing.id)
+            # Seeded sets have card rows only for the played cards
+            .outerjoin(
+                models.Card, models.Card.dealing_id == models.Dealing.id
+            )
             .filter(
                 models.Set.game_id == game_id,
                 models.Set.is_current_round == True,
             )
+            .order_by(models.Dealing.seat, models.Dealing.id)
         )
         res = await self._session.execute(query)
         return [FlattenFullGameCardInfoDTO(
@@ -100,6 +114,9 @@ class GameRepository(SQLAlchemyRepository):
             trump_suit=player[7].value if player[7] is not None else None,
             trump_value=player[8],
             opening_player_id=player[9],
+            round_name=player[10],
+            deal_seed=player[11],
+            seat=player[12],
         ) for player in res.fetchall()]
 
 
@@ -110,21 +127,105 @@ class GamePlayerRepository(SQLAlchemyRepository):
 class SetRepository(SQLAlchemyRepository):
     model = models.Set
 
-    async def make_new_current(self, /, game_id: UUID, set_id: UUID) -> None:
-        query = (
+    async def make_new_current(
+        self, /, game_id: UUID, set_id: UUID
+    ) -> NewCurrentSetDTO | None:
+        """
+        Make the set following the finished one current in one statement.
+
+        The finished set is only left if it is still the current one,
+        so of the concurrent advances of a round only the first one
+        moves to the next set, the others return None, as after the last
+        set of the game.
+        """
+        finished = (
+            update(self.model)
+            .filter(
+                self.model.id == set_id,
+                self.model.game_id == game_id,
+                self.model.is_current_round == True,
+            )
+            .values(is_current_round=False)
+            .returning(self.model.game_id, self.model.round_number)
+            .cte("finished")
+        )
+        next_set_id = (
             select(self.model.id)
-            .filter_by(game_id=game_id, is_current_round=False)
+            .join(finished, finished.c.game_id == self.model.game_id)
+            .filter(self.model.round_number > finished.c.round_number)
             .order_by(self.model.round_number)
+            .limit(1)
+            .scalar_subquery()
+        )
+        new_current = (
+            update(self.model)
+            .filter(self.model.id == next_set_id)
+            .values(is_current_round=True)
+            .returning(
+                self.model.id,
+                self.model.round_name,
+                self.model.trump_suit,
+                self.model.trump_value,
+                self.model.opening_player_id,
+            )
+            .cte("new_current")
+        )
+        next_dealing = aliased(models.Dealing)
+        is_dealt = (
+            select(next_dealing.id)
+            .filter(next_dealing.set_id == new_current.c.id)
+            .exists()
+        )
+        query = (
+            select(
+                new_current,
+                is_dealt.label("is_dealt"),
+                auth_models.User.id.label("user_id"),
+                auth_models.User.username,
+            )
+            .select_from(new_current)
+            .join(models.Dealing, models.Dealing.set_id == set_id)
+            .join(
+                auth_models.User, auth_models.User.id == models.Dealing.user_id
+            )
+            .order_by(models.Dealing.seat)
         )
         res = await self._session.execute(query)
-        await self.update(
-            {"id": res.first().id},
-            is_current_round=True,
+        rows = res.fetchall()
+        if not rows:
+            return None
+        new_set = rows[0]
+        return NewCurrentSetDTO(
+            id=new_set.id,
+            round_name=new_set.round_name,
+            trump_suit=new_set.trump_suit and new_set.trump_suit.value,
+            trump_value=new_set.trump_value,
+            opening_player_id=new_set.opening_player_id,
+            is_dealt=new_set.is_dealt,
+            players=[
+                UserInfoDTO(id=row.user_id, username=row.username)
+                for row in rows
+            ],
         )
-        await self.update(
-            {"id": set_id},
-            is_current_round=False,
+
+    async def set_deal(
+        self,
+        /,
+        set_id: UUID,
+        trump_suit: str | None,
+        trump_value: int | None,
+        deal_seed: int | None,
+    ) -> None:
+        stmt = (
+            update(self.model)
+            .filter_by(id=set_id)
+            .values(
+                trump_suit=trump_suit,
+                trump_value=trump_value,
+                deal_seed=deal_seed,
+            )
         )
+        await self._session.execute(stmt)
 
 
 class DealingRepository(SQLAlchemyRepository):
@@ -143,3 +244,81 @@ class EntryRepository(SQLAlchemyRepository):
         if obj is None:
             obj = await self.add(set_id=set_id, owner_id=owner_id)
         return EntryIdDTO.model_validate(obj)
+
+
+class GameEventRepository(SQLAlchemyRepository):
+    model = models.GameEvent
+
+    async def copy(self, events: list[GameLogEventDTO]) -> None:
+        """
+        Append the events with COPY, which writes them in one round trip
+        without building an INSERT statement.
+
+        Raises IntegrityError if an event is logged already.
+        """
+        connection = await self._session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        assert driver_connection is not None
+        try:
+            await driver_connection.copy_records_to_table(
+                self.model.__tablename__,
+                columns=("game_id", "seq", "type", "payload", "created_at"),
+                records=[
+                    (
+                        event.game_id,
+                        event.seq,
+                        event.type,
+                        json.dumps(event.payload),
+                        event.created_at,
+                    )
+                    for event in events
+                ],
+            )
+        except UniqueViolationError as exc:
+            raise IntegrityError("COPY game_events", None, exc) from exc
+
+    async def get_logged(
+        self, events: list[GameLogEventDTO]
+    ) -> list[GameLogEventDTO]:
+        """
+        Logged events with the game ids and seqs of the given ones.
+        """
+        query = select(*self.model.__table__.columns).filter(
+            tuple_(self.model.game_id, self.model.seq).in_(
+                [(event.game_id, event.seq) for event in events]
+            )
+        )
+        res = await self._session.execute(query)
+        return [GameLogEventDTO.model_validate(row) for row in res.fetchall()]
+
+    async def get_last_seq(self, game_id: UUID) -> int:
+        query = select(func.max(self.model.seq)).filter_by(game_id=game_id)
+        res = await self._session.execute(query)
+        return res.scalar() or 0
+
+    async def get_replay_events(
+        self, game_id: UUID, seq: int
+    ) -> list[GameLogEventDTO]:
+        """
+        Events up to the seq since the last one holding the whole state.
+        """
+        start = (
+            select(func.max(self.model.seq))
+            .filter(
+                self.model.game_id == game_id,
+                self.model.seq <= seq,
+                self.model.type.in_(("snapshot", "round_advanced")),
+            )
+            .scalar_subquery()
+        )
+        query = (
+            select(*self.model.__table__.columns)
+            .filter(
+                self.model.game_id == game_id,
+                self.model.seq.between(start, seq),
+            )
+            .order_by(self.model.seq)
+        )
+        res = await self._session.execute(query)
+        return [GameLogEventDTO.model_validate(row) for row in res.fetchall()]
@@ -1,37 +1,51 @@
+import json
 from uuid import UUID
 
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, WebSocket, status
 from fastapi.websockets import WebSocketDisconnect
 
 from dependencies import UOWDep
 from game.dependencies import WSAuthenticatedUserDep
+from game.exceptions import GameOwnedException
 from game.schemas import (
     PlayersInSearchCountDTO,
     LobbyUserInfoDTO,
     GameInfoDTO,
-    FullGameCardInfoDTO, ProcessCardDTO,
+    ProcessCardDTO,
+    GameEventsDTO,
+    HandDTO,
 )
 from game.services.game import GameService
 from game.services.lobby import LobbyService
-from managers import ws_manager
-from schemas import ResponseDTO
+from game.state import game_state_manager
+from managers import ws_manager, Room
+from schemas import ErrorResponseDTO, MessageErrorResponseDTO, ResponseDTO
 
 router = APIRouter(prefix="/games", tags=["Game"])
 
+_INVALID_MESSAGE = ErrorResponseDTO[MessageErrorResponseDTO](
+    error=MessageErrorResponseDTO(message="Invalid message")
+)
+
 
 @router.websocket("/ws/search")
 async def search_game(websocket: WebSocket, user: WSAuthenticatedUserDep):
-    await ws_manager.connect(websocket, user.id)
-    user_ids = ws_manager.get_active_user_ids()
-    players_in_search_count = ws_manager.get_connections_count()
+    connection_id = await ws_manager.connect(
+        websocket, user.id, rooms=(Room.SEARCH,)
+    )
+    players_in_search_count = ws_manager.get_room_users_count(Room.SEARCH)
     _ = PlayersInSearchCountDTO(count=players_in_search_count)
-    await ws_manager.broadcast(ResponseDTO[PlayersInSearchCountDTO](data=_))
+    await ws_manager.publish(
+        Room.SEARCH, ResponseDTO[PlayersInSearchCountDTO](data=_)
+    )
     try:
         while True:
             data = await websocket.receive_json()
-            await ws_manager.broadcast({"user": str(user.id), "data": data})
+            await ws_manager.publish(
+                Room.SEARCH, {"user": str(user.id), "data": data}
+            )
     except WebSocketDisconnect:
-        ws_manager.disconnect(user.id)
+        ws_manager.disconnect(connection_id)
 
 
 @router.websocket("/ws/lobbies/{lobby_id}")
@@ -41,15 +55,16 @@ async def get_lobby(
     uow: UOWDep,
     lobby_id: UUID,
 ) -> None:
-    await ws_manager.connect(websocket, user.id)
+    room = Room.lobby(lobby_id)
+    connection_id = await ws_manager.connect(websocket, user.id, rooms=(room,))
     service = LobbyService(uow)
     try:
         await service.add_user_to_lobby(user, lobby_id=lobby_id)
     except ValueError:
-        ws_manager.disconnect(user.id)
+        ws_manager.disconnect(connection_id)
         return
     players = await service.get_players_in_lobby(lobby_id=lobby_id)
-    await ws_manager.broadcast(ResponseDTO[LobbyUserInfoDTO](data=players))
+    await ws_manager.publish(room, ResponseDTO[LobbyUserInfoDTO](data=players))
     try:
         while True:
             data = await websocket.receive_json()
@@ -57,32 +72,111 @@ async def get_lobby(
             players = await service.get_players_in_lobby(lobby_id=lobby_id)
             game = await GameService(uow).create_game(players, create_game)
             if game is not None:
-                await ws_manager.broadcast(ResponseDTO[GameInfoDTO](data=game))
+                await ws_manager.publish(
+                    room, ResponseDTO[GameInfoDTO](data=game)
+                )
     except Exception:
         await service.remove_user_from_lobby(user, lobby_id=lobby_id)
-        ws_manager.disconnect(user.id)
+        ws_manager.disconnect(connection_id)
 
 
 @router.websocket("/ws/{game_id}")
 async def play_game(
     websocket: WebSocket,
     user: WSAuthenticatedUserDep,
-    uow: UOWDep,
     game_id: UUID,
+    state_id: UUID | None = None,
+    version: int | None = None,
 ) -> None:
-    await ws_manager.connect(websocket, user.id)
-    service = GameService(uow)
-    full_game_info = await service.get_full_game_info(game_id)
-    await ws_manager.broadcast(
-        ResponseDTO[FullGameCardInfoDTO](data=full_game_info)
+    """
+    A reconnecting client passes the state id and the last version
+    it has seen to get only the events it missed.
+    An invalid message is answered with an error and ignored.
+    The connection is closed with 1013 if the worker owning the game
+    does not answer.
+    """
+    room = Room.game(game_id)
+    connection_id = await ws_manager.connect(
+        websocket, user.id, rooms=(room, Room.player(game_id, user.id))
     )
     try:
-        while True:
-            data = await websocket.receive_json()
-            await service.process_card(ProcessCardDTO(**data), game_id)
-            full_game_info = await service.get_full_game_info(game_id)
-            await ws_manager.broadcast(
-                ResponseDTO[FullGameCardInfoDTO](data=full_game_info)
+        if (
+            state_id is None
+            or version is None
+            or not await _resume_game(
+                connection_id, game_id, user.id, state_id, version
             )
+        ):
+            await _send_game_snapshot(connection_id, game_id, user.id)
+        while True:
+            try:
+                card = _parse_game_message(await websocket.receive_text())
+            except ValueError:
+                await ws_manager.publish(
+                    Room.connection(connection_id), _INVALID_MESSAGE
+                )
+                continue
+            if card is None:
+                await _send_game_snapshot(connection_id, game_id, user.id)
+            else:
+                game_state_manager.submit(game_id, card)
+    except GameOwnedException:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
     except WebSocketDisconnect:
-        ws_manager.disconnect(user.id)
+        pass
+    finally:
+        ws_manager.disconnect(connection_id)
+        if not ws_manager.get_room_connections_count(room):
+            await game_state_manager.release(game_id)
+
+
+def _parse_game_message(text: str) -> ProcessCardDTO | None:
+    """
+    Move sent by the client, None for a resync request.
+
+    Raises ValueError if the message is not valid.
+    """
+    data = json.loads(text)
+    if isinstance(data, dict) and data.get("type") == "resync":
+        return None
+    return ProcessCardDTO.model_validate(data)
+
+
+async def _send_game_snapshot(
+    connection_id: str, game_id: UUID, user_id: UUID
+) -> None:
+    """
+    Send the state with its version and the hand of the user,
+    the deltas follow it.
+    """
+    snapshot = await game_state_manager.get_snapshot(game_id, user_id)
+    await ws_manager.publish_encoded(
+        Room.connection(connection_id), snapshot, droppable=False
+    )
+
+
+async def _resume_game(
+    connection_id: str,
+    game_id: UUID,
+    user_id: UUID,
+    state_id: UUID,
+    version: int,
+) -> bool:
+    """
+    Send the events after the version and the hand dealt since then.
+
+    Returns False if they are no longer kept.
+    """
+    missed = await game_state_manager.resume(
+        game_id, state_id, version, user_id
+    )
+    if missed is None:
+        return False
+    events, hand = missed
+    room = Room.connection(connection_id)
+    await ws_manager.publish(room, ResponseDTO[GameEventsDTO](data=events))
+    if hand is not None:
+        await ws_manager.publish(
+            room, ResponseDTO[HandDTO](data=hand), droppable=False
+        )
+    return True
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 from uuid import UUID
 
 from pydantic import BaseModel, Field, ConfigDict
@@ -72,13 +72,16 @@ class FlattenFullGameCardInfoDTO(BaseModel):
     set_id: UUID
     user_id: UUID
     username: str
-    card_id: UUID
-    suit: Literal["H", "D", "C", "S"]
-    value: int
+    card_id: UUID | None = None
+    suit: Literal["H", "D", "C", "S"] | None = None
+    value: int | None = None
     entry_id: UUID | None = None
     trump_suit: Literal["H", "D", "C", "S"] | None = None
     trump_value: int | None = None
     opening_player_id: UUID
+    round_name: str
+    deal_seed: int | None = None
+    seat: int | None = None
 
 
 class FullEntryCardInfoDTO(BaseModel):
@@ -103,7 +106,165 @@ class ProcessCardDTO(BaseModel):
     is_round_end: bool = False
 
 
+class PlayedCardDTO(ProcessCardDTO):
+    entry_id: UUID
+    is_new_entry: bool = False
+
+
+class NewCurrentSetDTO(BaseModel):
+    """
+    Set made current by a round advance,
+    with the players of the finished set in seat order.
+    """
+
+    id: UUID
+    round_name: str
+    trump_suit: Literal["H", "D", "C", "S"] | None = None
+    trump_value: int | None = None
+    opening_player_id: UUID
+    is_dealt: bool
+    players: list[UserInfoDTO]
+
+
 class EntryIdDTO(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     id: UUID
+
+
+class PublicUserCardInfoDTO(UserInfoDTO):
+    cards_count: int
+
+
+class PublicGameCardInfoDTO(BaseModel):
+    """
+    Part of the game info every player may see: the hands are only counted.
+    """
+
+    set_id: UUID
+    users: list[PublicUserCardInfoDTO]
+    entry: FullEntryCardInfoDTO | None = None
+    trump_suit: Literal["H", "D", "C", "S"] | None = None
+    trump_value: int | None = None
+
+
+class GameSnapshotDTO(BaseModel):
+    """
+    Versions are the seq numbers of the game event log.
+    The id of the state changes when the game is reloaded
+    from the database, the events of the previous state are not resumed.
+    """
+
+    type: Literal["snapshot"] = "snapshot"
+    state_id: UUID
+    version: int
+    game: PublicGameCardInfoDTO
+    hand: list[FullCardInfoDTO]
+
+
+class HandDTO(BaseModel):
+    """
+    Cards dealt to the recipient, sent after the round_advanced event
+    of the same version.
+    """
+
+    type: Literal["hand"] = "hand"
+    version: int
+    set_id: UUID
+    cards: list[FullCardInfoDTO]
+
+
+class CardPlayedEventDTO(BaseModel):
+    type: Literal["card_played"] = "card_played"
+    version: int
+    card: FullCardInfoDTO
+
+
+class EntryClosedEventDTO(BaseModel):
+    type: Literal["entry_closed"] = "entry_closed"
+    version: int
+    entry_id: UUID
+
+
+class RoundAdvancedEventDTO(BaseModel):
+    type: Literal["round_advanced"] = "round_advanced"
+    version: int
+    set_id: UUID
+    users: list[PublicUserCardInfoDTO]
+
+
+class TrumpSetEventDTO(BaseModel):
+    type: Literal["trump_set"] = "trump_set"
+    version: int
+    trump_suit: Literal["H", "D", "C", "S"] | None = None
+    trump_value: int | None = None
+
+
+GameEventDTO = Annotated[
+    CardPlayedEventDTO
+    | EntryClosedEventDTO
+    | RoundAdvancedEventDTO
+    | TrumpSetEventDTO,
+    Field(discriminator="type"),
+]
+
+
+class GameEventsDTO(BaseModel):
+    """
+    Changes of the game state since the previous message.
+
+    Versions of the events are consecutive, a client that misses one
+    asks for a snapshot with ``{"type": "resync"}``.
+    Events up to the version of the client, received before its snapshot
+    or sent again on resume, are ignored.
+    """
+
+    events: list[GameEventDTO]
+
+
+class GameCommandDTO(BaseModel):
+    """
+    Move or request of a player forwarded to the worker owning the game.
+
+    A request is answered with a ``GameReplyDTO`` of the same id
+    published to the reply room.
+    """
+
+    type: Literal["play", "snapshot", "resume"]
+    card: ProcessCardDTO | None = None
+    request_id: UUID | None = None
+    reply_room: str | None = None
+    user_id: UUID | None = None
+    state_id: UUID | None = None
+    version: int | None = None
+
+
+class GameReplyDTO(BaseModel):
+    """
+    Answer of the owner of a game: the encoded snapshot, or the events
+    and the hand missed by a resuming client, no events if it has
+    to get a snapshot instead.
+    """
+
+    request_id: UUID
+    snapshot: str | None = None
+    events: GameEventsDTO | None = None
+    hand: HandDTO | None = None
+
+
+class GameLogEventDTO(BaseModel):
+    """
+    Row of the game event log.
+
+    The payload of a state event without its type and version.
+    The snapshots and the new sets are logged with every hand,
+    so the state can be replayed from them.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    game_id: UUID
+    seq: int
+    type: str
+    payload: dict
+    created_at: datetime
@@ -1,49 +1,142 @@
+from functools import lru_cache
 import random
-from typing import Sequence, Generator, Literal
-from uuid import UUID
+from typing import Any, Sequence, Generator, Literal
+from uuid import UUID, uuid4, uuid5
+
+from sqlalchemy import Row
 
 from auth.schemas import UserInfoDTO
-from game.models import Suit
+from config import GAME_DEAL_MODE
+from game import cards, event_log
 from game.schemas import (
     LobbyUserInfoDTO,
     GameInfoDTO,
-    CardDTO,
-    UserCardListDTO,
     FullGameCardInfoDTO, FullUserCardInfoDTO, FullCardInfoDTO,
-    FullEntryCardInfoDTO, ProcessCardDTO
+    FullEntryCardInfoDTO, FlattenFullGameCardInfoDTO,
+    PlayedCardDTO, NewCurrentSetDTO,
 )
 from unitofwork import IUnitOfWork
 
-CARDS = {
-    CardDTO(suit=member.value, value=value)
-    for value in range(6, 15)
-    for member in Suit
-}
+# Sets whose seeded deals are kept, a few per game in progress
+SEEDED_SETS_CACHE_SIZE = 1024
 
 
 class GameService:
-    def __init__(self, uow: IUnitOfWork) -> None:
+    """
+    Deals are either materialized as card rows ("materialized" mode)
+    or derived from a seed stored on the set ("seed" mode),
+    in which case only the played cards get card rows.
+    """
+
+    def __init__(
+        self, uow: IUnitOfWork, deal_mode: str = GAME_DEAL_MODE
+    ) -> None:
         self._uow: IUnitOfWork = uow
+        self._deal_mode = deal_mode
+
+    async def save_moves(
+        self, moves: list[PlayedCardDTO], game_id: UUID
+    ) -> FullGameCardInfoDTO | None:
+        """
+        Persist a batch of moves already applied to the in-memory state
+        in one transaction.
 
-    async def process_card(self, card: ProcessCardDTO, game_id: UUID) -> None:
+        Returns the info of the set made current by a round end
+        in the batch, if any (see ``advance_round``).
+        """
+        next_info = None
         async with self._uow:
-            entry = await self._uow.entries.get_or_create(
-                set_id=card.set_id,
-                owner_id=card.owner_id,
-            )
-            await self._uow.cards.update(
-                {"id": card.card_id},
-                entry_id=entry.id,
+            await self._uow.entries.bulk_add(
+                [
+                    dict(
+                        id=move.entry_id,
+                        set_id=move.set_id,
+                        owner_id=move.owner_id,
+                    )
+                    for move in moves
+                    if move.is_new_entry
+                ]
             )
-            if card.is_round_end:
-                await self._uow.sets.make_new_current(game_id, card.set_id)
+            await self._save_cards(moves)
+            for move in moves:
+                if move.is_round_end:
+                    next_info = await self.advance_round(game_id, move.set_id)
             await self._uow.commit()
+        return next_info
+
+    async def _save_cards(self, moves: list[PlayedCardDTO]) -> None:
+        """
+        Put the played cards to their entries,
+        with one update of the dealt cards for the materialized sets
+        and one insert of the played cards for the seeded ones.
+        """
+        set_objs = {}
+        seeded_dealings: dict[UUID, Sequence[Row]] = {}
+        played_cards = []
+        seeded_cards = []
+        for move in moves:
+            if move.set_id not in set_objs:
+                set_objs[move.set_id] = await self._uow.sets.get(
+                    returns=("deal_seed", "round_name"), id=move.set_id
+                )
+            set_obj = set_objs[move.set_id]
+            if set_obj.deal_seed is None:
+                played_cards.append(
+                    dict(id=move.card_id, entry_id=move.entry_id)
+                )
+                continue
+            dealings = seeded_dealings.get(move.set_id)
+            if dealings is None:
+                dealings = await self._uow.dealings.get_all(
+                    returns=("id", "seat"), set_id=move.set_id
+                )
+                seeded_dealings[move.set_id] = dealings
+            seeded_card = self._get_seeded_card(
+                move, set_obj.deal_seed, set_obj.round_name, dealings
+            )
+            if seeded_card is not None:
+                seeded_cards.append(seeded_card)
+        await self._uow.cards.update_many("id", played_cards)
+        await self._uow.cards.bulk_add(seeded_cards)
+
+    def _get_seeded_card(
+        self,
+        move: PlayedCardDTO,
+        seed: int,
+        set_name: str,
+        dealings: Sequence[Row],
+    ) -> dict[str, str | int | UUID] | None:
+        hands = self._deal_from_seed(seed, set_name, len(dealings))
+        played_card = self._get_seeded_card_ids(move.set_id).get(move.card_id)
+        for dealing in dealings:
+            if played_card is not None and cards.has_card(
+                hands[dealing.seat], played_card
+            ):
+                return dict(
+                    id=move.card_id,
+                    dealing_id=dealing.id,
+                    suit=cards.get_suit(played_card),
+                    value=cards.get_value(played_card),
+                    entry_id=move.entry_id,
+                )
+        return None
 
     async def get_full_game_info(self, game_id: UUID) -> FullGameCardInfoDTO:
         flatten_info_list = await self._uow.games.get_full_game_info(game_id)
-        user_cards = []
+        if flatten_info_list[0].deal_seed is not None:
+            flatten_info_list = self._derive_seeded_cards(flatten_info_list)
+        users: dict[UUID, FullUserCardInfoDTO] = {}
         entry_cards = []
+        entry_id: UUID | None = None
         for info in flatten_info_list:
+            user = users.get(info.user_id)
+            if user is None:
+                user = users[info.user_id] = FullUserCardInfoDTO(
+                    id=info.user_id, username=info.username, cards=[]
+                )
+            if info.card_id is None or info.suit is None or info.value is None:
+                # Outer joined row of a player without cards
+                continue
             card = FullCardInfoDTO(
                 id=info.card_id,
                 suit=info.suit,
@@ -52,32 +145,33 @@ class GameService:
                 entry_id=info.entry_id,
             )
             if info.entry_id is None:
-                user_cards.append(card)
+                user.cards.append(card)
             else:
                 entry_cards.append(card)
-        user_ids = {user.user_id for user in flatten_info_list}
+                entry_id = info.entry_id
         return FullGameCardInfoDTO(
             set_id=flatten_info_list[0].set_id,
-            users=[
-                FullUserCardInfoDTO(
-                    id=info.user_id,
-                    username=info.username,
-                    cards=[
-                        card for card in user_cards
-                        if card.user_id == info.user_id
-                    ],
-                )
-                for info in flatten_info_list
-                if info.user_id in user_ids
-            ],
+            users=list(users.values()),
             entry=FullEntryCardInfoDTO(
-                id=entry_cards[0].entry_id,
+                id=entry_id,
                 cards=entry_cards,
-            ) if entry_cards else None,
+            ) if entry_id is not None else None,
             trump_suit=flatten_info_list[0].trump_suit,
             trump_value=flatten_info_list[0].trump_value,
         )
 
+    async def get_last_event_seq(self, game_id: UUID) -> int:
+        return await self._uow.game_events.get_last_seq(game_id)
+
+    async def replay_game(
+        self, game_id: UUID, seq: int
+    ) -> FullGameCardInfoDTO | None:
+        """
+        Game info as it was at the seq of the game event log.
+        """
+        events = await self._uow.game_events.get_replay_events(game_id, seq)
+        return event_log.replay(events) if events else None
+
     async def create_game(
         self, players: list[LobbyUserInfoDTO], create_game: bool
     ) -> GameInfoDTO | None:
@@ -88,11 +182,9 @@ class GameService:
                 type="MULTIPLAYER",
                 players_number=len(players),
             )
-            for player in players:
-                await self._uow.game_players.add(
-                    game_id=game.id,
-                    user_id=player.id,
-                )
+            await self._uow.game_players.bulk_add(
+                [{"game_id": game.id, "user_id": p.id} for p in players]
+            )
             await self.create_sets_with_cards(game.id, players)
             await self._uow.commit()
         return GameInfoDTO(
@@ -109,60 +201,241 @@ class GameService:
         game_id: UUID,
         players: list[LobbyUserInfoDTO],
     ) -> None:
+        """
+        Schedule every set of the game and deal the first one.
+
+        The dealers and openers of the whole schedule are stored up front,
+        the other sets are dealt when they become current
+        (see ``advance_round``).
+        All rows are built in memory with client-side ids
+        and written with one bulk insert per table.
+        """
         circular_players_generator = self._get_circular_iterations(players)
         dealer = next(circular_players_generator)
         opening_player = next(circular_players_generator)
-        is_current_round = True
+        sets: list[dict[str, Any]] = []
         for index, set_name in enumerate(self._generate_sets(len(players))):
-            users_with_cards, used_cards = self._generate_cards_for_set(
-                set_name, players
-            )
-            trump_suit, trump_value = self._pick_trump(set_name, used_cards)
-            set_obj = await self._uow.sets.add(
-                trump_suit=trump_suit,
-                trump_value=trump_value,
-                round_name=set_name,
-                round_number=index + 1,
-                is_current_round=is_current_round,
-                dealer_id=dealer.id,
-                opening_player_id=opening_player.id,
-                game_id=game_id,
-            )
-            is_current_round = False
-            for user in users_with_cards:
-                dealing = await self._uow.dealings.add(
-                    user_id=user.id, set_id=set_obj.id
+            sets.append(
+                dict(
+                    id=uuid4(),
+                    trump_suit=None,
+                    trump_value=None,
+                    round_name=set_name,
+                    round_number=index + 1,
+                    is_current_round=index == 0,
+                    deal_seed=None,
+                    dealer_id=dealer.id,
+                    opening_player_id=opening_player.id,
+                    game_id=game_id,
                 )
-                for card in user.cards:
-                    await self._uow.cards.add(
-                        dealing_id=dealing.id,
-                        suit=card.suit,
-                        value=card.value,
-                    )
+            )
             dealer = opening_player
             opening_player = next(circular_players_generator)
+        deal, dealings, card_rows = self._deal_set(
+            sets[0]["id"],
+            sets[0]["round_name"],
+            [player.id for player in players],
+        )
+        sets[0].update(deal)
+        await self._uow.sets.bulk_add(sets)
+        await self._uow.dealings.bulk_add(dealings)
+        await self._uow.cards.bulk_add(card_rows)
 
-    @staticmethod
-    def _generate_cards_for_set(
-        set_name: str, players: list[LobbyUserInfoDTO]
-    ) -> tuple[list[UserCardListDTO], set[CardDTO]]:
-        max_cards_per_player = (
-            int(set_name) if set_name.isnumeric() else 36 // len(players)
+    async def advance_round(
+        self, game_id: UUID, set_id: UUID
+    ) -> FullGameCardInfoDTO | None:
+        """
+        Make the set after the finished one current
+        and deal it unless it is dealt already.
+
+        The players keep their seats of the finished set.
+        Returns the info of the new current set, built from the deal
+        without reading it back, or None if the round is advanced
+        already or the game is over.
+        """
+        next_set = await self._uow.sets.make_new_current(game_id, set_id)
+        if next_set is None:
+            return None
+        if next_set.is_dealt:
+            # Games created before the lazy deals have every set dealt
+            return await self.get_full_game_info(game_id)
+        deal, dealings, card_rows = self._deal_set(
+            next_set.id,
+            next_set.round_name,
+            [player.id for player in next_set.players],
+        )
+        await self._uow.sets.set_deal(next_set.id, **deal)
+        await self._uow.dealings.bulk_add(dealings)
+        await self._uow.cards.bulk_add(card_rows)
+        return self._get_dealt_info(next_set, deal, dealings, card_rows)
+
+    def _get_dealt_info(
+        self,
+        next_set: NewCurrentSetDTO,
+        deal: dict,
+        dealings: list[dict],
+        card_rows: list[dict],
+    ) -> FullGameCardInfoDTO:
+        """
+        Info of a set just dealt,
+        as ``get_full_game_info`` would read it back.
+        """
+        users = [
+            FullUserCardInfoDTO(**player.model_dump(), cards=[])
+            for player in next_set.players
+        ]
+        if deal["deal_seed"] is not None:
+            hands = self._deal_from_seed(
+                deal["deal_seed"], next_set.round_name, len(users)
+            )
+            for user, hand in zip(users, hands):
+                user.cards = [
+                    FullCardInfoDTO(
+                        id=self._get_card_id(next_set.id, card),
+                        suit=cards.get_suit(card),
+                        value=cards.get_value(card),
+                        user_id=user.id,
+                    )
+                    for card in cards.iter_hand(hand)
+                ]
+        else:
+            seat_users = {
+                dealing["id"]: user for dealing, user in zip(dealings, users)
+            }
+            for row in card_rows:
+                user = seat_users[row["dealing_id"]]
+                user.cards.append(
+                    FullCardInfoDTO(
+                        id=row["id"],
+                        suit=row["suit"],
+                        value=row["value"],
+                        user_id=user.id,
+                    )
+                )
+        return FullGameCardInfoDTO(
+            set_id=next_set.id,
+            users=users,
+            trump_suit=deal["trump_suit"],
+            trump_value=deal["trump_value"],
+        )
+
+    def _deal_set(
+        self, set_id: UUID, set_name: str, user_ids: list[UUID]
+    ) -> tuple[dict, list[dict], list[dict]]:
+        """
+        Deal a set to the users in seat order.
+
+        Returns the trump and the seed to store on the set,
+        the dealing rows and the card rows (none in "seed" mode).
+        """
+        deal_seed = None
+        if self._deal_mode == "seed":
+            deal_seed = random.getrandbits(63)
+        hands, rest_cards = cards.deal(
+            len(user_ids),
+            self._get_cards_per_player(set_name, len(user_ids)),
+            deal_seed,
         )
-        users_with_cards: list[UserCardListDTO] = []
-        used_cards: set[CardDTO] = set()
-        for player in players:
-            cards: list[CardDTO] = []
-            for _ in range(max_cards_per_player):
-                card: CardDTO = random.choice(list(CARDS - used_cards))
-                cards.append(card)
-                used_cards.add(card)
-            users_with_cards.append(
-                UserCardListDTO(
-                    id=player.id, username=player.username, cards=cards
+        trump_suit, trump_value = self._pick_trump(set_name, rest_cards)
+        dealings: list[dict] = []
+        card_rows: list[dict] = []
+        for seat, user_id in enumerate(user_ids):
+            dealing_id = uuid4()
+            dealings.append(
+                dict(id=dealing_id, user_id=user_id, set_id=set_id, seat=seat)
+            )
+            if deal_seed is not None:
+                continue
+            card_rows.extend(
+                dict(
+                    id=uuid4(),
+                    dealing_id=dealing_id,
+                    suit=cards.get_suit(card),
+                    value=cards.get_value(card),
                 )
+                for card in hands[seat]
             )
-        return users_with_cards, used_cards
+        deal = dict(
+            trump_suit=trump_suit, trump_value=trump_value, deal_seed=deal_seed
+        )
+        return deal, dealings, card_rows
+
+    @staticmethod
+    def _get_cards_per_player(set_name: str, players_number: int) -> int:
+        return int(set_name) if set_name.isnumeric() else 36 // players_number
+
+    @staticmethod
+    @lru_cache(maxsize=SEEDED_SETS_CACHE_SIZE)
+    def _deal_from_seed(
+        seed: int, set_name: str, players_number: int
+    ) -> tuple[int, ...]:
+        """
+        Deal the hands of a seeded set again, one hand per seat.
+
+        Cached, as every move of the set needs them.
+        """
+        hands, _ = cards.deal(
+            players_number,
+            GameService._get_cards_per_player(set_name, players_number),
+            seed,
+        )
+        return tuple(cards.to_hand(hand) for hand in hands)
+
+    @staticmethod
+    @lru_cache(maxsize=SEEDED_SETS_CACHE_SIZE)
+    def _get_seeded_card_ids(set_id: UUID) -> dict[UUID, int]:
+        """
+        Cards of a seeded set by their ids, not to be modified.
+        """
+        return {
+            GameService._get_card_id(set_id, card): card
+            for card in range(cards.DECK_SIZE)
+        }
+
+    @staticmethod
+    def _get_card_id(set_id: UUID, card: int) -> UUID:
+        """
+        Stable id of a card of a seeded set,
+        the same before and after the card is played.
+        """
+        return uuid5(set_id, f"{cards.get_suit(card)}{cards.get_value(card)}")
+
+    def _derive_seeded_cards(
+        self, flatten_info_list: list[FlattenFullGameCardInfoDTO]
+    ) -> list[FlattenFullGameCardInfoDTO]:
+        """
+        Expand the rows of a seeded set to one row per dealt card,
+        as if the set was materialized.
+        """
+        players = {
+            info.seat: info
+            for info in flatten_info_list
+            if info.seat is not None
+        }
+        played_cards = {
+            info.card_id: info.entry_id
+            for info in flatten_info_list
+            if info.card_id is not None
+        }
+        first_info = flatten_info_list[0]
+        hands = self._deal_from_seed(
+            first_info.deal_seed, first_info.round_name, len(players)
+        )
+        derived_info_list = []
+        for seat, player in sorted(players.items()):
+            for card in cards.iter_hand(hands[seat]):
+                card_id = self._get_card_id(first_info.set_id, card)
+                derived_info_list.append(
+                    player.model_copy(
+                        update=dict(
+                            card_id=card_id,
+                            suit=cards.get_suit(card),
+                            value=cards.get_value(card),
+                            entry_id=played_cards.get(card_id),
+                        )
+                    )
+                )
+        return derived_info_list
 
     @staticmethod
     def _generate_sets(players_number: int) -> Sequence[str]:
@@ -194,14 +467,15 @@ class GameService:
 
     @staticmethod
     def _pick_trump(
-        set_name: str, used_cards: set[CardDTO]
+        set_name: str, rest_cards: list[int]
     ) -> tuple[Literal["H", "D", "C", "S"] | None, int | None]:
-        unused_cards = CARDS - used_cards
-        if not unused_cards:
-            return random.choice(["H", "D", "C", "S"]), None
-        trump_card: CardDTO = random.choice(list(unused_cards))
-        trump_suit = trump_card.suit
-        trump_value = trump_card.value
+        """
+        Take the trump from the top of the shuffled undealt cards.
+        """
+        if not rest_cards:
+            return random.choice(cards.SUITS), None
+        trump_suit: cards.SuitLetter | None = cards.get_suit(rest_cards[0])
+        trump_value: int | None = cards.get_value(rest_cards[0])
         if set_name == "NTR" or (trump_suit == "S" and trump_value == 7):
             trump_suit = None
             trump_value = None
@@ -0,0 +1,739 @@
+import asyncio
+import enum
+import functools
+import itertools
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+from uuid import UUID, uuid4
+
+from config import (
+    GAME_EVENT_HISTORY_SIZE,
+    GAME_FORWARD_TIMEOUT,
+    GAME_WRITE_BEHIND_DELAY,
+    GAME_WRITE_BEHIND_MAX_MOVES,
+)
+from game.schemas import (
+    FullGameCardInfoDTO,
+    FullEntryCardInfoDTO,
+    FullUserCardInfoDTO,
+    ProcessCardDTO,
+    PlayedCardDTO,
+    GameEventDTO,
+    GameEventsDTO,
+    GameLogEventDTO,
+    GameCommandDTO,
+    GameReplyDTO,
+    HandDTO,
+    CardPlayedEventDTO,
+    EntryClosedEventDTO,
+    RoundAdvancedEventDTO,
+    TrumpSetEventDTO,
+)
+from game.event_log import GameEventLog
+from game.exceptions import GameOwnedException
+from game.ownership import AdvisoryGameLocks, IGameLocks
+from game.services.game import GameService
+from game.views import GameView, to_public_users
+from managers import ws_manager, Room, WSConnectionManager
+from schemas import ResponseDTO
+from unitofwork import IUnitOfWork, UnitOfWork
+
+Publisher = Callable[
+    [UUID, GameEventsDTO, dict[UUID, HandDTO]], Awaitable[None]
+]
+
+
+class GameState:
+    """
+    Current set of a game: hands, entry and trump,
+    updated in place on every move.
+
+    Every change bumps the version and is recorded as a delta event,
+    which is sent to the clients instead of the whole state.
+    The events are public, the hands dealt by a new set
+    are kept apart for their holders.
+
+    The last events are kept in a ring buffer, so a reconnecting client
+    gets only the events it missed instead of a snapshot.
+
+    The events are also recorded for the game event log,
+    starting with a snapshot of the info at the given version.
+    """
+
+    def __init__(
+        self,
+        game_id: UUID,
+        info: FullGameCardInfoDTO,
+        history_size: int = GAME_EVENT_HISTORY_SIZE,
+        version: int = 0,
+    ) -> None:
+        self.game_id = game_id
+        self.id = uuid4()
+        self.version = version
+        self._events: list[GameEventDTO] = []
+        self._log: list[GameLogEventDTO] = []
+        self._history: deque[GameEventDTO] = deque(maxlen=history_size)
+        self._hands: dict[UUID, HandDTO] = {}
+        self._dealt_hands: dict[UUID, HandDTO] = {}
+        self._view: GameView | None = None
+        self._set_info(info)
+        self._log_event("snapshot", info.model_dump(mode="json"))
+
+    def play(self, card: ProcessCardDTO) -> PlayedCardDTO | None:
+        """
+        Move the card from the hand of its holder to the entry.
+
+        Returns None if the card is not in a hand of the current set.
+        """
+        if card.set_id != self.info.set_id:
+            return None
+        user = self._holders.pop(card.card_id, None)
+        if user is None:
+            return None
+        index = next(
+            index
+            for index, user_card in enumerate(user.cards)
+            if user_card.id == card.card_id
+        )
+        played_card = user.cards.pop(index)
+        entry = self.info.entry
+        is_new_entry = entry is None
+        if entry is None:
+            entry = self.info.entry = FullEntryCardInfoDTO(
+                id=uuid4(), cards=[]
+            )
+        played_card.entry_id = entry.id
+        entry.cards.append(played_card)
+        self._emit(CardPlayedEventDTO, card=played_card)
+        return PlayedCardDTO(
+            **card.model_dump(),
+            entry_id=entry.id,
+            is_new_entry=is_new_entry,
+        )
+
+    def advance(self, info: FullGameCardInfoDTO) -> None:
+        """
+        Replace the finished set with the next one.
+        """
+        if self.info.entry is not None:
+            self._emit(EntryClosedEventDTO, entry_id=self.info.entry.id)
+        self._set_info(info)
+        self._emit(
+            RoundAdvancedEventDTO,
+            log_payload=info.model_dump(mode="json"),
+            set_id=info.set_id,
+            users=to_public_users(info),
+        )
+        self._hands = self._dealt_hands = {
+            user.id: HandDTO(
+                version=self.version,
+                set_id=info.set_id,
+                cards=[card.model_copy() for card in user.cards],
+            )
+            for user in info.users
+        }
+        self._emit(
+            TrumpSetEventDTO,
+            trump_suit=info.trump_suit,
+            trump_value=info.trump_value,
+        )
+
+    def get_view(self) -> GameView:
+        """
+        View of the current version, shared until the next change.
+        """
+        if self._view is None:
+            self._view = GameView(self.id, self.version, self.info)
+        return self._view
+
+    def resume(
+        self, state_id: UUID, version: int, user_id: UUID
+    ) -> tuple[GameEventsDTO, HandDTO | None] | None:
+        """
+        Events after the version and the hand of the user
+        if it was dealt after the version.
+
+        Returns None if the client has to get a snapshot instead:
+        the state was reloaded or the events are not in the history.
+        """
+        missed = self.version - version
+        if state_id != self.id or not 0 <= missed <= len(self._history):
+            return None
+        events = itertools.islice(
+            self._history, len(self._history) - missed, None
+        )
+        hand = self._dealt_hands.get(user_id)
+        if hand is not None and hand.version <= version:
+            hand = None
+        return GameEventsDTO(events=list(events)), hand
+
+    def pop_events(self) -> list[GameEventDTO]:
+        events, self._events = self._events, []
+        return events
+
+    def pop_hands(self) -> dict[UUID, HandDTO]:
+        hands, self._hands = self._hands, {}
+        return hands
+
+    def pop_log(self) -> list[GameLogEventDTO]:
+        log, self._log = self._log, []
+        return log
+
+    def _set_info(self, info: FullGameCardInfoDTO) -> None:
+        self.info = info
+        self._holders: dict[UUID, FullUserCardInfoDTO] = {
+            card.id: user for user in info.users for card in user.cards
+        }
+
+    def _emit(
+        self,
+        event_class: Callable[..., GameEventDTO],
+        log_payload: dict | None = None,
+        **data: Any,
+    ) -> None:
+        """
+        Record a change, logged with the payload of the event
+        unless another one is given.
+        """
+        self.version += 1
+        self._view = None
+        event = event_class(version=self.version, **data)
+        self._events.append(event)
+        self._history.append(event)
+        if log_payload is None:
+            log_payload = event.model_dump(
+                mode="json", exclude={"type", "version"}
+            )
+        self._log_event(event.type, log_payload)
+
+    def _log_event(self, event_type: str, payload: dict) -> None:
+        self._log.append(
+            GameLogEventDTO(
+                game_id=self.game_id,
+                seq=self.version,
+                type=event_type,
+                payload=payload,
+                created_at=datetime.utcnow(),
+            )
+        )
+
+
+class _Command(enum.Enum):
+    PLAY = "play"
+    GET_VIEW = "get_view"
+    RESUME = "resume"
+    FLUSH = "flush"
+    STOP = "stop"
+
+
+# Command, its argument and the future of its result
+_Item = tuple[_Command, Any, asyncio.Future | None]
+
+
+class _GameActor:
+    """
+    Task that owns the state of one game and processes its commands in order.
+
+    Moves waiting in the queue are applied together
+    and their events are published in one message.
+    Applied moves are persisted the write-behind delay after the first
+    of them, however many commands arrive meanwhile,
+    or as soon as there are the max number of them.
+    The state is loaded only while the actor holds the lock of the game,
+    the moves are forwarded to the owner of the game otherwise.
+    """
+
+    def __init__(
+        self,
+        game_id: UUID,
+        uow_factory: Callable[[], IUnitOfWork],
+        publish: Publisher,
+        write_behind_delay: float,
+        write_behind_max_moves: int,
+        event_history_size: int,
+        event_log: GameEventLog,
+        locks: IGameLocks,
+        forward: Callable[[ProcessCardDTO], Awaitable[None]],
+        set_owned: Callable[[bool], None],
+    ) -> None:
+        self.game_id = game_id
+        self.stopped = False
+        self._uow_factory = uow_factory
+        self._publish = publish
+        self._write_behind_delay = write_behind_delay
+        self._write_behind_max_moves = write_behind_max_moves
+        self._event_history_size = event_history_size
+        self._event_log = event_log
+        self._locks = locks
+        self._forward = forward
+        self._set_owned = set_owned
+        self._state: GameState | None = None
+        self._pending: list[PlayedCardDTO] = []
+        # Loop time to persist the pending moves at
+        self._flush_at: float | None = None
+        # The state waits for the next set after a round end
+        self._round_ended = False
+        self._queue: asyncio.Queue[_Item] = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def pending_moves_count(self) -> int:
+        return len(self._pending)
+
+    def submit(self, card: ProcessCardDTO) -> None:
+        self._queue.put_nowait((_Command.PLAY, card, None))
+
+    async def request(self, command: _Command, argument: Any = None) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((command, argument, future))
+        return await future
+
+    async def join(self) -> None:
+        """
+        Wait until every submitted command is processed.
+        """
+        await self._queue.join()
+
+    async def wait_stopped(self) -> None:
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.stopped:
+            timeout = None
+            if self._pending or self._round_ended:
+                if self._flush_at is None:
+                    self._flush_at = loop.time() + self._write_behind_delay
+                timeout = self._flush_at - loop.time()
+                if timeout <= 0:
+                    try:
+                        await self._persist()
+                    except Exception:
+                        # The moves are kept pending for the next flush
+                        pass
+                    await self._publish_changes()
+                    continue
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            items = [item]
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                await self._process(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    async def _process(self, items: list[_Item]) -> None:
+        for index, (command, argument, future) in enumerate(items):
+            try:
+                if command is _Command.PLAY:
+                    await self._play(argument)
+                    continue
+                # Only the plays are not waited for
+                assert future is not None
+                if command is _Command.GET_VIEW:
+                    state = await self._get_state()
+                    # Only the events after the view follow it
+                    await self._publish_changes()
+                    future.set_result(state.get_view())
+                elif command is _Command.RESUME:
+                    state = await self._get_state()
+                    await self._publish_changes()
+                    future.set_result(state.resume(*argument))
+                elif command is _Command.FLUSH:
+                    await self._persist()
+                    future.set_result(None)
+                elif command is _Command.STOP:
+                    await self._persist()
+                    # The next state of the game continues the log
+                    self._log_events()
+                    await self._event_log.flush()
+                    # Commands sent after the stop keep the game running
+                    self.stopped = (
+                        index == len(items) - 1 and self._queue.empty()
+                    )
+                    if self.stopped:
+                        self._set_owned(False)
+                        await self._locks.release(self.game_id)
+                    future.set_result(self.stopped)
+            except Exception as exc:
+                if future is not None:
+                    future.set_exception(exc)
+        await self._publish_changes()
+
+    async def _publish_changes(self) -> None:
+        if self._state is None:
+            return
+        self._log_events()
+        events, hands = self._state.pop_events(), self._state.pop_hands()
+        if not events:
+            return
+        try:
+            await self._publish(
+                self.game_id, GameEventsDTO(events=events), hands
+            )
+        except Exception:
+            # Clients see the gap in the versions and resync
+            pass
+
+    async def _play(self, card: ProcessCardDTO) -> None:
+        try:
+            state = await self._get_state()
+        except GameOwnedException:
+            await self._forward(card)
+            return
+        move = state.play(card)
+        if move is None:
+            return
+        self._pending.append(move)
+        if move.is_round_end:
+            self._round_ended = True
+            await self._persist()
+        elif len(self._pending) >= self._write_behind_max_moves:
+            await self._persist()
+
+    async def _persist(self) -> None:
+        """
+        Persist the pending moves and move the state to the next set
+        after a round end.
+
+        If it fails, the round end is remembered with the moves,
+        so the state is advanced by the flush that retries them.
+        """
+        # The next set comes back from the round advance
+        info = await self._flush()
+        if not self._round_ended or self._state is None:
+            return
+        if info is None:
+            # The round is advanced already or the game is over
+            uow = self._uow_factory()
+            async with uow:
+                service = GameService(uow)
+                info = await service.get_full_game_info(self.game_id)
+        self._round_ended = False
+        self._state.advance(info)
+
+    async def _get_state(self) -> GameState:
+        if self._state is None:
+            if not await self._locks.acquire(self.game_id):
+                raise GameOwnedException(
+                    f"Game {self.game_id} is played on another worker"
+                )
+            self._set_owned(True)
+            uow = self._uow_factory()
+            async with uow:
+                service = GameService(uow)
+                info = await service.get_full_game_info(self.game_id)
+                last_seq = await service.get_last_event_seq(self.game_id)
+            last_seq = max(
+                last_seq, self._event_log.get_last_seq(self.game_id)
+            )
+            self._state = GameState(
+                self.game_id, info, self._event_history_size, last_seq + 1
+            )
+        return self._state
+
+    def _log_events(self) -> None:
+        if self._state is not None:
+            self._event_log.append(self._state.pop_log())
+
+    async def _flush(self) -> FullGameCardInfoDTO | None:
+        moves, self._pending = self._pending, []
+        # A failed flush is retried after the delay
+        self._flush_at = None
+        if not moves:
+            return None
+        try:
+            return await GameService(self._uow_factory()).save_moves(
+                moves, self.game_id
+            )
+        except BaseException:
+            self._pending[:0] = moves
+            raise
+
+
+class GameStateManager:
+    """
+    Authoritative states of the games played on this worker.
+
+    Every game is owned by its own actor task (see ``_GameActor``),
+    so the moves of a game are applied one by one in arrival order
+    without database locks, whichever connection they come from.
+    A state is loaded from the database when the first player connects
+    and moves are applied to it in memory. They are persisted in batches
+    in the background (write-behind), so a move does not wait
+    for the database, which stays the source of truth to recover from.
+    The end of a set is persisted right away,
+    as the round advance deals the next set and returns it.
+    Every change is appended to the game event log as well.
+
+    A game is loaded only by the worker holding its lock (see
+    ``game.ownership``). The others forward the moves and the requests
+    of their players to the command room of the game, which the owner
+    listens to, and the events come back through the game room,
+    so the players of a game can be connected to any worker.
+    A request the owner does not answer in time
+    raises ``GameOwnedException``.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], IUnitOfWork] = UnitOfWork,
+        write_behind_delay: float = GAME_WRITE_BEHIND_DELAY,
+        publish: Publisher | None = None,
+        event_history_size: int = GAME_EVENT_HISTORY_SIZE,
+        event_log: GameEventLog | None = None,
+        locks: IGameLocks | None = None,
+        write_behind_max_moves: int = GAME_WRITE_BEHIND_MAX_MOVES,
+        ws: WSConnectionManager | None = None,
+        forward_timeout: float = GAME_FORWARD_TIMEOUT,
+    ) -> None:
+        self._uow_factory = uow_factory
+        self._write_behind_delay = write_behind_delay
+        self._write_behind_max_moves = write_behind_max_moves
+        self._event_history_size = event_history_size
+        self._event_log = GameEventLog() if event_log is None else event_log
+        self._ws = ws_manager if ws is None else ws
+        self._publish = (
+            functools.partial(_publish_to_game_room, self._ws)
+            if publish is None
+            else publish
+        )
+        self._locks = AdvisoryGameLocks() if locks is None else locks
+        self._forward_timeout = forward_timeout
+        self._actors: dict[UUID, _GameActor] = {}
+        # Requests forwarded to the owners, waiting for their replies
+        self._requests: dict[UUID, asyncio.Future[GameReplyDTO]] = {}
+        # Requests of the other workers being answered
+        self._answers: set[asyncio.Task] = set()
+        self._reply_room = Room.replies(uuid4().hex)
+        self._ws.listen(self._reply_room, self._on_reply)
+
+    async def get_view(self, game_id: UUID) -> GameView:
+        """
+        View of the game owned by this worker.
+
+        Raises GameOwnedException if another worker owns it.
+        """
+        return await self._get_actor(game_id).request(_Command.GET_VIEW)
+
+    async def get_snapshot(self, game_id: UUID, user_id: UUID) -> str:
+        """
+        Snapshot of the game for the user, see ``GameView.encode_snapshot``,
+        from the owner of the game.
+        """
+        try:
+            view = await self.get_view(game_id)
+        except GameOwnedException:
+            reply = await self._request(
+                game_id, GameCommandDTO(type="snapshot", user_id=user_id)
+            )
+            if reply.snapshot is None:
+                raise
+            return reply.snapshot
+        return view.encode_snapshot(user_id)
+
+    async def resume(
+        self, game_id: UUID, state_id: UUID, version: int, user_id: UUID
+    ) -> tuple[GameEventsDTO, HandDTO | None] | None:
+        """
+        Events missed by a reconnecting client, see ``GameState.resume``,
+        from the owner of the game.
+        """
+        try:
+            return await self._get_actor(game_id).request(
+                _Command.RESUME, (state_id, version, user_id)
+            )
+        except GameOwnedException:
+            reply = await self._request(
+                game_id,
+                GameCommandDTO(
+                    type="resume",
+                    state_id=state_id,
+                    version=version,
+                    user_id=user_id,
+                ),
+            )
+        if reply.events is None:
+            return None
+        return reply.events, reply.hand
+
+    def submit(self, game_id: UUID, card: ProcessCardDTO) -> None:
+        """
+        Queue the move, its events are published to the game room.
+        """
+        self._get_actor(game_id).submit(card)
+
+    async def join(self, game_id: UUID) -> None:
+        actor = self._actors.get(game_id)
+        if actor is not None:
+            await actor.join()
+
+    async def flush(self, game_id: UUID) -> None:
+        await self._get_actor(game_id).request(_Command.FLUSH)
+
+    async def release(self, game_id: UUID) -> None:
+        """
+        Persist the pending moves and stop the actor of the game,
+        when nobody plays it on this worker anymore.
+        """
+        actor = self._actors.get(game_id)
+        if actor is None or actor.stopped:
+            return
+        if await actor.request(_Command.STOP):
+            await actor.wait_stopped()
+            if self._actors.get(game_id) is actor:
+                del self._actors[game_id]
+
+    async def close(self) -> None:
+        self._ws.unlisten(self._reply_room)
+        for task in self._answers:
+            task.cancel()
+        await asyncio.gather(*self._answers, return_exceptions=True)
+        for game_id in list(self._actors):
+            await self.release(game_id)
+        await self._event_log.close()
+        await self._locks.close()
+
+    def get_pending_moves_count(self) -> int:
+        return sum(
+            actor.pending_moves_count for actor in self._actors.values()
+        )
+
+    def _get_actor(self, game_id: UUID) -> _GameActor:
+        actor = self._actors.get(game_id)
+        if actor is None or actor.stopped:
+            actor = self._actors[game_id] = _GameActor(
+                game_id,
+                self._uow_factory,
+                self._publish,
+                self._write_behind_delay,
+                self._write_behind_max_moves,
+                self._event_history_size,
+                self._event_log,
+                self._locks,
+                functools.partial(self._forward, game_id),
+                functools.partial(self._set_owned, game_id),
+            )
+        return actor
+
+    def _set_owned(self, game_id: UUID, owned: bool) -> None:
+        room = Room.game_commands(game_id)
+        if owned:
+            self._ws.listen(room, functools.partial(self._on_command, game_id))
+        else:
+            self._ws.unlisten(room)
+
+    async def _forward(self, game_id: UUID, card: ProcessCardDTO) -> None:
+        await self._send_command(
+            game_id, GameCommandDTO(type="play", card=card)
+        )
+
+    async def _request(
+        self, game_id: UUID, command: GameCommandDTO
+    ) -> GameReplyDTO:
+        """
+        Send the request to the owner of the game and wait for its reply.
+
+        Raises GameOwnedException if the owner does not answer in time.
+        """
+        request_id = command.request_id = uuid4()
+        command.reply_room = self._reply_room
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        try:
+            await self._send_command(game_id, command)
+            return await asyncio.wait_for(future, self._forward_timeout)
+        except asyncio.TimeoutError:
+            raise GameOwnedException(
+                f"Game {game_id} is played on another worker, "
+                "which does not answer"
+            )
+        finally:
+            del self._requests[request_id]
+
+    async def _send_command(
+        self, game_id: UUID, command: GameCommandDTO
+    ) -> None:
+        await self._ws.publish_encoded(
+            Room.game_commands(game_id),
+            command.model_dump_json(),
+            droppable=False,
+        )
+
+    async def _on_command(self, game_id: UUID, payload: str) -> None:
+        command = GameCommandDTO.model_validate_json(payload)
+        if command.type == "play":
+            if command.card is not None:
+                self.submit(game_id, command.card)
+            return
+        # Answered apart, so the broker goes on delivering meanwhile
+        task = asyncio.create_task(self._answer(game_id, command))
+        self._answers.add(task)
+        task.add_done_callback(self._answers.discard)
+
+    async def _answer(self, game_id: UUID, command: GameCommandDTO) -> None:
+        """
+        Reply to a request of another worker, not at all if this worker
+        does not own the game anymore.
+        """
+        if command.request_id is None or command.reply_room is None:
+            return
+        actor = self._get_actor(game_id)
+        try:
+            if command.type == "snapshot":
+                view = await actor.request(_Command.GET_VIEW)
+                reply = GameReplyDTO(
+                    request_id=command.request_id,
+                    snapshot=view.encode_snapshot(command.user_id),
+                )
+            else:
+                missed = await actor.request(
+                    _Command.RESUME,
+                    (command.state_id, command.version, command.user_id),
+                )
+                reply = GameReplyDTO(request_id=command.request_id)
+                if missed is not None:
+                    reply.events, reply.hand = missed
+        except GameOwnedException:
+            return
+        await self._ws.publish_encoded(
+            command.reply_room, reply.model_dump_json(), droppable=False
+        )
+
+    async def _on_reply(self, payload: str) -> None:
+        reply = GameReplyDTO.model_validate_json(payload)
+        future = self._requests.get(reply.request_id)
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+
+async def _publish_to_game_room(
+    ws: WSConnectionManager,
+    game_id: UUID,
+    events: GameEventsDTO,
+    hands: dict[UUID, HandDTO],
+) -> None:
+    """
+    Publish the events once to the game room
+    and every new hand only to the room of its holder.
+
+    A hand is sent once, so it is never dropped,
+    while a client that misses events gets them again on resync.
+    """
+    await ws.publish(
+        Room.game(game_id), ResponseDTO[GameEventsDTO](data=events)
+    )
+    for user_id, hand in hands.items():
+        await ws.publish(
+            Room.player(game_id, user_id),
+            ResponseDTO[HandDTO](data=hand),
+            droppable=False,
+        )
+
+
+game_state_manager = GameStateManager()
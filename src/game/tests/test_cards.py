@@ -0,0 +1,104 @@
+import pytest
+
+from game import cards
+
+
+class TestConversion:
+    def test_round_trip(self):
+        for card in range(cards.DECK_SIZE):
+            dto = cards.to_dto(card)
+            assert cards.get_suit(card) == dto.suit
+            assert cards.get_value(card) == dto.value
+            assert cards.from_dto(dto) == card
+
+    def test_canonical_order(self):
+        assert [cards.to_dto(card) for card in (0, 8, 9, 35)] == [
+            cards.to_dto(cards.make_card(suit, value))
+            for suit, value in (("H", 6), ("H", 14), ("D", 6), ("S", 14))
+        ]
+
+
+class TestDeal:
+    @pytest.mark.parametrize(
+        "players_number, cards_per_player", [(2, 1), (4, 9), (6, 6), (5, 7)]
+    )
+    def test_hands_and_rest(self, players_number, cards_per_player):
+        hands, rest = cards.deal(players_number, cards_per_player)
+        assert [len(hand) for hand in hands] == (
+            [cards_per_player] * players_number
+        )
+        dealt = [card for hand in hands for card in hand] + rest
+        assert sorted(dealt) == list(range(cards.DECK_SIZE))
+
+    def test_seeded(self):
+        assert cards.deal(3, 5, 7) == cards.deal(3, 5, 7)
+
+    def test_seeded_deal_is_pinned(self):
+        # Seeded deals are stored as seeds, so they must never change
+        assert cards.deal(3, 5, 7) == (
+            [[2, 10, 27, 5, 32], [21, 18, 19, 9, 23], [1, 8, 17, 35, 31]],
+            [15, 4, 11, 20, 7, 33, 34, 22, 30, 16, 29, 14, 13, 25, 28]
+            + [6, 26, 0, 12, 24, 3],
+        )
+
+    def test_splitmix64(self):
+        # Reference outputs of SplitMix64
+        assert cards._splitmix64(0)[1] == 0xE220A8397B1DCDAF
+        assert cards._splitmix64(1234567)[1] == 6457827717110365317
+
+    def test_shuffle_is_a_permutation(self):
+        for seed in (0, 1, 2**63 - 1, 2**64 + 5):
+            deck = list(range(cards.DECK_SIZE))
+            cards.shuffle(deck, seed)
+            assert sorted(deck) == list(range(cards.DECK_SIZE))
+
+
+class TestHand:
+    def test_round_trip(self):
+        hand_cards = [35, 0, 17, 9]
+        hand = cards.to_hand(hand_cards)
+        assert list(cards.iter_hand(hand)) == sorted(hand_cards)
+        assert cards.count(hand) == 4
+        assert cards.hand_from_dtos(cards.hand_to_dtos(hand)) == hand
+
+    def test_has_card(self):
+        hand = cards.to_hand([3, 20])
+        assert cards.has_card(hand, 20)
+        assert not cards.has_card(hand, 21)
+
+    def test_filter_suit(self):
+        hand = cards.to_hand(
+            [
+                cards.make_card("H", 6),
+                cards.make_card("H", 14),
+                cards.make_card("D", 6),
+                cards.make_card("S", 10),
+            ]
+        )
+        hearts = cards.filter_suit(hand, "H")
+        assert cards.to_dtos(cards.iter_hand(hearts)) == [
+            cards.to_dto(cards.make_card("H", 6)),
+            cards.to_dto(cards.make_card("H", 14)),
+        ]
+        assert cards.filter_suit(hand, "C") == 0
+
+
+class TestBeats:
+    @pytest.mark.parametrize(
+        "card, other, trump_suit, expected",
+        [
+            (("H", 10), ("H", 9), None, True),
+            (("H", 9), ("H", 10), "H", False),
+            (("D", 6), ("H", 14), "D", True),
+            (("H", 14), ("D", 6), "D", False),
+            (("S", 14), ("C", 6), None, False),
+            (("S", 14), ("C", 6), "H", False),
+        ],
+    )
+    def test_beats(self, card, other, trump_suit, expected):
+        assert (
+            cards.beats(
+                cards.make_card(*card), cards.make_card(*other), trump_suit
+            )
+            is expected
+        )
@@ -0,0 +1,110 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from asyncpg.exceptions import ForeignKeyViolationError
+
+from game.event_log import GameEventLog, replay
+from game.exceptions import GameEventConflictException
+from game.models import GameEvent
+from game.services.game import GameService
+from game.state import GameState, GameStateManager
+from game.tests.test_services import count
+from game.tests.test_state import (
+    Publisher,
+    create_game,
+    play_first_card,
+    play_info_card,
+)
+from game.tests.test_views import make_info
+from unitofwork import UnitOfWork
+
+pytestmark = pytest.mark.asyncio
+
+
+async def replay_game(game_id, seq: int):
+    uow = UnitOfWork()
+    async with uow:
+        return await GameService(uow).replay_game(game_id, seq)
+
+
+class TestReplay:
+    async def test_replay_at_every_seq(self):
+        info, next_info = make_info(), make_info()
+        state = GameState(uuid4(), info)
+        infos = [info.model_copy(deep=True)]
+        for index in (0, 1):
+            state.play(play_info_card(info, index))
+            infos.append(info.model_copy(deep=True))
+        state.advance(next_info)
+        log = state.pop_log()
+        assert [event.seq for event in log] == list(range(6))
+        for seq, expected in enumerate(infos):
+            assert replay(log[: seq + 1]) == expected
+        assert replay(log) == next_info
+
+
+class TestGameEventLog:
+    async def test_moves_are_logged(self):
+        manager = GameStateManager(write_behind_delay=60, publish=Publisher())
+        game = await create_game("event_log")
+        view = await manager.get_view(game.id)
+        for index in (0, 1):
+            manager.submit(game.id, play_first_card(view, index))
+        played = await manager.get_view(game.id)
+        await manager.close()
+
+        events = select(GameEvent.seq).filter_by(game_id=game.id)
+        assert await count(events) == 3
+        for seq, expected in ((view.version, view), (played.version, played)):
+            info = await replay_game(game.id, seq)
+            assert [len(user.cards) for user in info.users] == [
+                user.cards_count for user in expected.public.users
+            ]
+            assert info.entry == expected.public.entry
+        assert await replay_game(game.id, view.version - 1) is None
+
+    async def test_logged_events_are_skipped(self):
+        game = await create_game("event_log_twice")
+        state = GameState(game.id, make_info())
+        state.play(play_info_card(state.info, 0))
+        log = state.pop_log()
+        event_log = GameEventLog(flush_interval=60)
+        event_log.append(log[:1])
+        await event_log.flush()
+        event_log.append(log)
+        await event_log.close()
+        assert event_log.pending_events_count == 0
+        assert event_log.skipped_events_count == 1
+        events = select(GameEvent.seq).filter_by(game_id=game.id)
+        assert await count(events) == 2
+
+    async def test_conflicting_events_are_an_error(self):
+        game = await create_game("event_log_conflict")
+        state = GameState(game.id, make_info())
+        state.play(play_info_card(state.info, 0))
+        log = state.pop_log()
+        event_log = GameEventLog(flush_interval=60)
+        event_log.append(log[:1])
+        await event_log.flush()
+        other_log = GameState(game.id, make_info()).pop_log()
+        event_log.append(other_log + log[1:])
+        with pytest.raises(GameEventConflictException):
+            await event_log.flush()
+        assert event_log.pending_events_count == 0
+        assert event_log.skipped_events_count == 0
+        assert event_log.conflicting_events_count == 1
+        events = select(GameEvent.seq).filter_by(game_id=game.id)
+        assert await count(events) == 2
+
+    async def test_failed_events_are_kept(self):
+        state = GameState(uuid4(), make_info())
+        event_log = GameEventLog(flush_interval=60)
+        event_log.append(state.pop_log())
+        with pytest.raises(ForeignKeyViolationError):
+            await event_log.flush()
+        assert event_log.pending_events_count == 1
+        assert event_log.skipped_events_count == 0
+        event_log._events.clear()
+        await event_log.close()
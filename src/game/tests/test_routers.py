@@ -0,0 +1,115 @@
+import json
+from typing import cast
+
+import pytest
+from fastapi.websockets import WebSocket, WebSocketDisconnect
+
+from auth.schemas import UserInfoDTO
+from game import router
+from game.state import GameStateManager
+from game.tests.test_services import get_full_game_info
+from game.tests.test_state import create_game
+from managers import WSConnectionManager
+
+pytestmark = pytest.mark.asyncio
+
+
+class ScriptedWebSocket:
+    """
+    Websocket receiving the given frames, then the disconnect.
+    """
+
+    def __init__(self, manager: WSConnectionManager, frames: list) -> None:
+        self.sent: list = []
+        self.close_code: int | None = None
+        self._manager = manager
+        self._frames = frames
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+    async def receive_text(self) -> str:
+        # The answers to the previous frame are written first
+        await self._manager.drain()
+        if not self._frames:
+            raise WebSocketDisconnect()
+        return self._frames.pop(0)
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+
+
+@pytest.fixture
+async def managers(monkeypatch):
+    ws_manager = WSConnectionManager()
+    game_state_manager = GameStateManager(write_behind_delay=60, ws=ws_manager)
+    monkeypatch.setattr(router, "ws_manager", ws_manager)
+    monkeypatch.setattr(router, "game_state_manager", game_state_manager)
+    yield ws_manager, game_state_manager
+    await game_state_manager.close()
+    await ws_manager.close()
+
+
+class TestPlayGame:
+    async def test_invalid_messages_are_answered(self, managers):
+        ws_manager, game_state_manager = managers
+        game = await create_game("router_invalid")
+        info = await get_full_game_info(game.id)
+        user = info.users[0]
+        websocket = ScriptedWebSocket(
+            ws_manager,
+            [
+                "not json",
+                json.dumps({"card_id": "not a uuid"}),
+                json.dumps([1]),
+                json.dumps({"type": "resync"}),
+            ],
+        )
+        await router.play_game(
+            cast(WebSocket, websocket),
+            UserInfoDTO(id=user.id, username=user.username),
+            game.id,
+        )
+        assert [
+            message["data"]["type"] if "data" in message else "error"
+            for message in websocket.sent
+        ] == ["snapshot", "error", "error", "error", "snapshot"]
+        assert (
+            websocket.sent[1:4]
+            == [{"error": {"message": "Invalid message"}}] * 3
+        )
+        assert ws_manager.get_connections_count() == 0
+        assert game.id not in game_state_manager._actors
+
+    async def test_failure_releases_connection_and_game(
+        self, managers, monkeypatch
+    ):
+        ws_manager, game_state_manager = managers
+        game = await create_game("router_failure")
+        info = await get_full_game_info(game.id)
+        user = info.users[0]
+        send_game_snapshot = router._send_game_snapshot
+        calls = 0
+
+        async def fail_on_resync(*args) -> None:
+            nonlocal calls
+            calls += 1
+            if calls > 1:
+                raise ConnectionError("database is unavailable")
+            await send_game_snapshot(*args)
+
+        monkeypatch.setattr(router, "_send_game_snapshot", fail_on_resync)
+        websocket = ScriptedWebSocket(
+            ws_manager, [json.dumps({"type": "resync"})]
+        )
+        with pytest.raises(ConnectionError):
+            await router.play_game(
+                cast(WebSocket, websocket),
+                UserInfoDTO(id=user.id, username=user.username),
+                game.id,
+            )
+        assert ws_manager.get_connections_count() == 0
+        assert game.id not in game_state_manager._actors
@@ -0,0 +1,317 @@
+import asyncio
+from uuid import UUID
+
+import pytest
+from sqlalchemy import event, select, func, insert, update
+
+from auth.models import User
+from database import async_session_maker, engine
+from game import cards
+from game.models import Set, Dealing, Card, GamePlayer
+from game.schemas import LobbyUserInfoDTO, ProcessCardDTO, FullGameCardInfoDTO
+from game.services.game import GameService
+from game.state import GameState
+from unitofwork import UnitOfWork
+
+pytestmark = pytest.mark.asyncio
+
+
+async def create_players(prefix: str, number: int) -> list[LobbyUserInfoDTO]:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"{prefix}_{index}", hashed_password="string")
+            for index in range(number)
+        ]
+        session.add_all(users)
+        await session.commit()
+    return [
+        LobbyUserInfoDTO(
+            id=user.id, username=user.username, is_leader=index == 0
+        )
+        for index, user in enumerate(users)
+    ]
+
+
+async def count(query) -> int:
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(func.count()).select_from(query.subquery())
+        )
+        return result.scalar()
+
+
+async def get_full_game_info(game_id: UUID) -> FullGameCardInfoDTO:
+    uow = UnitOfWork()
+    async with uow:
+        return await GameService(uow).get_full_game_info(game_id)
+
+
+async def advance_round(game_id: UUID) -> FullGameCardInfoDTO:
+    uow = UnitOfWork()
+    service = GameService(uow)
+    async with uow:
+        info = await service.get_full_game_info(game_id)
+        await service.advance_round(game_id, info.set_id)
+        await uow.commit()
+    return await get_full_game_info(game_id)
+
+
+async def play_card(
+    game_id: UUID, info: FullGameCardInfoDTO, card: ProcessCardDTO
+) -> None:
+    played = GameState(game_id, info.model_copy(deep=True)).play(card)
+    assert played is not None
+    await GameService(UnitOfWork()).save_moves([played], game_id)
+
+
+class TestCreateGame:
+    @pytest.mark.parametrize("players_number", [2, 3, 6])
+    async def test_schedules_every_set_and_deals_first(
+        self, players_number: int
+    ):
+        players = await create_players(
+            f"create_game_{players_number}", players_number
+        )
+        game = await GameService(UnitOfWork()).create_game(players, True)
+        assert game is not None
+
+        set_names = GameService._generate_sets(players_number)
+        sets = select(Set.id).filter_by(game_id=game.id)
+        dealings = select(Dealing.id).filter(Dealing.set_id.in_(sets))
+        cards = select(Card.id).filter(Card.dealing_id.in_(dealings))
+        game_players = select(GamePlayer.user_id).filter_by(game_id=game.id)
+        assert await count(game_players) == players_number
+        assert await count(sets) == len(set_names)
+        assert await count(sets.filter(Set.dealer_id.is_(None))) == 0
+        assert await count(sets.filter_by(is_current_round=True)) == 1
+        assert await count(dealings) == players_number
+        assert await count(cards) == players_number
+
+    async def test_next_set_is_dealt_when_it_becomes_current(self):
+        players = await create_players("advance_round", 3)
+        game = await GameService(UnitOfWork()).create_game(players, True)
+        assert game is not None
+        sets = (
+            select(Set.id, Set.dealer_id, Set.opening_player_id)
+            .filter_by(game_id=game.id)
+            .order_by(Set.round_number)
+        )
+        async with async_session_maker() as session:
+            schedule = (await session.execute(sets)).fetchall()
+        info = await get_full_game_info(game.id)
+
+        next_info = await advance_round(game.id)
+        assert next_info.set_id != info.set_id
+        assert [user.id for user in next_info.users] == [
+            user.id for user in info.users
+        ]
+        assert [len(user.cards) for user in next_info.users] == [1, 1, 1]
+        current_sets = select(Set.round_number).filter_by(
+            game_id=game.id, is_current_round=True
+        )
+        async with async_session_maker() as session:
+            assert (await session.execute(current_sets)).scalar() == 2
+            assert (await session.execute(sets)).fetchall() == schedule
+        dealings = select(Dealing.id).filter(
+            Dealing.set_id.in_(select(Set.id).filter_by(game_id=game.id))
+        )
+        assert await count(dealings) == 6
+
+    async def test_no_game_without_flag(self):
+        players = await create_players("no_game", 2)
+        game = await GameService(UnitOfWork()).create_game(players, False)
+        assert game is None
+
+
+def sort_cards(info: FullGameCardInfoDTO) -> FullGameCardInfoDTO:
+    for user in info.users:
+        user.cards.sort(key=lambda card: (card.suit, card.value))
+    return info
+
+
+class TestAdvanceRound:
+    @pytest.mark.parametrize("deal_mode", ["materialized", "seed"])
+    async def test_returns_next_set(self, deal_mode: str):
+        players = await create_players(f"advance_info_{deal_mode}", 3)
+        service = GameService(UnitOfWork(), deal_mode=deal_mode)
+        game = await service.create_game(players, True)
+        assert game is not None
+        # Up to the first set with 2 cards per player
+        for _ in range(len(players)):
+            info = await get_full_game_info(game.id)
+            uow = UnitOfWork()
+            async with uow:
+                next_info = await GameService(
+                    uow, deal_mode=deal_mode
+                ).advance_round(game.id, info.set_id)
+                await uow.commit()
+
+        assert next_info is not None
+        assert [len(user.cards) for user in next_info.users] == [2, 2, 2]
+        assert sort_cards(next_info) == sort_cards(
+            await get_full_game_info(game.id)
+        )
+
+    async def test_concurrent_round_ends_advance_once(self):
+        players = await create_players("advance_concurrent", 3)
+        game = await GameService(UnitOfWork()).create_game(players, True)
+        assert game is not None
+        info = await get_full_game_info(game.id)
+
+        async def end_round() -> FullGameCardInfoDTO | None:
+            uow = UnitOfWork()
+            async with uow:
+                next_info = await GameService(uow).advance_round(
+                    game.id, info.set_id
+                )
+                await uow.commit()
+            return next_info
+
+        results = await asyncio.gather(end_round(), end_round())
+        assert sorted(result is None for result in results) == [False, True]
+        current_sets = select(Set.round_number).filter_by(
+            game_id=game.id, is_current_round=True
+        )
+        async with async_session_maker() as session:
+            assert (await session.execute(current_sets)).scalars().all() == [2]
+        dealings = select(Dealing.id).filter(
+            Dealing.set_id.in_(select(Set.id).filter_by(game_id=game.id))
+        )
+        assert await count(dealings) == 6
+
+
+class TestSaveMoves:
+    @pytest.mark.parametrize("is_round_end", [False, True])
+    async def test_one_commit_per_move(self, is_round_end: bool):
+        players = await create_players(f"commits_{is_round_end}", 2)
+        game = await GameService(UnitOfWork()).create_game(players, True)
+        assert game is not None
+        info = await get_full_game_info(game.id)
+        owner = info.users[0]
+        commits = []
+
+        def on_commit(connection) -> None:
+            commits.append(connection)
+
+        event.listen(engine.sync_engine, "commit", on_commit)
+        try:
+            await play_card(
+                game.id,
+                info,
+                ProcessCardDTO(
+                    card_id=owner.cards[0].id,
+                    owner_id=owner.id,
+                    set_id=info.set_id,
+                    is_round_end=is_round_end,
+                ),
+            )
+        finally:
+            event.remove(engine.sync_engine, "commit", on_commit)
+        assert len(commits) == 1
+        played_info = await get_full_game_info(game.id)
+        assert (played_info.set_id != info.set_id) is is_round_end
+
+
+class TestFullGameInfo:
+    async def test_users_once_in_seat_order(self):
+        players = await create_players("full_info", 3)
+        game = await GameService(UnitOfWork()).create_game(players, True)
+        assert game is not None
+        # Play up to the first set with 2 cards per player
+        for _ in range(len(players)):
+            info = await advance_round(game.id)
+
+        assert [user.id for user in info.users] == [p.id for p in players]
+        for user in info.users:
+            assert len(user.cards) == 2
+            assert {card.user_id for card in user.cards} == {user.id}
+
+
+class TestSeededDeals:
+    async def _create_game(self, prefix: str, players_number: int):
+        players = await create_players(prefix, players_number)
+        service = GameService(UnitOfWork(), deal_mode="seed")
+        return await service.create_game(players, True)
+
+    async def test_no_card_rows(self):
+        game = await self._create_game("seed_rows", 3)
+        sets = select(Set.id).filter_by(game_id=game.id)
+        dealings = select(Dealing.id).filter(Dealing.set_id.in_(sets))
+        cards = select(Card.id).filter(Card.dealing_id.in_(dealings))
+        assert await count(sets.filter(Set.deal_seed.is_not(None))) == 1
+        assert await count(dealings) == 3
+        assert await count(cards) == 0
+
+    @pytest.mark.parametrize("set_name", ["1", "5", "BR"])
+    async def test_deal_is_deterministic(self, set_name: str):
+        hands = GameService._deal_from_seed(42, set_name, 4)
+        assert hands == GameService._deal_from_seed(42, set_name, 4)
+        assert hands == tuple(
+            cards.to_hand(hand)
+            for hand in cards.deal(4, cards.count(hands[0]), 42)[0]
+        )
+        size = int(set_name) if set_name.isnumeric() else 9
+        assert [cards.count(hand) for hand in hands] == [size] * 4
+        assert cards.count(hands[0] | hands[1] | hands[2] | hands[3]) == (
+            size * 4
+        )
+
+    async def test_play_card(self):
+        game = await self._create_game("seed_play", 2)
+        info = await get_full_game_info(game.id)
+        assert [len(user.cards) for user in info.users] == [1, 1]
+        owner = info.users[0]
+        card = owner.cards[0]
+        await play_card(
+            game.id,
+            info,
+            ProcessCardDTO(
+                card_id=card.id, owner_id=owner.id, set_id=info.set_id
+            ),
+        )
+
+        dealings = select(Dealing.id).filter_by(set_id=info.set_id)
+        assert (
+            await count(select(Card.id).filter(Card.dealing_id.in_(dealings)))
+            == 1
+        )
+        played_info = await get_full_game_info(game.id)
+        assert played_info.entry is not None
+        assert played_info.entry.cards == [
+            card.model_copy(update={"entry_id": played_info.entry.id})
+        ]
+        assert played_info.users[0].cards == []
+        assert played_info.users[1].cards == info.users[1].cards
+
+    async def test_same_payload_as_materialized(self):
+        game = await self._create_game("seed_payload", 3)
+        seeded_info = await get_full_game_info(game.id)
+        async with async_session_maker() as session:
+            await session.execute(
+                insert(Card),
+                [
+                    dict(
+                        id=card.id,
+                        dealing_id=(
+                            await session.execute(
+                                select(Dealing.id).filter_by(
+                                    set_id=seeded_info.set_id,
+                                    user_id=user.id,
+                                )
+                            )
+                        ).scalar(),
+                        suit=card.suit,
+                        value=card.value,
+                    )
+                    for user in seeded_info.users
+                    for card in user.cards
+                ],
+            )
+            await session.execute(
+                update(Set)
+                .filter_by(id=seeded_info.set_id)
+                .values(deal_seed=None)
+            )
+            await session.commit()
+        materialized_info = await get_full_game_info(game.id)
+        assert sort_cards(seeded_info) == sort_cards(materialized_info)
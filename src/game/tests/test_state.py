@@ -0,0 +1,530 @@
+import asyncio
+import json
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import select
+
+from game.exceptions import GameOwnedException
+from game.models import Card, Entry, Set
+from game.schemas import GameEventsDTO, HandDTO, ProcessCardDTO
+from game.services.game import GameService
+from game.state import GameState, GameStateManager
+from game.views import GameView
+from managers import Room, WSConnectionManager
+from game.tests.test_services import (
+    create_players,
+    count,
+    get_full_game_info,
+)
+from game.tests.test_views import make_info
+from tests.test_managers import FakeWebSocket
+from unitofwork import UnitOfWork
+
+pytestmark = pytest.mark.asyncio
+
+
+class CountingUnitOfWork(UnitOfWork):
+    commits = 0
+
+    async def commit(self) -> None:
+        CountingUnitOfWork.commits += 1
+        await super().commit()
+
+
+class FailingUnitOfWork(UnitOfWork):
+    failures = 0
+
+    async def commit(self) -> None:
+        if FailingUnitOfWork.failures:
+            FailingUnitOfWork.failures -= 1
+            raise ConnectionError("database is unavailable")
+        await super().commit()
+
+
+class Publisher(list):
+    """
+    Records the published messages.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.hands: dict[UUID, HandDTO] = {}
+
+    async def __call__(
+        self,
+        game_id: UUID,
+        events: GameEventsDTO,
+        hands: dict[UUID, HandDTO],
+    ):
+        self.append(events)
+        self.hands.update(hands)
+
+    @property
+    def events(self) -> list:
+        return [event for message in self for event in message.events]
+
+
+@pytest.fixture
+async def make_manager():
+    managers = []
+
+    def _make_manager(**kwargs) -> GameStateManager:
+        kwargs.setdefault("uow_factory", CountingUnitOfWork)
+        managers.append(GameStateManager(**kwargs))
+        return managers[-1]
+
+    yield _make_manager
+    for manager in managers:
+        await manager.close()
+
+
+async def create_game(prefix: str, players_number: int = 2):
+    players = await create_players(prefix, players_number)
+    return await GameService(UnitOfWork()).create_game(players, True)
+
+
+def play_first_card(view, user_index: int, **kwargs) -> ProcessCardDTO:
+    user = view.public.users[user_index]
+    return ProcessCardDTO(
+        card_id=view.hands[user.id][0].id,
+        owner_id=view.public.users[0].id,
+        set_id=view.public.set_id,
+        **kwargs,
+    )
+
+
+def play_info_card(info, user_index: int) -> ProcessCardDTO:
+    user = info.users[user_index]
+    return ProcessCardDTO(
+        card_id=user.cards[0].id, owner_id=user.id, set_id=info.set_id
+    )
+
+
+class TestGameState:
+    async def test_resume_sends_missed_events(self):
+        info = make_info()
+        state = GameState(uuid4(), info, history_size=4)
+        for index in range(3):
+            state.play(play_info_card(info, index))
+        missed = state.resume(state.id, 1, info.users[0].id)
+        assert missed is not None
+        events, hand = missed
+        assert [event.version for event in events.events] == [2, 3]
+        assert hand is None
+        missed = state.resume(state.id, 3, info.users[0].id)
+        assert missed is not None
+        assert missed[0].events == []
+
+    async def test_resume_needs_snapshot(self):
+        info = make_info()
+        state = GameState(uuid4(), info, history_size=4)
+        for index in (0, 1, 2, 0, 1):
+            state.play(play_info_card(info, index))
+        user_id = info.users[0].id
+        assert state.resume(state.id, 0, user_id) is None
+        assert state.resume(state.id, 1, user_id) is not None
+        assert state.resume(state.id, 6, user_id) is None
+        assert state.resume(uuid4(), 5, user_id) is None
+
+    async def test_resume_sends_hand_dealt_since(self):
+        info, next_info = make_info(), make_info()
+        state = GameState(uuid4(), info)
+        state.play(play_info_card(info, 0))
+        state.advance(next_info)
+        user = next_info.users[1]
+        missed = state.resume(state.id, 1, user.id)
+        assert missed is not None
+        events, hand = missed
+        assert [event.type for event in events.events] == [
+            "entry_closed",
+            "round_advanced",
+            "trump_set",
+        ]
+        assert hand is not None
+        assert hand.version == 3
+        assert hand.cards == user.cards
+        missed = state.resume(state.id, 3, user.id)
+        assert missed is not None
+        assert missed[1] is None
+
+
+class TestGameStateManager:
+    async def test_move_is_applied_in_memory(self, make_manager):
+        published = Publisher()
+        manager = make_manager(write_behind_delay=60, publish=published)
+        game = await create_game("state_memory")
+        view = await manager.get_view(game.id)
+        card = play_first_card(view, 0)
+
+        manager.submit(game.id, card)
+        await manager.join(game.id)
+        played = await manager.get_view(game.id)
+        first_user = played.public.users[0]
+        assert played.version == view.version + 1
+        assert first_user.cards_count == 0
+        assert played.hands[first_user.id] == []
+        assert [c.id for c in played.public.entry.cards] == [card.card_id]
+        assert [(e.type, e.version) for e in published.events] == [
+            ("card_played", played.version)
+        ]
+        assert published.events[0].card == played.public.entry.cards[0]
+        entries = select(Entry.id).filter_by(set_id=view.public.set_id)
+        assert await count(entries) == 0
+        assert manager.get_pending_moves_count() == 1
+
+        await manager.flush(game.id)
+        assert (
+            await count(
+                select(Card.id).filter_by(entry_id=played.public.entry.id)
+            )
+            == 1
+        )
+        info = await get_full_game_info(game.id)
+        reloaded = GameView(uuid4(), played.version, info)
+        assert reloaded.public == played.public
+        assert reloaded.hands == played.hands
+
+    async def test_moves_of_one_tick_are_published_once(self, make_manager):
+        published = Publisher()
+        manager = make_manager(write_behind_delay=60, publish=published)
+        game = await create_game("state_tick", 3)
+        view = await manager.get_view(game.id)
+        cards = [play_first_card(view, index) for index in (2, 0, 1)]
+        for card in cards:
+            manager.submit(game.id, card)
+        await manager.join(game.id)
+        assert len(published) == 1
+        assert [e.version - view.version for e in published.events] == [
+            1,
+            2,
+            3,
+        ]
+        assert [e.card.id for e in published.events] == [
+            card.card_id for card in cards
+        ]
+
+    async def test_view_follows_the_events_of_its_batch(
+        self, make_manager, monkeypatch
+    ):
+        published = Publisher()
+        publishing = asyncio.Event()
+        released = asyncio.Event()
+        # Versions of the published events and of the views, in order
+        versions: list[tuple[str, int]] = []
+
+        async def publish(game_id, events, hands) -> None:
+            publishing.set()
+            await released.wait()
+            versions.extend(("event", e.version) for e in events.events)
+            await published(game_id, events, hands)
+
+        get_view = GameState.get_view
+
+        def get_logged_view(state: GameState) -> GameView:
+            view = get_view(state)
+            versions.append(("view", view.version))
+            return view
+
+        manager = make_manager(write_behind_delay=60, publish=publish)
+        game = await create_game("state_view_batch", 3)
+        view = await manager.get_view(game.id)
+        cards = [play_first_card(view, index) for index in (2, 0, 1)]
+        monkeypatch.setattr(GameState, "get_view", get_logged_view)
+        manager.submit(game.id, cards[0])
+        await publishing.wait()
+        # The actor is publishing, the next commands make one batch
+        manager.submit(game.id, cards[1])
+        view_task = asyncio.create_task(manager.get_view(game.id))
+        await asyncio.sleep(0)
+        manager.submit(game.id, cards[2])
+        released.set()
+        middle = await view_task
+        await manager.join(game.id)
+        assert middle.version == view.version + 2
+        assert versions == [
+            ("event", view.version + 1),
+            ("event", view.version + 2),
+            ("view", view.version + 2),
+            ("event", view.version + 3),
+        ]
+
+    async def test_moves_are_persisted_in_one_batch(self, make_manager):
+        manager = make_manager(write_behind_delay=0.01)
+        game = await create_game("state_batch")
+        view = await manager.get_view(game.id)
+        CountingUnitOfWork.commits = 0
+        manager.submit(game.id, play_first_card(view, 0))
+        await manager.join(game.id)
+        manager.submit(game.id, play_first_card(view, 1))
+        await manager.close()
+        assert CountingUnitOfWork.commits == 1
+        assert manager.get_pending_moves_count() == 0
+        assert (
+            await count(select(Card.id).filter(Card.entry_id.is_not(None)))
+            >= 2
+        )
+
+    async def test_busy_game_is_persisted_after_the_delay(self, make_manager):
+        manager = make_manager(write_behind_delay=0.1)
+        game = await create_game("state_busy")
+        view = await manager.get_view(game.id)
+        manager.submit(game.id, play_first_card(view, 0))
+        # Commands keep coming faster than the delay
+        for _ in range(10):
+            await asyncio.sleep(0.03)
+            await manager.get_view(game.id)
+            if not manager.get_pending_moves_count():
+                break
+        assert manager.get_pending_moves_count() == 0
+
+    async def test_max_moves_are_persisted_at_once(self, make_manager):
+        manager = make_manager(write_behind_delay=60, write_behind_max_moves=2)
+        game = await create_game("state_max_moves")
+        view = await manager.get_view(game.id)
+        manager.submit(game.id, play_first_card(view, 0))
+        await manager.join(game.id)
+        assert manager.get_pending_moves_count() == 1
+        manager.submit(game.id, play_first_card(view, 1))
+        await manager.join(game.id)
+        assert manager.get_pending_moves_count() == 0
+
+    async def test_unknown_card_is_ignored(self, make_manager):
+        published = Publisher()
+        manager = make_manager(write_behind_delay=60, publish=published)
+        game = await create_game("state_unknown")
+        view = await manager.get_view(game.id)
+        card = play_first_card(view, 0)
+        manager.submit(game.id, card)
+        manager.submit(game.id, card)
+        await manager.join(game.id)
+        assert [e.version for e in published.events] == [view.version + 1]
+        assert manager.get_pending_moves_count() == 1
+
+    async def test_round_end_loads_next_set(self, make_manager):
+        published = Publisher()
+        manager = make_manager(write_behind_delay=60, publish=published)
+        game = await create_game("state_round_end")
+        view = await manager.get_view(game.id)
+        manager.submit(game.id, play_first_card(view, 0))
+        manager.submit(game.id, play_first_card(view, 1, is_round_end=True))
+        await manager.join(game.id)
+        events = published.events
+        assert [(e.type, e.version - view.version) for e in events] == [
+            ("card_played", 1),
+            ("card_played", 2),
+            ("entry_closed", 3),
+            ("round_advanced", 4),
+            ("trump_set", 5),
+        ]
+        next_view = await manager.get_view(game.id)
+        assert next_view.version == view.version + 5
+        assert next_view.public.set_id == events[3].set_id
+        assert next_view.public.set_id != view.public.set_id
+        assert next_view.public.users == events[3].users
+        assert next_view.public.trump_suit == events[4].trump_suit
+        assert next_view.public.entry is None
+        assert {
+            user_id: (hand.version, hand.cards)
+            for user_id, hand in published.hands.items()
+        } == {
+            user_id: (events[3].version, cards)
+            for user_id, cards in next_view.hands.items()
+        }
+        assert manager.get_pending_moves_count() == 0
+        current_sets = select(Set.id).filter_by(
+            game_id=game.id, is_current_round=True
+        )
+        assert await count(current_sets) == 1
+        assert (
+            await count(
+                select(Card.id).filter(
+                    Card.entry_id.in_(
+                        select(Entry.id).filter_by(set_id=view.public.set_id)
+                    )
+                )
+            )
+            == 2
+        )
+
+    async def test_failed_round_end_is_advanced_on_retry(self, make_manager):
+        published = Publisher()
+        manager = make_manager(
+            write_behind_delay=0.05,
+            publish=published,
+            uow_factory=FailingUnitOfWork,
+        )
+        game = await create_game("state_round_end_retry")
+        view = await manager.get_view(game.id)
+        FailingUnitOfWork.failures = 1
+        manager.submit(game.id, play_first_card(view, 0))
+        manager.submit(game.id, play_first_card(view, 1, is_round_end=True))
+        await manager.join(game.id)
+        assert FailingUnitOfWork.failures == 0
+        assert manager.get_pending_moves_count() == 2
+        assert [e.type for e in published.events] == ["card_played"] * 2
+
+        for _ in range(20):
+            await asyncio.sleep(0.05)
+            if len(published.events) > 2:
+                break
+        assert [e.type for e in published.events[2:]] == [
+            "entry_closed",
+            "round_advanced",
+            "trump_set",
+        ]
+        assert manager.get_pending_moves_count() == 0
+        next_view = await manager.get_view(game.id)
+        assert next_view.public.set_id == published.events[3].set_id
+        assert next_view.public.set_id != view.public.set_id
+        assert set(published.hands) == set(next_view.hands)
+
+    async def test_release_persists_and_stops(self, make_manager):
+        published = Publisher()
+        manager = make_manager(write_behind_delay=60, publish=published)
+        game = await create_game("state_release")
+        view = await manager.get_view(game.id)
+        card = play_first_card(view, 0)
+        manager.submit(game.id, card)
+        await manager.release(game.id)
+        assert manager.get_pending_moves_count() == 0
+        assert game.id not in manager._actors
+        assert (
+            await count(
+                select(Card.id).filter(
+                    Card.id == card.card_id, Card.entry_id.is_not(None)
+                )
+            )
+            == 1
+        )
+
+    async def test_reconnecting_client_resumes(self, make_manager):
+        manager = make_manager(write_behind_delay=60, publish=Publisher())
+        game = await create_game("state_resume", 3)
+        view = await manager.get_view(game.id)
+        for index in range(3):
+            manager.submit(game.id, play_first_card(view, index))
+        user_id = view.public.users[0].id
+        events, hand = await manager.resume(
+            game.id, view.state_id, view.version + 1, user_id
+        )
+        assert [event.version - view.version for event in events.events] == [
+            2,
+            3,
+        ]
+        assert hand is None
+        await manager.release(game.id)
+        # The reloaded state has a new id and continues the event log
+        reloaded = await manager.get_view(game.id)
+        assert reloaded.version == view.version + 4
+        assert (
+            await manager.resume(
+                game.id, view.state_id, view.version + 3, user_id
+            )
+            is None
+        )
+
+    async def test_game_is_loaded_by_one_manager(self, make_manager):
+        first = make_manager(write_behind_delay=60, publish=Publisher())
+        second = make_manager(write_behind_delay=60, publish=Publisher())
+        game = await create_game("state_owned")
+        view = await first.get_view(game.id)
+        with pytest.raises(GameOwnedException):
+            await second.get_view(game.id)
+        first.submit(game.id, play_first_card(view, 0))
+        # Requests are forwarded to the owner
+        missed = await second.resume(
+            game.id, view.state_id, view.version, uuid4()
+        )
+        assert missed is not None
+        assert [e.version for e in missed[0].events] == [view.version + 1]
+        assert missed[1] is None
+
+        await first.release(game.id)
+        reloaded = await second.get_view(game.id)
+        assert reloaded.version == view.version + 2
+        with pytest.raises(GameOwnedException):
+            await first.get_view(game.id)
+        await second.close()
+        # Loading the state again logs a snapshot
+        assert (await first.get_view(game.id)).version == reloaded.version + 1
+
+
+class TestForwarding:
+    @staticmethod
+    async def _wait_for(condition) -> None:
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.05)
+        raise TimeoutError
+
+    @pytest.fixture
+    async def workers(self):
+        workers = []
+        for _ in range(2):
+            ws = WSConnectionManager(broker="postgres")
+            await ws.start()
+            manager = GameStateManager(write_behind_delay=60, ws=ws)
+            workers.append((ws, manager))
+        yield workers
+        for ws, manager in workers:
+            await manager.close()
+            await ws.close()
+
+    async def test_players_of_both_workers_move(self, workers):
+        game = await create_game("state_forward")
+        info = await get_full_game_info(game.id)
+        websockets = []
+        snapshots = []
+        for (ws, manager), user in zip(workers, info.users):
+            websockets.append(FakeWebSocket())
+            await ws.connect(
+                websockets[-1], user.id, rooms=(Room.game(game.id),)
+            )
+            # The first worker owns the game, the second asks it
+            snapshot = await manager.get_snapshot(game.id, user.id)
+            snapshots.append(json.loads(snapshot)["data"])
+        version = snapshots[0]["version"]
+        assert snapshots[1]["version"] == version
+        assert snapshots[1]["state_id"] == snapshots[0]["state_id"]
+        assert [card["id"] for card in snapshots[1]["hand"]] == [
+            str(card.id) for card in info.users[1].cards
+        ]
+
+        def get_events(websocket: FakeWebSocket) -> list:
+            return [
+                event
+                for message in websocket.sent
+                for event in message["data"]["events"]
+            ]
+
+        for (_, manager), index in zip(workers, range(2)):
+            manager.submit(game.id, play_info_card(info, index))
+        await self._wait_for(
+            lambda: all(len(get_events(w)) == 2 for w in websockets)
+        )
+        for websocket in websockets:
+            events = get_events(websocket)
+            assert [event["version"] for event in events] == [
+                version + 1,
+                version + 2,
+            ]
+            assert {event["card"]["id"] for event in events} == {
+                str(user.cards[0].id) for user in info.users
+            }
+        assert (await workers[0][1].get_view(game.id)).version == version + 2
+        assert workers[1][1].get_pending_moves_count() == 0
+
+    async def test_unreachable_owner(self, workers):
+        (_, first), (second_ws, _) = workers
+        game = await create_game("state_unreachable")
+        await first.get_view(game.id)
+        # The owner stops listening to the commands of the game
+        first._set_owned(game.id, False)
+        second = GameStateManager(ws=second_ws, forward_timeout=0.1)
+        try:
+            with pytest.raises(GameOwnedException):
+                await second.get_snapshot(game.id, uuid4())
+        finally:
+            await second.close()
@@ -0,0 +1,83 @@
+import json
+from uuid import uuid4
+
+from game import cards
+from game.schemas import (
+    FullCardInfoDTO,
+    FullGameCardInfoDTO,
+    FullUserCardInfoDTO,
+    GameSnapshotDTO,
+    ProcessCardDTO,
+)
+from game.state import GameState
+from game.views import GameView
+from managers import encode
+from schemas import ResponseDTO
+
+
+def make_info(players_number: int = 3) -> FullGameCardInfoDTO:
+    hands, _ = cards.deal(players_number, 6)
+    users = []
+    for index, hand in enumerate(hands):
+        user_id = uuid4()
+        users.append(
+            FullUserCardInfoDTO(
+                id=user_id,
+                username=f"player_{index}",
+                cards=[
+                    FullCardInfoDTO(
+                        id=uuid4(),
+                        suit=cards.get_suit(card),
+                        value=cards.get_value(card),
+                        user_id=user_id,
+                    )
+                    for card in hand
+                ],
+            )
+        )
+    return FullGameCardInfoDTO(
+        set_id=uuid4(), users=users, trump_suit="S", trump_value=7
+    )
+
+
+class TestGameView:
+    def test_snapshot_has_only_own_hand(self):
+        info = make_info()
+        view = GameView(uuid4(), 3, info)
+        user = info.users[1]
+        snapshot = view.get_snapshot(user.id)
+        assert snapshot.version == 3
+        assert snapshot.hand == user.cards
+        assert [u.cards_count for u in snapshot.game.users] == [6, 6, 6]
+        text = view.encode_snapshot(user.id)
+        for other in (info.users[0], info.users[2]):
+            assert all(str(card.id) not in text for card in other.cards)
+
+    def test_encoded_snapshot_is_the_encoded_dto(self):
+        info = make_info()
+        view = GameView(uuid4(), 1, info)
+        for user_id in (info.users[0].id, uuid4()):
+            text = view.encode_snapshot(user_id)
+            assert text == encode(
+                ResponseDTO[GameSnapshotDTO](data=view.get_snapshot(user_id))
+            )
+            ResponseDTO[GameSnapshotDTO].model_validate(json.loads(text))
+        assert view.get_snapshot(uuid4()).hand == []
+
+    def test_view_is_kept_until_the_state_changes(self):
+        info = make_info()
+        state = GameState(uuid4(), info)
+        view = state.get_view()
+        assert state.get_view() is view
+        user = info.users[0]
+        state.play(
+            ProcessCardDTO(
+                card_id=user.cards[0].id,
+                owner_id=user.id,
+                set_id=info.set_id,
+            )
+        )
+        assert state.get_view() is not view
+        assert view.public.entry is None
+        assert len(view.hands[user.id]) == 6
+        assert state.get_view().public.users[0].cards_count == 5
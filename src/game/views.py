@@ -0,0 +1,102 @@
+"""
+Views of a game for its recipients.
+
+The public part of the game info is the same for everyone,
+so it is computed and encoded once per version of the state.
+Every recipient then gets only its own hand added to it.
+"""
+from functools import cached_property
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from game.schemas import (
+    FullCardInfoDTO,
+    FullGameCardInfoDTO,
+    GameSnapshotDTO,
+    PublicGameCardInfoDTO,
+    PublicUserCardInfoDTO,
+)
+
+_hand_adapter = TypeAdapter(list[FullCardInfoDTO])
+
+
+def to_public_users(
+    info: FullGameCardInfoDTO,
+) -> list[PublicUserCardInfoDTO]:
+    return [
+        PublicUserCardInfoDTO(
+            id=user.id, username=user.username, cards_count=len(user.cards)
+        )
+        for user in info.users
+    ]
+
+
+class GameView:
+    """
+    Game info of one version split into the public part and the hands,
+    both encoded when the view is built.
+
+    The view stays valid while the state it was built from changes,
+    the DTOs are decoded back only when they are asked for.
+    """
+
+    def __init__(
+        self, state_id: UUID, version: int, info: FullGameCardInfoDTO
+    ) -> None:
+        self.state_id = state_id
+        self.version = version
+        self._encoded_public = PublicGameCardInfoDTO.model_construct(
+            set_id=info.set_id,
+            users=[
+                PublicUserCardInfoDTO.model_construct(
+                    id=user.id,
+                    username=user.username,
+                    cards_count=len(user.cards),
+                )
+                for user in info.users
+            ],
+            entry=info.entry,
+            trump_suit=info.trump_suit,
+            trump_value=info.trump_value,
+        ).model_dump_json()
+        self._encoded_hands = {
+            user.id: _hand_adapter.dump_json(user.cards).decode()
+            for user in info.users
+        }
+
+    @cached_property
+    def public(self) -> PublicGameCardInfoDTO:
+        return PublicGameCardInfoDTO.model_validate_json(self._encoded_public)
+
+    @cached_property
+    def hands(self) -> dict[UUID, list[FullCardInfoDTO]]:
+        return {
+            user_id: _hand_adapter.validate_json(hand)
+            for user_id, hand in self._encoded_hands.items()
+        }
+
+    def get_snapshot(self, user_id: UUID | None) -> GameSnapshotDTO:
+        hand = self.hands.get(user_id, []) if user_id is not None else []
+        return GameSnapshotDTO(
+            state_id=self.state_id,
+            version=self.version,
+            game=self.public,
+            hand=hand,
+        )
+
+    def encode_snapshot(self, user_id: UUID | None) -> str:
+        """
+        Text of ``ResponseDTO[GameSnapshotDTO]`` for the user:
+        the encoded public part with the hand of the user spliced in.
+
+        Users who do not play the game get an empty hand.
+        """
+        hand = "[]"
+        if user_id is not None:
+            hand = self._encoded_hands.get(user_id, hand)
+        return (
+            f'{{"data":{{"type":"snapshot","state_id":"{self.state_id}",'
+            f'"version":{self.version},"game":{self._encoded_public},'
+            f'"hand":{hand}}}}}'
+        )
@@ -1,11 +1,18 @@
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
 from fastapi import FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from auth.hashing import password_hasher
 from auth.router import router as router_auth
 from game.router import router as router_game
+from game.state import game_state_manager
+from managers import ws_manager
+from metrics.router import router as router_metrics
 from search.router import router as router_search
 from schemas import (
     ErrorResponseDTO,
@@ -14,8 +21,20 @@ from schemas import (
 )
 from utils import PydanticConvertor
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
+    password_hasher.start()
+    await ws_manager.start()
+    yield
+    await game_state_manager.close()
+    await ws_manager.close()
+    password_hasher.close()
+
+
 app = FastAPI(
     title="Poker app",
+    lifespan=lifespan,
     responses={
         401: {"model": ErrorResponseDTO[MessageErrorResponseDTO]},
         422: {"model": ErrorResponseDTO[PydanticErrorResponseDTO]},
@@ -45,13 +64,15 @@ async def validation_exception_handler(
 
 
 @app.exception_handler(HTTPException)
-async def validation_exception_handler(_: Request, exc: HTTPException):
+async def http_exception_handler(_: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content=jsonable_encoder({"error": {"message": exc.detail}}),
+        headers=exc.headers,
     )
 
 
 app.include_router(router_auth)
 app.include_router(router_game)
 app.include_router(router_search)
+app.include_router(router_metrics)
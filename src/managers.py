@@ -1,40 +1,409 @@
+import asyncio
+import enum
+import json
+from types import ModuleType
+from typing import Any, Awaitable, Callable, Iterable
+from uuid import UUID, uuid4
+
+from fastapi import status
 from fastapi.encoders import jsonable_encoder
 from fastapi.websockets import WebSocket
+from pydantic import BaseModel
+
+from brokers import BROKERS
+from config import WS_BROKER, WS_OVERFLOW_POLICY, WS_SEND_QUEUE_SIZE
+from schemas import ErrorResponseDTO, ResponseDTO, WSMetricsDTO
+
+orjson: ModuleType | None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode(data: ResponseDTO | ErrorResponseDTO | dict[str, Any]) -> str:
+    """
+    Serialize a message to the text frame sent over the websocket.
+
+    DTOs are serialized by pydantic-core, plain dicts by orjson
+    when it is installed and by the standard json module otherwise.
+    The output is the same as the one of ``WebSocket.send_json``.
+    """
+    if isinstance(data, BaseModel):
+        return data.model_dump_json(by_alias=True)
+    if orjson is not None:
+        return orjson.dumps(jsonable_encoder(data)).decode()
+    return json.dumps(
+        jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False
+    )
+
+
+Listener = Callable[[str], Awaitable[None]]
+
+
+class Room:
+    """
+    Names of the rooms (topics) a websocket connection can subscribe to.
+
+    Every connection is subscribed to its own user and connection rooms,
+    so a message can be published to a single user or socket as well.
+    A connection room has only the local connection as its member,
+    so its messages are not sent through the broker.
+    The messages of a room can be handled by a listener of the worker
+    as well, like the commands sent to the owner of a game.
+    """
+
+    ALL = "*"
+    SEARCH = "search"
+
+    @staticmethod
+    def game(game_id: UUID | str) -> str:
+        return f"game:{game_id}"
+
+    @staticmethod
+    def lobby(lobby_id: UUID | str) -> str:
+        return f"lobby:{lobby_id}"
+
+    @staticmethod
+    def user(user_id: UUID | str) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def connection(connection_id: str) -> str:
+        return f"connection:{connection_id}"
+
+    @staticmethod
+    def is_local(room: str) -> bool:
+        return room.startswith("connection:")
+
+    @staticmethod
+    def player(game_id: UUID | str, user_id: UUID | str) -> str:
+        return f"game:{game_id}:user:{user_id}"
+
+    @staticmethod
+    def game_commands(game_id: UUID | str) -> str:
+        return f"game:{game_id}:commands"
+
+    @staticmethod
+    def replies(recipient_id: str) -> str:
+        return f"replies:{recipient_id}"
+
+
+class OverflowPolicy(enum.Enum):
+    """
+    What to do when the outgoing queue of a connection is full.
+
+    Only droppable messages are dropped or coalesced: the connection
+    is evicted rather than losing a message the client cannot get back
+    from the following ones, like a hand or a snapshot.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"  # Keep only the latest message
+    DISCONNECT = "disconnect"
+
+
+class _Connection:
+    """
+    Websocket with a bounded outgoing queue drained by its own writer task,
+    so a slow client never delays the other recipients.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        queue_size: int,
+        policy: OverflowPolicy,
+    ) -> None:
+        self.id = uuid4().hex
+        self.websocket = websocket
+        self.user_id = user_id
+        self.rooms: set[str] = set()
+        self.dropped = 0
+        self.coalesced = 0
+        self._policy = policy
+        # (payload, droppable)
+        self._queue: asyncio.Queue[tuple[str, bool]] = asyncio.Queue(
+            maxsize=queue_size
+        )
+        self.writer = asyncio.create_task(self._write())
 
-from schemas import ResponseDTO
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def enqueue(self, payload: str, droppable: bool = True) -> bool:
+        """
+        Put the payload to the queue applying the overflow policy.
+
+        Returns False if the connection has to be evicted.
+        """
+        if self._queue.full():
+            if self._policy is OverflowPolicy.DISCONNECT:
+                return False
+            if self._policy is OverflowPolicy.COALESCE:
+                discarded = self._discard(self._queue.qsize())
+                self.coalesced += discarded
+            else:
+                discarded = self._discard(1)
+                self.dropped += discarded
+            if not discarded:
+                # Every queued message has to be sent
+                return False
+        self._queue.put_nowait((payload, droppable))
+        return True
+
+    async def drain(self) -> None:
+        await self._queue.join()
+
+    def close(self) -> None:
+        self.writer.cancel()
+
+    def _discard(self, count: int) -> int:
+        """
+        Remove up to count oldest droppable messages from the queue.
+        """
+        kept = []
+        discarded = 0
+        while not self._queue.empty():
+            message = self._queue.get_nowait()
+            self._queue.task_done()
+            if message[1] and discarded < count:
+                discarded += 1
+            else:
+                kept.append(message)
+        for message in kept:
+            self._queue.put_nowait(message)
+        return discarded
+
+    async def _write(self) -> None:
+        while True:
+            payload, _ = await self._queue.get()
+            try:
+                await self.websocket.send_text(payload)
+            except Exception:
+                # Connection is closed, the endpoint will disconnect it
+                pass
+            finally:
+                self._queue.task_done()
 
 
 class WSConnectionManager:
-    def __init__(self) -> None:
-        self._active_connections: dict[str, WebSocket] = {}
+    """
+    Registry of the websocket connections of this worker.
+
+    Connections are keyed by their own id and indexed by user and room,
+    so one user can have several sockets open (tabs, endpoints)
+    and every lookup, send and disconnect is O(1) per connection.
+    """
 
-    async def connect(self, websocket: WebSocket, user_id: str) -> None:
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        overflow_policy: OverflowPolicy | str = WS_OVERFLOW_POLICY,
+        broker: str = WS_BROKER,
+    ) -> None:
+        self._connections: dict[str, _Connection] = {}
+        self._user_connections: dict[str, set[str]] = {}
+        self._rooms: dict[str, set[str]] = {}
+        self._listeners: dict[str, Listener] = {}
+        self._broker = BROKERS[broker](self._deliver)
+        self._queue_size = queue_size
+        self._overflow_policy = OverflowPolicy(overflow_policy)
+        self._dropped = 0
+        self._coalesced = 0
+        self._evicted = 0
+
+    async def start(self) -> None:
+        await self._broker.start()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: UUID | str,
+        rooms: Iterable[str] = (),
+    ) -> str:
+        """
+        Accept the websocket and subscribe it to its own rooms and the rooms.
+
+        Returns the id of the connection.
+        """
         await websocket.accept()
-        self._active_connections[user_id] = websocket
+        connection = _Connection(
+            websocket, str(user_id), self._queue_size, self._overflow_policy
+        )
+        self._connections[connection.id] = connection
+        self._user_connections.setdefault(connection.user_id, set()).add(
+            connection.id
+        )
+        self.subscribe(connection.id, Room.user(user_id))
+        self.subscribe(connection.id, Room.connection(connection.id))
+        for room in rooms:
+            self.subscribe(connection.id, room)
+        return connection.id
+
+    def disconnect(self, connection_id: str) -> None:
+        connection = self._connections.pop(connection_id, None)
+        if connection is None:
+            return
+        for room in list(connection.rooms):
+            self.unsubscribe(connection_id, room)
+        user_connections = self._user_connections[connection.user_id]
+        user_connections.discard(connection_id)
+        if not user_connections:
+            del self._user_connections[connection.user_id]
+        connection.close()
+        self._dropped += connection.dropped
+        self._coalesced += connection.coalesced
+
+    def subscribe(self, connection_id: str, room: str) -> None:
+        self._connections[connection_id].rooms.add(room)
+        self._rooms.setdefault(room, set()).add(connection_id)
+
+    def unsubscribe(self, connection_id: str, room: str) -> None:
+        connection = self._connections.get(connection_id)
+        if connection is not None:
+            connection.rooms.discard(room)
+        members = self._rooms.get(room)
+        if members is None:
+            return
+        members.discard(connection_id)
+        if not members:
+            del self._rooms[room]
+
+    def listen(self, room: str, listener: Listener) -> None:
+        """
+        Pass every message of the room to the listener of this worker.
+        """
+        self._listeners[room] = listener
 
-    def disconnect(self, user_id: str) -> None:
-        del self._active_connections[user_id]
+    def unlisten(self, room: str) -> None:
+        self._listeners.pop(room, None)
 
     async def broadcast(self, data: ResponseDTO) -> None:
-        for connection in self._active_connections.values():
-            await connection.send_json(
-                jsonable_encoder(data.model_dump(by_alias=True))
-            )
+        await self.publish(Room.ALL, data)
+
+    async def publish(
+        self,
+        room: str,
+        data: ResponseDTO | ErrorResponseDTO | dict[str, Any],
+        droppable: bool = True,
+    ) -> None:
+        """
+        Send data only to the connections subscribed to the room,
+        including the ones held by the other workers.
+
+        The data is encoded once and the same text is queued for every member.
+        A message that is not droppable is never lost to the overflow policy,
+        a member that has no room for it is evicted instead.
+        """
+        await self.publish_encoded(room, encode(data), droppable)
+
+    async def publish_encoded(
+        self, room: str, payload: str, droppable: bool = True
+    ) -> None:
+        """
+        Send a message already encoded with ``encode`` to the room.
+        """
+        if Room.is_local(room):
+            await self._deliver(room, payload, droppable)
+            return
+        await self._broker.publish(room, payload, droppable)
+
+    async def send(self, user_id: UUID | str, data: ResponseDTO) -> None:
+        await self.publish(Room.user(user_id), data)
+
+    async def drain(self) -> None:
+        """
+        Wait until every queued message is written to its websocket.
+        """
+        for connection in list(self._connections.values()):
+            await connection.drain()
+
+    async def close(self) -> None:
+        """
+        Disconnect everyone, wait for the writer tasks and stop the broker.
+        """
+        writers = [
+            connection.writer for connection in self._connections.values()
+        ]
+        for connection_id in list(self._connections):
+            self.disconnect(connection_id)
+        await asyncio.gather(*writers, return_exceptions=True)
+        await self._broker.stop()
 
-    async def send(self, user_id: str, data: ResponseDTO) -> None:
+    async def _deliver(
+        self, room: str, payload: str, droppable: bool = True
+    ) -> None:
+        """
+        Queue the payload for the local connections subscribed to the room.
+        """
+        listener = self._listeners.get(room)
+        if listener is not None:
+            try:
+                await listener(payload)
+            except Exception:
+                # The messages of the other rooms are delivered still
+                pass
+        if room == Room.ALL:
+            connection_ids = list(self._connections)
+        else:
+            connection_ids = list(self._rooms.get(room, ()))
+        for connection_id in connection_ids:
+            connection = self._connections.get(connection_id)
+            if connection is not None and not connection.enqueue(
+                payload, droppable
+            ):
+                await self._evict(connection)
+
+    async def _evict(self, connection: _Connection) -> None:
+        self.disconnect(connection.id)
+        self._evicted += 1
         try:
-            await self._active_connections[user_id].send_json(
-                jsonable_encoder(data.model_dump(by_alias=True))
+            await connection.websocket.close(
+                code=status.WS_1013_TRY_AGAIN_LATER
             )
-        except KeyError:
-            # User is not connected
+        except Exception:
+            # Connection is already closed
             pass
 
     def get_connections_count(self) -> int:
-        return len(self._active_connections)
+        return len(self._connections)
 
     def get_active_user_ids(self) -> list[str]:
-        return list(self._active_connections.keys())
+        return list(self._user_connections)
+
+    def get_online_users_count(self) -> int:
+        return len(self._user_connections)
+
+    def get_room_connections_count(self, room: str) -> int:
+        return len(self._rooms.get(room, ()))
+
+    def get_room_user_ids(self, room: str) -> list[str]:
+        return list(
+            {
+                self._connections[connection_id].user_id
+                for connection_id in self._rooms.get(room, ())
+            }
+        )
+
+    def get_room_users_count(self, room: str) -> int:
+        return len(self.get_room_user_ids(room))
+
+    def get_metrics(self) -> WSMetricsDTO:
+        connections = self._connections.values()
+        depths = [connection.depth for connection in connections]
+        return WSMetricsDTO(
+            connections=len(depths),
+            queued_messages=sum(depths),
+            max_queue_depth=max(depths, default=0),
+            dropped_messages=self._dropped
+            + sum(connection.dropped for connection in connections),
+            coalesced_messages=self._coalesced
+            + sum(connection.coalesced for connection in connections),
+            evicted_connections=self._evicted,
+        )
 
 
 ws_manager = WSConnectionManager()
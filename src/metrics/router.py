@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+
+from auth.dependencies import AuthenticatedUserDep
+from auth.cache import principal_cache
+from auth.hashing import password_hasher
+from auth.throttling import login_limiter
+from database import engine, get_pool_stats
+from managers import ws_manager
+from metrics.schemas import MetricsDTO
+from schemas import ResponseDTO
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("")
+async def get_metrics(user: AuthenticatedUserDep) -> ResponseDTO[MetricsDTO]:
+    """
+    Counters of this worker.
+    """
+    metrics = MetricsDTO(
+        ws=ws_manager.get_metrics(),
+        db_pool=get_pool_stats(engine),
+        password_hasher=password_hasher.get_stats(),
+        principal_cache=principal_cache.get_stats(),
+        login_limiter=login_limiter.get_stats(),
+    )
+    return ResponseDTO[MetricsDTO](data=metrics)
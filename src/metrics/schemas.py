@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+from auth.schemas import (
+    LoginLimiterStatsDTO,
+    PasswordHasherStatsDTO,
+    PrincipalCacheStatsDTO,
+)
+from schemas import PoolStatsDTO, WSMetricsDTO
+
+
+class MetricsDTO(BaseModel):
+    ws: WSMetricsDTO
+    db_pool: PoolStatsDTO
+    password_hasher: PasswordHasherStatsDTO
+    principal_cache: PrincipalCacheStatsDTO
+    login_limiter: LoginLimiterStatsDTO
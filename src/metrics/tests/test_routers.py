@@ -0,0 +1,35 @@
+import pytest
+from httpx import AsyncClient
+
+from auth.models import User
+from auth.services.authentication import JWTAuthenticationService
+from database import async_session_maker
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestMetrics:
+    _url = "/metrics"
+
+    async def test_metrics(self, ac: AsyncClient):
+        async with async_session_maker() as session:
+            session.add(User(username="metrics", hashed_password="string"))
+            await session.commit()
+        access_token = await JWTAuthenticationService.create_access_token(
+            {"sub": "metrics"}
+        )
+        response = await ac.get(
+            self._url, headers={"Authorization": f"Bearer {access_token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["ws"]["connections"] == 0
+        # Tests run without a connection pool
+        assert data["db_pool"]["size"] == 0
+        assert data["password_hasher"]["workers"] > 0
+        assert data["principal_cache"]["misses"] >= 1
+        assert data["login_limiter"]["throttled_by_ip"] >= 0
+
+    async def test_metrics_need_authentication(self, ac: AsyncClient):
+        response = await ac.get(self._url)
+        assert response.status_code == 401
@@ -1,8 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Sequence, Type
+from typing import Any, Mapping, Sequence, Type, cast
 from uuid import UUID
 
-from sqlalchemy import select, func, Row, update, delete
+from sqlalchemy import (
+    select,
+    func,
+    Row,
+    update,
+    delete,
+    values,
+    column,
+    Table,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import Base
@@ -58,7 +67,13 @@ class IRepository(ABC):
 
     @abstractmethod
     async def bulk_add(
-        self, inserts: list[dict[str, str | int | UUID | None]]
+        self, inserts: Sequence[Mapping[str, Any]]
+    ) -> Sequence[Row]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_many(
+        self, /, key: str, updates: Sequence[Mapping[str, Any]]
     ) -> None:
         raise NotImplementedError
 
@@ -139,7 +154,6 @@ class SQLAlchemyRepository(IRepository):
     ) -> None:
         stmt = update(self.model).filter_by(**what_to_update).values(**data)
         await self._session.execute(stmt)
-        await self._session.commit()
 
     async def get_last(
         self, /, returns: Sequence[str] | None = None, **data: str | int | UUID
@@ -167,6 +181,48 @@ class SQLAlchemyRepository(IRepository):
         await self._session.execute(stmt)
 
     async def bulk_add(
-        self, inserts: list[dict[str, str | int | UUID | None]]
+        self, inserts: Sequence[Mapping[str, Any]]
+    ) -> Sequence[Row]:
+        """
+        Insert all rows and return their primary keys.
+
+        RETURNING makes SQLAlchemy send the rows
+        as multi-row INSERT statements of up to 1000 rows each.
+        """
+        if not inserts:
+            return []
+        table = cast(Table, self.model.__table__)
+        stmt = table.insert().returning(*table.primary_key.columns)
+        res = await self._session.execute(stmt, inserts)
+        return res.fetchall()
+
+    async def update_many(
+        self, /, key: str, updates: Sequence[Mapping[str, Any]]
     ) -> None:
-        await self._session.execute(self.model.__table__.insert(), inserts)
+        """
+        Update the rows matching the key of every dict
+        with its other values, which are the same columns for all dicts.
+
+        Sent as UPDATE ... FROM (VALUES ...) statements
+        of up to 1000 rows each.
+        """
+        if not updates:
+            return
+        table = cast(Table, self.model.__table__)
+        names = list(updates[0])
+        for start in range(0, len(updates), 1000):
+            rows = values(
+                *[column(name, table.c[name].type) for name in names],
+                name="updates",
+            ).data(
+                [
+                    tuple(row[name] for name in names)
+                    for row in updates[start : start + 1000]
+                ]
+            )
+            stmt = (
+                update(table)
+                .where(table.c[key] == rows.c[key])
+                .values({name: rows.c[name] for name in names if name != key})
+            )
+            await self._session.execute(stmt)
@@ -26,3 +26,22 @@ class PaginationDTO(BaseModel, Generic[S]):
     page_count: int
     total_count: int
     data: list[S]
+
+
+class WSMetricsDTO(BaseModel):
+    connections: int
+    queued_messages: int
+    max_queue_depth: int
+    dropped_messages: int
+    coalesced_messages: int
+    evicted_connections: int
+
+
+class PoolStatsDTO(BaseModel):
+    size: int = 0
+    checked_out: int = 0
+    idle: int = 0
+    overflow: int = 0
+    checkouts: int = 0
+    total_wait_ms: float = 0
+    max_wait_ms: float = 0
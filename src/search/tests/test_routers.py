@@ -0,0 +1,45 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from auth.models import User
+from auth.services.authentication import JWTAuthenticationService
+from database import async_session_maker, engine
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestSearchUsers:
+    _url = "/search/users"
+
+    async def test_authenticated_user_is_cached(self, ac: AsyncClient):
+        async with async_session_maker() as session:
+            session.add(User(username="searching", hashed_password="string"))
+            await session.commit()
+        access_token = await JWTAuthenticationService.create_access_token(
+            {"sub": "searching"}
+        )
+        statements = []
+
+        def on_execute(connection, cursor, statement, *args) -> None:
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+        try:
+            for _ in range(2):
+                response = await ac.get(
+                    self._url,
+                    params={"username": "search"},
+                    headers={"Authorization": f"Bearer {access_token}"},
+                )
+                assert response.status_code == 200
+        finally:
+            event.remove(
+                engine.sync_engine, "before_cursor_execute", on_execute
+            )
+        user_lookups = [
+            statement
+            for statement in statements
+            if "WHERE users.username = " in statement
+        ]
+        assert len(user_lookups) == 1
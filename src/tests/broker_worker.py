@@ -0,0 +1,47 @@
+"""
+Worker process for the multi-worker broker tests.
+
+Connects a websocket of the given user to the given room,
+publishes every "<room> <text>" line read from stdin
+and prints every message its websocket receives.
+"""
+import asyncio
+import sys
+from typing import cast
+
+from fastapi.websockets import WebSocket
+from pydantic import BaseModel
+
+from managers import WSConnectionManager
+from schemas import ResponseDTO
+
+
+class MessageDTO(BaseModel):
+    text: str
+
+
+class PrintingWebSocket:
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        print(data, flush=True)
+
+
+async def main(user_id: str, room: str) -> None:
+    manager = WSConnectionManager(broker="postgres")
+    await manager.start()
+    websocket = cast(WebSocket, PrintingWebSocket())
+    await manager.connect(websocket, user_id, rooms=(room,))
+    print("ready", flush=True)
+    loop = asyncio.get_running_loop()
+    while line := await loop.run_in_executor(None, sys.stdin.readline):
+        target, text = line.rstrip("\n").split(" ", 1)
+        await manager.publish(
+            target, ResponseDTO[MessageDTO](data=MessageDTO(text=text))
+        )
+    await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*sys.argv[1:]))
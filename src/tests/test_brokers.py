@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import sys
+from asyncio.subprocess import PIPE, Process
+
+import pytest
+from sqlalchemy import text
+
+from brokers import PostgresBroker
+from database import engine
+
+pytestmark = pytest.mark.asyncio
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER = os.path.join(SRC, "tests", "broker_worker.py")
+
+
+class TestPostgresBroker:
+    @staticmethod
+    async def _start_worker(user_id: str, room: str) -> Process:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            WORKER,
+            user_id,
+            room,
+            stdin=PIPE,
+            stdout=PIPE,
+            env={**os.environ, "PYTHONPATH": SRC},
+        )
+        assert await TestPostgresBroker._read(process) == "ready"
+        return process
+
+    @staticmethod
+    async def _read(process: Process) -> str:
+        assert process.stdout is not None
+        line = await asyncio.wait_for(process.stdout.readline(), timeout=10)
+        return line.decode().rstrip("\n")
+
+    @staticmethod
+    async def _publish(process: Process, room: str, text: str) -> None:
+        assert process.stdin is not None
+        process.stdin.write(f"{room} {text}\n".encode())
+        await process.stdin.drain()
+
+    @pytest.fixture
+    async def workers(self):
+        first = await self._start_worker("first", "game:1")
+        second = await self._start_worker("second", "game:1")
+        yield first, second
+        for process in (first, second):
+            assert process.stdin is not None
+            process.stdin.close()
+            await asyncio.wait_for(process.wait(), timeout=10)
+
+    async def test_send_to_user_of_another_worker(self, workers):
+        first, second = workers
+        await self._publish(first, "user:second", "hello")
+        assert json.loads(await self._read(second)) == {
+            "data": {"text": "hello"}
+        }
+
+    async def test_room_broadcast_reaches_both_workers(self, workers):
+        first, second = workers
+        await self._publish(second, "game:1", "move")
+        for process in (first, second):
+            assert json.loads(await self._read(process)) == {
+                "data": {"text": "move"}
+            }
+
+    async def test_payload_bigger_than_notify_limit(self, workers):
+        first, second = workers
+        text = "x" * 20000
+        await self._publish(first, "game:1", text)
+        message = json.loads(await self._read(second))
+        assert message["data"]["text"] == text
+
+
+class TestPostgresBrokerRecovery:
+    @staticmethod
+    async def _wait_for(condition) -> None:
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.05)
+        raise TimeoutError
+
+    async def test_listens_again_after_connection_loss(self):
+        received = []
+
+        async def handler(room: str, payload: str, droppable: bool) -> None:
+            received.append((room, payload))
+
+        async def ignore(room: str, payload: str, droppable: bool) -> None:
+            pass
+
+        listener = PostgresBroker(handler)
+        listener.reconnect_delay = 0.01
+        sender = PostgresBroker(ignore)
+        await listener.start()
+        await sender.start()
+        try:
+            assert listener._driver_connection is not None
+            pid = listener._driver_connection.get_server_pid()
+            async with engine.connect() as connection:
+                await connection.execute(
+                    text("SELECT pg_terminate_backend(:pid)"), {"pid": pid}
+                )
+            await self._wait_for(
+                lambda: listener._driver_connection is not None
+                and listener._driver_connection.get_server_pid() != pid
+            )
+            await sender.publish("game:1", "move")
+            await self._wait_for(lambda: received)
+        finally:
+            await listener.stop()
+            await sender.stop()
+        assert received == [("game:1", "move")]
+
+    async def test_incomplete_messages_expire(self):
+        async def ignore(room: str, payload: str, droppable: bool) -> None:
+            pass
+
+        broker = PostgresBroker(ignore)
+        broker.max_incomplete_messages = 2
+        for message_id in ("first", "second", "third"):
+            await broker._receive(f"other {message_id} 0 2 1 game:1\nchunk")
+        assert list(broker._chunks) == ["second", "third"]
+        broker.chunk_timeout = 0
+        await broker._receive("other fourth 0 2 1 game:1\nchunk")
+        assert list(broker._chunks) == ["fourth"]
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import NullPool, text
+
+from config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+)
+from database import InstrumentedQueuePool, create_engine, get_pool_stats
+from schemas import PoolStatsDTO
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestEngine:
+    async def test_pool_uses_config(self):
+        engine = create_engine(null_pool=False)
+        pool = engine.pool
+        assert isinstance(pool, InstrumentedQueuePool)
+        assert pool.size() == DB_POOL_SIZE
+        assert pool._max_overflow == DB_MAX_OVERFLOW
+        assert pool._timeout == DB_POOL_TIMEOUT
+        assert pool._recycle == DB_POOL_RECYCLE
+        assert pool._pre_ping
+        await engine.dispose()
+
+    async def test_pool_stats(self):
+        engine = create_engine(null_pool=False)
+        assert get_pool_stats(engine) == PoolStatsDTO(size=DB_POOL_SIZE)
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = get_pool_stats(engine)
+            assert stats.checked_out == 1
+            assert stats.idle == 0
+        stats = get_pool_stats(engine)
+        assert stats.checked_out == 0
+        assert stats.idle == 1
+        assert stats.checkouts == 1
+        assert stats.max_wait_ms > 0
+        assert stats.total_wait_ms >= stats.max_wait_ms
+        await engine.dispose()
+
+    async def test_null_pool_has_empty_stats(self):
+        engine = create_engine(null_pool=True)
+        assert isinstance(engine.pool, NullPool)
+        assert get_pool_stats(engine) == PoolStatsDTO()
+        await engine.dispose()
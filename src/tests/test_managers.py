@@ -0,0 +1,301 @@
+import asyncio
+from datetime import datetime
+import json
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+import pytest
+from pydantic import BaseModel
+
+from auth.models import FriendshipStatus
+from auth.schemas import UserInfoDTO
+from game.models import GameType
+from game.schemas import GameInfoDTO, GameLogEventDTO, LobbyUserInfoDTO
+import managers
+from managers import WSConnectionManager, Room, encode
+from schemas import ResponseDTO
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent: list = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+
+
+class StalledWebSocket(FakeWebSocket):
+    """
+    Websocket whose writes block until it is released.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.released = asyncio.Event()
+
+    async def send_text(self, data: str) -> None:
+        await self.released.wait()
+        await super().send_text(data)
+
+
+class MessageDTO(BaseModel):
+    text: str
+
+
+@pytest.fixture
+async def make_manager():
+    managers = []
+
+    def _make_manager(**kwargs) -> WSConnectionManager:
+        managers.append(WSConnectionManager(**kwargs))
+        return managers[-1]
+
+    yield _make_manager
+    for manager in managers:
+        await manager.close()
+
+
+class TestRooms:
+    async def test_publish_only_to_room(self, make_manager):
+        manager = make_manager()
+        first_game, second_game = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(first_game, "1", rooms=(Room.game("a"),))
+        await manager.connect(second_game, "2", rooms=(Room.game("b"),))
+        await manager.publish(
+            Room.game("a"),
+            ResponseDTO[MessageDTO](data=MessageDTO(text="move")),
+        )
+        await manager.drain()
+        assert first_game.sent == [{"data": {"text": "move"}}]
+        assert second_game.sent == []
+
+    async def test_user_room(self, make_manager):
+        manager = make_manager()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "1")
+        await manager.publish(
+            Room.user("1"), ResponseDTO[MessageDTO](data=MessageDTO(text="hi"))
+        )
+        await manager.drain()
+        assert websocket.sent == [{"data": {"text": "hi"}}]
+
+    async def test_connection_room(self, make_manager):
+        manager = make_manager()
+        first, second = FakeWebSocket(), FakeWebSocket()
+        connection_id = await manager.connect(first, "1")
+        await manager.connect(second, "1")
+        await manager.publish(
+            Room.connection(connection_id),
+            ResponseDTO[MessageDTO](data=MessageDTO(text="snapshot")),
+        )
+        await manager.drain()
+        assert first.sent == [{"data": {"text": "snapshot"}}]
+        assert second.sent == []
+
+    async def test_connection_room_skips_broker(self, make_manager):
+        manager = make_manager()
+        published = []
+
+        async def publish(
+            room: str, payload: str, droppable: bool = True
+        ) -> None:
+            published.append(room)
+
+        manager._broker.publish = publish
+        websocket = FakeWebSocket()
+        connection_id = await manager.connect(websocket, "1")
+        await manager.publish(
+            Room.connection(connection_id),
+            ResponseDTO[MessageDTO](data=MessageDTO(text="snapshot")),
+        )
+        await manager.publish(
+            Room.user("1"), ResponseDTO[MessageDTO](data=MessageDTO(text="hi"))
+        )
+        await manager.drain()
+        assert websocket.sent == [{"data": {"text": "snapshot"}}]
+        assert published == [Room.user("1")]
+
+    async def test_disconnect_leaves_rooms(self, make_manager):
+        manager = make_manager()
+        connection_id = await manager.connect(
+            FakeWebSocket(), "1", rooms=(Room.SEARCH,)
+        )
+        await manager.connect(FakeWebSocket(), "2", rooms=(Room.SEARCH,))
+        manager.disconnect(connection_id)
+        assert manager.get_room_connections_count(Room.SEARCH) == 1
+        assert manager.get_room_user_ids(Room.SEARCH) == ["2"]
+
+
+class TestMultipleConnections:
+    async def test_send_reaches_every_socket_of_user(self, make_manager):
+        manager = make_manager()
+        search, game = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(search, "1", rooms=(Room.SEARCH,))
+        await manager.connect(game, "1", rooms=(Room.game("a"),))
+        await manager.send(
+            "1", ResponseDTO[MessageDTO](data=MessageDTO(text="hi"))
+        )
+        await manager.drain()
+        assert search.sent == game.sent == [{"data": {"text": "hi"}}]
+        assert manager.get_connections_count() == 2
+        assert manager.get_online_users_count() == 1
+
+    async def test_disconnect_keeps_other_sockets(self, make_manager):
+        manager = make_manager()
+        search, game = FakeWebSocket(), FakeWebSocket()
+        search_id = await manager.connect(search, "1", rooms=(Room.SEARCH,))
+        await manager.connect(game, "1", rooms=(Room.game("a"),))
+        manager.disconnect(search_id)
+        manager.disconnect(search_id)
+        await manager.publish(
+            Room.game("a"),
+            ResponseDTO[MessageDTO](data=MessageDTO(text="move")),
+        )
+        await manager.drain()
+        assert game.sent == [{"data": {"text": "move"}}]
+        assert search.sent == []
+        assert manager.get_active_user_ids() == ["1"]
+        assert manager.get_room_connections_count(Room.SEARCH) == 0
+
+    async def test_room_users_are_unique(self, make_manager):
+        manager = make_manager()
+        await manager.connect(FakeWebSocket(), "1", rooms=(Room.SEARCH,))
+        await manager.connect(FakeWebSocket(), "1", rooms=(Room.SEARCH,))
+        assert manager.get_room_connections_count(Room.SEARCH) == 2
+        assert manager.get_room_users_count(Room.SEARCH) == 1
+
+
+class TestBackpressure:
+    @staticmethod
+    def _message(index: int) -> ResponseDTO[MessageDTO]:
+        return ResponseDTO[MessageDTO](data=MessageDTO(text=str(index)))
+
+    async def _flood(self, make_manager, policy: str) -> tuple:
+        manager = make_manager(queue_size=3, overflow_policy=policy)
+        slow, fast = StalledWebSocket(), FakeWebSocket()
+        await manager.connect(slow, "slow", rooms=(Room.game("a"),))
+        await manager.connect(fast, "fast", rooms=(Room.game("a"),))
+        for index in range(6):
+            await manager.publish(Room.game("a"), self._message(index))
+            await asyncio.sleep(0)
+        return manager, slow, fast
+
+    async def test_slow_client_does_not_block_others(self, make_manager):
+        manager, slow, fast = await self._flood(make_manager, "drop_oldest")
+        assert [m["data"]["text"] for m in fast.sent] == list("012345")
+        assert slow.sent == []
+
+    async def test_drop_oldest(self, make_manager):
+        manager, slow, _ = await self._flood(make_manager, "drop_oldest")
+        metrics = manager.get_metrics()
+        assert metrics.max_queue_depth == 3
+        slow.released.set()
+        await manager.drain()
+        # The first message was taken by the writer before it stalled
+        assert [m["data"]["text"] for m in slow.sent] == list("0345")
+        assert manager.get_metrics().dropped_messages == 2
+
+    async def test_coalesce(self, make_manager):
+        manager, slow, _ = await self._flood(make_manager, "coalesce")
+        slow.released.set()
+        await manager.drain()
+        assert [m["data"]["text"] for m in slow.sent] == list("045")
+        assert manager.get_metrics().coalesced_messages == 3
+
+    @pytest.mark.parametrize(
+        "policy, sent", [("drop_oldest", "0134"), ("coalesce", "014")]
+    )
+    async def test_undroppable_messages_are_kept(
+        self, make_manager, policy: str, sent: str
+    ):
+        manager = make_manager(queue_size=3, overflow_policy=policy)
+        slow = StalledWebSocket()
+        await manager.connect(slow, "slow", rooms=(Room.game("a"),))
+        for index in range(5):
+            await manager.publish(
+                Room.game("a"), self._message(index), droppable=index != 1
+            )
+            await asyncio.sleep(0)
+        slow.released.set()
+        await manager.drain()
+        assert [m["data"]["text"] for m in slow.sent] == list(sent)
+
+    async def test_evict_rather_than_drop_undroppable(self, make_manager):
+        manager = make_manager(queue_size=3, overflow_policy="drop_oldest")
+        slow = StalledWebSocket()
+        await manager.connect(slow, "slow", rooms=(Room.game("a"),))
+        for index in range(5):
+            await manager.publish(
+                Room.game("a"), self._message(index), droppable=False
+            )
+            await asyncio.sleep(0)
+        assert slow.close_code == 1013
+        assert manager.get_metrics().dropped_messages == 0
+
+    async def test_disconnect(self, make_manager):
+        manager, slow, _ = await self._flood(make_manager, "disconnect")
+        assert manager.get_room_user_ids(Room.game("a")) == ["fast"]
+        assert manager.get_active_user_ids() == ["fast"]
+        assert slow.close_code == 1013
+        metrics = manager.get_metrics()
+        assert metrics.evicted_connections == 1
+        assert metrics.connections == 1
+
+
+def send_json_text(data) -> str:
+    # The text that WebSocket.send_json would send
+    return json.dumps(
+        jsonable_encoder(data), separators=(",", ":"), ensure_ascii=False
+    )
+
+
+class TestEncode:
+    @pytest.fixture(params=["orjson", "json"])
+    def json_backend(self, request, monkeypatch):
+        if request.param == "json":
+            monkeypatch.setattr(managers, "orjson", None)
+        elif managers.orjson is None:
+            pytest.skip("orjson is not installed")
+
+    @pytest.fixture
+    def messages(self):
+        user = UserInfoDTO(id=uuid4(), username="Сергей")
+        created_at = datetime(2024, 6, 14, 2, 34, 5, 123456)
+        return [
+            ResponseDTO[GameInfoDTO](
+                data=GameInfoDTO(
+                    id=uuid4(), players=[user], created_at=created_at
+                )
+            ),
+            ResponseDTO[LobbyUserInfoDTO](
+                data=[LobbyUserInfoDTO(**user.model_dump(), is_leader=True)]
+            ),
+            ResponseDTO[GameLogEventDTO](
+                data=GameLogEventDTO(
+                    game_id=uuid4(),
+                    seq=1,
+                    type="card_played",
+                    payload={"card": 5},
+                    created_at=created_at,
+                )
+            ),
+            {
+                "game_id": uuid4(),
+                "type": GameType.MULTIPLAYER,
+                "status": FriendshipStatus.ACCEPTED,
+                "created_at": created_at,
+                "players": [user],
+            },
+        ]
+
+    async def test_encode_matches_send_json(self, json_backend, messages):
+        for message in messages:
+            assert encode(message) == send_json_text(message)
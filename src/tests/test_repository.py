@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import select
+
+from auth.models import User
+from database import async_session_maker
+from unitofwork import UnitOfWork
+
+pytestmark = pytest.mark.asyncio
+
+
+async def create_users(prefix: str, number: int) -> list[User]:
+    async with async_session_maker() as session:
+        users = [
+            User(username=f"{prefix}_{index}", hashed_password="string")
+            for index in range(number)
+        ]
+        session.add_all(users)
+        await session.commit()
+    return users
+
+
+async def get_usernames(users: list[User]) -> list[str]:
+    async with async_session_maker() as session:
+        query = select(User.id, User.username).filter(
+            User.id.in_([user.id for user in users])
+        )
+        usernames = dict((await session.execute(query)).fetchall())
+    return [usernames[user.id] for user in users]
+
+
+class TestSQLAlchemyRepository:
+    async def test_update_is_left_to_commit(self):
+        users = await create_users("update_rollback", 1)
+        uow = UnitOfWork()
+        async with uow:
+            await uow.users.update({"id": users[0].id}, username="renamed")
+        assert await get_usernames(users) == ["update_rollback_0"]
+
+        async with uow:
+            await uow.users.update({"id": users[0].id}, username="renamed")
+            await uow.commit()
+        assert await get_usernames(users) == ["renamed"]
+
+    async def test_update_many(self):
+        users = await create_users("update_many", 3)
+        uow = UnitOfWork()
+        async with uow:
+            await uow.users.update_many(
+                "id",
+                [
+                    dict(id=user.id, username=f"update_many_new_{index}")
+                    for index, user in enumerate(users[:2])
+                ],
+            )
+            await uow.users.update_many("id", [])
+            await uow.commit()
+        assert await get_usernames(users) == [
+            "update_many_new_0",
+            "update_many_new_1",
+            "update_many_2",
+        ]
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
 
-from auth.repositories import UserRepository, FriendshipRepository
+from auth.repositories import (
+    UserRepository,
+    FriendshipRepository,
+    RevokedTokenRepository,
+)
 from database import async_session_maker
 from game.repositories import (
     LobbyRepository,
@@ -11,12 +15,14 @@ from game.repositories import (
     DealingRepository,
     CardRepository,
     EntryRepository,
+    GameEventRepository,
 )
 
 
 class IUnitOfWork(ABC):
     users: UserRepository
     friendship: FriendshipRepository
+    revoked_tokens: RevokedTokenRepository
     lobbies: LobbyRepository
     lobby_players: LobbyPlayerRepository
     games: GameRepository
@@ -25,9 +31,10 @@ class IUnitOfWork(ABC):
     dealings: DealingRepository
     cards: CardRepository
     entries: EntryRepository
+    game_events: GameEventRepository
 
     @abstractmethod
-    def __init__(self):
+    def __init__(self) -> None:
         raise NotImplementedError
 
     @abstractmethod
@@ -48,13 +55,14 @@ class IUnitOfWork(ABC):
 
 
 class UnitOfWork(IUnitOfWork):
-    def __init__(self):
+    def __init__(self) -> None:
         self.session_factory = async_session_maker
 
     async def __aenter__(self):
         self._session = self.session_factory()
         self.users = UserRepository(self._session)
         self.friendship = FriendshipRepository(self._session)
+        self.revoked_tokens = RevokedTokenRepository(self._session)
         self.lobbies = LobbyRepository(self._session)
         self.lobby_players = LobbyPlayerRepository(self._session)
         self.games = GameRepository(self._session)
@@ -63,6 +71,7 @@ class UnitOfWork(IUnitOfWork):
         self.dealings = DealingRepository(self._session)
         self.cards = CardRepository(self._session)
         self.entries = EntryRepository(self._session)
+        self.game_events = GameEventRepository(self._session)
 
     async def __aexit__(self, *args):
         await self.rollback()